@@ -1,5 +1,4 @@
 import asyncio
-import json
 import os
 from typing import Optional
 
@@ -9,7 +8,9 @@ from discord.ext import commands
 import config
 from core import Robo
 from utils.context import Context
+from utils.cache import caches
 from utils.converter import MemberConverter
+from utils.paginator import Pages, TextPageSource
 
 
 class Developer(commands.Cog):
@@ -106,35 +107,29 @@ class Developer(commands.Cog):
     @no_prefix.command(name="add", hidden=True)
     async def no_prefix_add(self, ctx: Context, *, user: MemberConverter):
         """Removes the prefix for a guild"""
-        async with self.bot.db.cursor() as cursor:
-            await cursor.execute("SELECT * FROM no_prefix WHERE user_id=?", (user.id,))
-            if await cursor.fetchone() is not None:
-                return await ctx.error("Already in noprefix mode.")
-            
-            await cursor.execute("INSERT INTO no_prefix VALUES (?)", (user.id,))
-            await self.bot.db.commit()
+        if user.id in self.bot.prefixes.no_prefix:
+            return await ctx.error("Already in noprefix mode.")
+
+        await self.bot.db.execute("INSERT OR IGNORE INTO no_prefix VALUES (?)", user.id)
+        self.bot.prefixes.add_no_prefix(user.id)
 
         await ctx.send(f"Added {user.mention} to noprefix mode.")
 
     @no_prefix.command(name="remove", hidden=True, aliases=["del", "rem"])
     async def no_prefix_remove(self, ctx: Context, *, user: MemberConverter):
         """Removes the prefix for a guild"""
-        async with self.bot.db.cursor() as cursor:
-            await cursor.execute("SELECT * FROM no_prefix WHERE user_id=?", (user.id,))
-            if await cursor.fetchone() is None:
-                return await ctx.error("Not in noprefix mode.")
-            
-            await cursor.execute("DELETE FROM no_prefix WHERE user_id=?", (user.id,))
-            await self.bot.db.commit()
+        if user.id not in self.bot.prefixes.no_prefix:
+            return await ctx.error("Not in noprefix mode.")
+
+        await self.bot.db.execute("DELETE FROM no_prefix WHERE user_id=?", user.id)
+        self.bot.prefixes.remove_no_prefix(user.id)
 
         await ctx.send(f"Removed {user.mention} from noprefix mode.")
 
     @no_prefix.command(name="list", hidden=True)
     async def no_prefix_list(self, ctx: Context):
         """Removes the prefix for a guild"""
-        async with self.bot.db.cursor() as cursor:
-            await cursor.execute("SELECT * FROM no_prefix")
-            data = await cursor.fetchall()
+        data = await self.bot.db.fetchall("SELECT user_id FROM no_prefix")
 
         if not data:
             return await ctx.error("No one is in noprefix mode.")
@@ -154,14 +149,7 @@ class Developer(commands.Cog):
     @commands.is_owner()
     async def reboot(self, ctx: Context):
         """Reboots the bot"""
-        with open("data/stats.json", "r") as f:
-            data = json.load(f)
-
-        data["boot_m"]["sent"] = "false"
-        data["boot_m"]["id"] = ctx.channel.id
-
-        with open("data/stats.json", "w") as f:
-            json.dump(data, f, indent=4)
+        self.bot.stats.mark_reboot(ctx.channel.id)
 
         await ctx.send("Rebooting...")
         if os.name == "nt":
@@ -171,3 +159,48 @@ class Developer(commands.Cog):
         else:
             await ctx.send("Reboot failed.")
 
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def maintenance(self, ctx: Context):
+        """Toggles maintenance mode on every cluster"""
+        self.bot.set_maintenance(not self.bot.MAINTENANCE)
+        await ctx.send(f"Maintenance mode {'enabled' if self.bot.MAINTENANCE else 'disabled'}.")
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def timings(self, ctx: Context, view: str = "commands"):
+        """Shows command latency percentiles, use `timings cogs` for the per cog view"""
+        metrics = self.bot.metrics
+        data = metrics.cogs if view.lower() in ("cog", "cogs") else metrics.commands
+        if not data:
+            return await ctx.error("No commands have been timed yet.")
+
+        def ms(seconds: float) -> str:
+            return f"{seconds * 1000:.0f}"
+
+        rows = sorted(data.items(), key=lambda item: item[1].wall.percentile(95), reverse=True)
+        lines = [f"{'name':<20} {'calls':>6} {'p50':>6} {'p95':>6} {'p99':>6} {'ttfr95':>6} {'err%':>5}"]
+        for name, timing in rows:
+            lines.append(
+                f"{name[:20]:<20} {timing.wall.count:>6} {ms(timing.wall.percentile(50)):>6} "
+                f"{ms(timing.wall.percentile(95)):>6} {ms(timing.wall.percentile(99)):>6} "
+                f"{ms(timing.first_response.percentile(95)):>6} {timing.error_rate * 100:>5.1f}"
+            )
+
+        pages = Pages(TextPageSource("\n".join(lines), prefix="```\n# times in ms", max_size=1500), ctx=ctx, check_embeds=False)
+        await pages.start()
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def caches(self, ctx: Context):
+        """Shows the hit rates of the lookup caches"""
+        if not caches:
+            return await ctx.error("No caches are in use.")
+
+        lines = [f"{'name':<18} {'size':>9} {'hits':>6} {'stale':>6} {'miss':>6} {'evict':>6} {'rate':>5}"]
+        for cache in sorted(caches.values(), key=lambda c: c.name):
+            lines.append(
+                f"{cache.name[:18]:<18} {f'{len(cache)}/{cache.maxsize}':>9} {cache.hits:>6} {cache.stale_hits:>6} "
+                f"{cache.misses:>6} {cache.evictions:>6} {cache.hit_rate * 100:>4.0f}%"
+            )
+        await ctx.send("```\n" + "\n".join(lines) + "\n```")
@@ -4,10 +4,12 @@ from .error import EventError
 from .guild import EventGuild
 from .ready import EvnetReady
 from .greet import Greeting
+from .crypto import Crypto
 
 
 async def setup(bot: Robo):
     await bot.add_cog(EventError(bot))
     await bot.add_cog(EvnetReady(bot))
     await bot.add_cog(EventGuild(bot))
-    await bot.add_cog(Greeting(bot))
\ No newline at end of file
+    await bot.add_cog(Greeting(bot))
+    await bot.add_cog(Crypto(bot))
\ No newline at end of file
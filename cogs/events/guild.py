@@ -41,8 +41,5 @@ class EventGuild(commands.Cog):
         with open("data/guild.json", "w") as f:
             json.dump(data, f, indent=4)
 
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                """DELETE FROM guilds WHERE id = ?""",
-                (guild.id,)
-            )
\ No newline at end of file
+        await self.bot.db.execute("DELETE FROM guilds WHERE id = ?", guild.id)
+        self.bot.prefixes.reset_guild_prefix(guild.id)
\ No newline at end of file
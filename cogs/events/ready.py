@@ -1,12 +1,8 @@
-import json
-
-import aiohttp
 import discord
 from discord.ext import commands
 from discord.gateway import DiscordWebSocket
 
 from core import Robo
-from utils.buttons import LockView
 from utils.webhook import send_webhook2
 
 never = """
@@ -136,12 +132,10 @@ class EvnetReady(commands.Cog):
 
     @commands.Cog.listener()
     async def on_ready(self):
+        # the session and persistent views are set up once by the startup pipeline,
+        # this only runs again on reconnects so it has to stay idempotent
         self.bot.logger.info(f"Logged in as {self.bot.user}")
 
-        self.bot.add_view(LockView())
-
-        self.bot.session = aiohttp.ClientSession()
-
         await self.bot.change_presence(
             activity=discord.Activity(
                 type=discord.ActivityType.watching,
@@ -149,21 +143,15 @@ class EvnetReady(commands.Cog):
             )
         )
 
-        with open("data/stats.json", "r") as f:
-            data = json.load(f)
-
-        if data["boot_m"]["sent"] == "true":
+        channel_id = self.bot.stats.reboot_channel_id
+        if channel_id is None:
             return
-        else:
-            for g in self.bot.guilds:
-                for c in g.text_channels:
-                    if c.id == data["boot_m"]["id"]:
-                        try:
-                            await c.send("Rebooted successfully!")
-                            data["boot_m"]["sent"] = "true"
-                            data["boot_m"]["id"] = "null"
-                            with open("data/stats.json", "w") as f:
-                                json.dump(data, f, indent=4)
-                        except Exception as e:
-                            print(e)
-                            pass
\ No newline at end of file
+
+        channel = self.bot.get_channel(channel_id)
+        if channel is not None:
+            try:
+                await channel.send("Rebooted successfully!")
+                self.bot.stats.mark_reboot_sent()
+            except Exception as e:
+                print(e)
+                pass
\ No newline at end of file
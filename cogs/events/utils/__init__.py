@@ -0,0 +1,3 @@
+from .ticker import *
+from .history import *
+from .welcome import *
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import math
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+NAN = float("nan")
+SPARKS = "▁▂▃▄▅▆▇█"
+
+# (name, seconds per slot, seconds kept)
+TIERS: Tuple[Tuple[str, int, int], ...] = (
+    ("24h", 10, 24 * 3600),
+    ("7d", 5 * 60, 7 * 24 * 3600),
+    ("30d", 30 * 60, 30 * 24 * 3600),
+)
+
+
+class RingSeries:
+    """
+    Fixed size ring buffer of prices, one slot per `step` seconds.
+
+    A slot is found from its time alone, so no timestamps are stored, slots
+    that got no price hold NaN. A slot that gets several prices keeps the
+    last one, which downsamples a tier with longer slots.
+    """
+
+    __slots__ = ("step", "size", "values", "head")
+
+    def __init__(self, step: int, span: int) -> None:
+        self.step = step
+        self.size = span // step
+        self.values = array("d", [NAN]) * self.size
+        # number of the newest slot written, None while empty
+        self.head: Optional[int] = None
+
+    def add(self, when: float, value: float) -> None:
+        slot = int(when // self.step)
+        if self.head is None:
+            self.head = slot
+        elif slot > self.head:
+            # blank the slots that were skipped, at most one lap
+            for skipped in range(max(self.head + 1, slot - self.size + 1), slot):
+                self.values[skipped % self.size] = NAN
+            self.head = slot
+        elif slot <= self.head - self.size:
+            return
+        self.values[slot % self.size] = value
+
+    def _slots(self, start: int, end: int) -> range:
+        if self.head is None:
+            return range(0)
+        return range(max(start, self.head - self.size + 1), min(end, self.head) + 1)
+
+    def window(self, seconds: float, now: float) -> List[float]:
+        """The prices of the last `seconds`, oldest first, without gaps."""
+        end = int(now // self.step)
+        start = end - int(seconds // self.step) + 1
+        values = (self.values[slot % self.size] for slot in self._slots(start, end))
+        return [value for value in values if not math.isnan(value)]
+
+    def at(self, when: float, *, tolerance: int = 3) -> Optional[float]:
+        """The price at `when`, or up to `tolerance` slots before it."""
+        slot = int(when // self.step)
+        for candidate in reversed(self._slots(slot - tolerance, slot)):
+            value = self.values[candidate % self.size]
+            if not math.isnan(value):
+                return value
+        return None
+
+
+class PriceHistory:
+    """
+    Price history of every coin and currency in the `TIERS` ring buffers.
+
+    The buffers are allocated up front, so the memory used only depends on
+    the number of series (about 97 KB each).
+    """
+
+    def __init__(self) -> None:
+        # (coin, currency) -> one series per tier
+        self.series: Dict[Tuple[str, str], Tuple[RingSeries, ...]] = {}
+
+    def record(self, prices: Dict[str, Dict[str, float]], when: Optional[float] = None) -> None:
+        when = time.time() if when is None else when
+        for coin, currencies in prices.items():
+            for currency, value in currencies.items():
+                tiers = self.series.get((coin, currency))
+                if tiers is None:
+                    tiers = self.series[(coin, currency)] = tuple(RingSeries(step, span) for _, step, span in TIERS)
+                for series in tiers:
+                    series.add(when, value)
+
+    def window(self, coin: str, currency: str, span: str, now: Optional[float] = None) -> List[float]:
+        """The prices of one of the `TIERS` by name, oldest first."""
+        tiers = self.series.get((coin, currency))
+        if tiers is None:
+            return []
+        for (name, _, seconds), series in zip(TIERS, tiers):
+            if name == span:
+                return series.window(seconds, time.time() if now is None else now)
+        raise ValueError(f"unknown span {span!r}")
+
+    def change(self, coin: str, currency: str, seconds: float, now: Optional[float] = None) -> Optional[float]:
+        """Percent change over the last `seconds`, None without a price back then."""
+        tiers = self.series.get((coin, currency))
+        if tiers is None:
+            return None
+        now = time.time() if now is None else now
+        # the finest tier that reaches back far enough
+        for (_, _, span), series in zip(TIERS, tiers):
+            if seconds < span:
+                break
+        latest = series.at(now)
+        old = series.at(now - seconds)
+        if latest is None or not old:
+            return None
+        return (latest - old) / old * 100
+
+
+def sparkline(values: Sequence[float], width: int = 30) -> str:
+    if not values:
+        return ""
+    if len(values) > width:
+        # average the values into `width` buckets
+        buckets: Iterable[Sequence[float]] = (
+            values[len(values) * i // width:len(values) * (i + 1) // width] for i in range(width)
+        )
+        values = [sum(bucket) / len(bucket) for bucket in buckets]
+
+    low, high = min(values), max(values)
+    if high == low:
+        return SPARKS[len(SPARKS) // 2] * len(values)
+    scale = (len(SPARKS) - 1) / (high - low)
+    return "".join(SPARKS[round((value - low) * scale)] for value in values)
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+import discord
+from discord.ext import tasks
+
+from .history import PriceHistory
+
+if TYPE_CHECKING:
+    from core import Robo
+
+log = logging.getLogger("Robo")
+
+# coingecko id -> name shown in the embed, in the order of the fields
+COINS: Dict[str, str] = {
+    "bitcoin": "Bitcoin",
+    "ethereum": "Ethereum",
+    "litecoin": "Litecoin",
+    "solana": "Solana",
+    "dogecoin": "Dogecoin",
+    "tron": "Tron",
+    "cardano": "Cardano",
+    "monero": "Monero",
+    "binancecoin": "Binance",
+}
+
+SYMBOLS: Dict[str, str] = {
+    "btc": "bitcoin",
+    "eth": "ethereum",
+    "ltc": "litecoin",
+    "sol": "solana",
+    "doge": "dogecoin",
+    "trx": "tron",
+    "ada": "cardano",
+    "xmr": "monero",
+    "bnb": "binancecoin",
+}
+
+PRICE_URL = (
+    "https://api.coingecko.com/api/v3/simple/price"
+    f"?ids={'%2C'.join(COINS)}&vs_currencies=inr%2Cusd"
+)
+
+def find_coin(query: str) -> Optional[str]:
+    """The coingecko id of a coin, by id, name or symbol."""
+    query = query.strip().lower()
+    if query in COINS:
+        return query
+    for coin, name in COINS.items():
+        if name.lower() == query:
+            return coin
+    return SYMBOLS.get(query)
+
+
+EMOJI_UP = "⬆️"
+EMOJI_DOWN = "⬇️"
+
+
+class Subscription:
+    __slots__ = ("guild_id", "channel_id", "message_id", "message", "rendered")
+
+    def __init__(self, bot: Robo, guild_id: int, channel_id: int, message_id: int) -> None:
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.message_id = message_id
+        # editing a partial message needs no fetches, just the ids
+        channel = bot.get_partial_messageable(channel_id, guild_id=guild_id)
+        self.message = channel.get_partial_message(message_id)
+        # the field values last sent to this message
+        self.rendered: Optional[Tuple[str, ...]] = None
+
+
+class CryptoTicker:
+    """
+    Keeps a price embed up to date in every channel subscribed in the
+    `crypto` table, for the guilds on the shards of this process.
+
+    Every tick fetches all prices in one request, renders the embed once and
+    only edits the messages that don't show it yet. The edits are spread
+    over the interval so a lot of subscribers don't hit the rate limits in
+    one burst. Nothing is fetched while there are no subscribers.
+    """
+
+    INTERVAL = 10
+
+    def __init__(self, bot: Robo) -> None:
+        self.bot = bot
+        # guild_id -> subscription, only guilds on the shards of this process
+        self.subscriptions: Dict[int, Subscription] = {}
+        # coin -> {"inr": price, "usd": price}
+        self.prices: Dict[str, Dict[str, float]] = {}
+        # coin -> arrow of the last change, kept while the price stays the same
+        self.directions: Dict[str, str] = {}
+        # every fetched price goes in here too, for the charts
+        self.history = PriceHistory()
+
+    async def load(self) -> None:
+        rows = await self.bot.db.fetchall("SELECT guild_id, channel_id, message_id FROM crypto")
+        self.subscriptions = {
+            guild_id: Subscription(self.bot, guild_id, channel_id, message_id)
+            for guild_id, channel_id, message_id in rows
+            # under the cluster launcher every cluster only updates its own guilds
+            if channel_id is not None and message_id is not None and self.bot.owns_guild(guild_id)
+        }
+
+    async def subscribe(self, guild_id: int, channel_id: int, message_id: int) -> None:
+        await self.bot.db.execute(
+            "INSERT INTO crypto (guild_id, channel_id, message_id) VALUES (?, ?, ?) "
+            "ON CONFLICT (guild_id) DO UPDATE SET channel_id = excluded.channel_id, message_id = excluded.message_id",
+            guild_id, channel_id, message_id
+        )
+        self.subscriptions[guild_id] = Subscription(self.bot, guild_id, channel_id, message_id)
+
+    async def unsubscribe(self, guild_id: int, message_id: Optional[int] = None) -> None:
+        """Removes the ticker of `guild_id`, only if it still uses `message_id` when given."""
+        if message_id is None:
+            await self.bot.db.execute("DELETE FROM crypto WHERE guild_id = ?", guild_id)
+        else:
+            await self.bot.db.execute("DELETE FROM crypto WHERE guild_id = ? AND message_id = ?", guild_id, message_id)
+        sub = self.subscriptions.get(guild_id)
+        if sub is not None and (message_id is None or sub.message_id == message_id):
+            del self.subscriptions[guild_id]
+
+    async def fetch(self) -> None:
+        # a retry that takes longer than a tick is pointless, the next tick retries anyway
+        resp = await self.bot.http_client.get(PRICE_URL, retries=1)
+        if not resp.ok:
+            raise RuntimeError(f"coingecko returned {resp.status}")
+
+        data = resp.json()
+        fresh: Dict[str, Dict[str, float]] = {}
+        for coin in COINS:
+            try:
+                price = {"inr": data[coin]["inr"], "usd": data[coin]["usd"]}
+            except (KeyError, TypeError):
+                continue
+            # compare before the old price is overwritten
+            old = self.prices.get(coin)
+            if old is not None and price["inr"] != old["inr"]:
+                self.directions[coin] = EMOJI_UP if price["inr"] > old["inr"] else EMOJI_DOWN
+            self.prices[coin] = fresh[coin] = price
+        self.history.record(fresh)
+
+    def render(self) -> Tuple[Tuple[str, ...], discord.Embed]:
+        embed = discord.Embed(
+            title="Crypto Price Update",
+            color=self.bot.color,
+            timestamp=discord.utils.utcnow()
+        )
+        values = []
+        for coin, name in COINS.items():
+            price = self.prices.get(coin)
+            if price is None:
+                continue
+            value = f"> ₹ {price['inr']}\n> $ {price['usd']} {self.directions.get(coin, '')}".rstrip()
+            embed.add_field(name=name, value=value)
+            values.append(value)
+        embed.set_footer(text="Last updated")
+        return tuple(values), embed
+
+    async def _edit(self, sub: Subscription, rendered: Tuple[str, ...], embed: discord.Embed) -> None:
+        try:
+            await sub.message.edit(content=None, embed=embed)
+        except (discord.NotFound, discord.Forbidden):
+            # the message or channel is gone, or we can't see it anymore
+            log.info(f"Removing crypto ticker of guild {sub.guild_id}, its message can't be edited")
+            await self.unsubscribe(sub.guild_id, sub.message_id)
+        except discord.HTTPException as e:
+            log.warning(f"Failed to edit crypto ticker of guild {sub.guild_id}: {e}")
+        else:
+            sub.rendered = rendered
+
+    async def tick(self) -> None:
+        if not self.subscriptions:
+            return
+
+        await self.fetch()
+        rendered, embed = self.render()
+        if not rendered:
+            return
+
+        stale = [sub for sub in self.subscriptions.values() if sub.rendered != rendered]
+        if not stale:
+            return
+
+        # leave some room so the last edit is done before the next tick
+        gap = self.INTERVAL * 0.8 / len(stale)
+        for i, sub in enumerate(stale):
+            if i:
+                await asyncio.sleep(gap)
+            await self._edit(sub, rendered, embed)
+
+    @tasks.loop(seconds=INTERVAL)
+    async def ticker(self) -> None:
+        try:
+            await self.tick()
+        except Exception as e:
+            log.error(f"Failed to update crypto prices: {e!r}")
+
+    def start(self) -> None:
+        if not self.ticker.is_running():
+            self.ticker.start()
+
+    def close(self) -> None:
+        self.ticker.cancel()
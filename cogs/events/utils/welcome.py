@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import discord
+
+if TYPE_CHECKING:
+    from core import Robo
+
+log = logging.getLogger("Robo")
+
+DEFAULT_MESSAGE = "Welcome {members}!"
+MEMBERS_PER_EMBED = 40
+# discord's limits for the embeds of one message
+EMBEDS_PER_MESSAGE = 10
+EMBED_CHARS_PER_MESSAGE = 6000
+
+
+class WelcomeConfig:
+    __slots__ = ("guild_id", "channel_id", "message", "image")
+
+    def __init__(self, guild_id: int, channel_id: int, message: Optional[str] = None, image: Optional[str] = None) -> None:
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.message = message
+        self.image = image
+
+
+class WelcomePipeline:
+    """
+    Welcomes new members with the settings of the `welcome` table.
+
+    The settings are kept in memory and the channel comes from the gateway
+    cache, so a join makes no requests until the welcome is sent. Joins are
+    held for `WINDOW` seconds and everyone who joined a guild in that time
+    is welcomed in one message, a raid costs a few messages instead of one
+    per member.
+    """
+
+    WINDOW = 3.0
+
+    def __init__(self, bot: Robo) -> None:
+        self.bot = bot
+        self.configs: Dict[int, WelcomeConfig] = {}
+        # guild_id -> members waiting for their welcome
+        self._pending: Dict[int, List[discord.Member]] = {}
+        self._tasks: Dict[int, asyncio.Task[None]] = {}
+
+    async def load(self) -> None:
+        rows = await self.bot.db.fetchall("SELECT guild_id, channel_id, msg, img FROM welcome")
+        self.configs = {row[0]: WelcomeConfig(*row) for row in rows if row[1] is not None}
+
+    async def set(self, guild_id: int, channel_id: int, message: Optional[str] = None, image: Optional[str] = None) -> None:
+        await self.bot.db.execute(
+            "INSERT INTO welcome (guild_id, channel_id, msg, img) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (guild_id) DO UPDATE SET channel_id = excluded.channel_id, msg = excluded.msg, img = excluded.img",
+            guild_id, channel_id, message, image
+        )
+        self.configs[guild_id] = WelcomeConfig(guild_id, channel_id, message, image)
+
+    async def remove(self, guild_id: int) -> bool:
+        await self.bot.db.execute("DELETE FROM welcome WHERE guild_id = ?", guild_id)
+        self._pending.pop(guild_id, None)
+        return self.configs.pop(guild_id, None) is not None
+
+    def queue(self, member: discord.Member) -> None:
+        guild_id = member.guild.id
+        if guild_id not in self.configs:
+            return
+
+        self._pending.setdefault(guild_id, []).append(member)
+        if guild_id not in self._tasks:
+            self._tasks[guild_id] = asyncio.create_task(self._welcome_later(guild_id))
+
+    async def _welcome_later(self, guild_id: int) -> None:
+        try:
+            await asyncio.sleep(self.WINDOW)
+        finally:
+            self._tasks.pop(guild_id, None)
+
+        members = self._pending.pop(guild_id, [])
+        config = self.configs.get(guild_id)
+        if not members or config is None:
+            return
+        try:
+            await self.welcome(config, members)
+        except Exception as e:
+            log.error(f"Failed to welcome {len(members)} members in guild {guild_id}: {e!r}")
+
+    def render(self, config: WelcomeConfig, guild: discord.Guild, members: List[discord.Member]) -> List[discord.Embed]:
+        template = config.message or DEFAULT_MESSAGE
+        if "{members}" not in template:
+            template += "\n{members}"
+        # plain replace, a stray brace in a custom message must not break it
+        template = template.replace("{server}", guild.name).replace("{count}", str(guild.member_count))
+
+        embeds = []
+        for start in range(0, len(members), MEMBERS_PER_EMBED):
+            chunk = members[start:start + MEMBERS_PER_EMBED]
+            embed = discord.Embed(
+                title=f"Welcome to {guild.name}",
+                description=template.replace("{members}", ", ".join(member.mention for member in chunk)),
+                color=chunk[0].accent_color if len(members) == 1 else self.bot.color,
+            )
+            if len(members) == 1:
+                embed.set_thumbnail(url=chunk[0].display_avatar.url)
+            if config.image:
+                embed.set_image(url=config.image)
+            footer = f"You are #{guild.member_count}" if len(members) == 1 else f"{len(members)} new members"
+            embed.set_footer(icon_url=self.bot.user.display_avatar.url, text=footer)
+            embeds.append(embed)
+        return embeds
+
+    async def welcome(self, config: WelcomeConfig, members: List[discord.Member]) -> None:
+        guild = members[0].guild
+        channel = guild.get_channel(config.channel_id)
+        if not isinstance(channel, discord.abc.Messageable):
+            log.info(f"Welcome channel {config.channel_id} of guild {guild.id} is gone")
+            return
+        if not channel.permissions_for(guild.me).send_messages:
+            return
+
+        # members who already left don't need a welcome
+        members = [member for member in members if guild.get_member(member.id) is not None]
+        if not members:
+            return
+
+        batch: List[discord.Embed] = []
+        size = 0
+        for embed in self.render(config, guild, members):
+            if batch and (len(batch) == EMBEDS_PER_MESSAGE or size + len(embed) > EMBED_CHARS_PER_MESSAGE):
+                await channel.send(embeds=batch)
+                batch, size = [], 0
+            batch.append(embed)
+            size += len(embed)
+        await channel.send(embeds=batch)
+
+    def close(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self._pending.clear()
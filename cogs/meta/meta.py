@@ -1,17 +1,16 @@
 import ast
-import json
 import os
 import platform
 import sys
 import unicodedata
 from datetime import datetime, timezone
-from typing import Union
-import aiohttp
+from typing import Any, Union
 import discord
 import psutil
 from discord.ext import commands
 import time
 from core import Robo
+from utils.cache import AsyncCache
 from utils.context import Context
 from utils.paginator import SimplePages
 from utils.formats import truncate_string
@@ -27,6 +26,7 @@ class Meta(commands.Cog):
         "Accept": "application/vnd.github+json",
         "Authorization": f"Bearer {config.git_token}"
     }
+        self.github_cache: AsyncCache[Any] = AsyncCache("github", ttl=600, stale_ttl=3600, maxsize=256)
 
     @property
     def display_emoji(self) -> discord.PartialEmoji:
@@ -36,11 +36,10 @@ class Meta(commands.Cog):
         )
     
     async def dblatency(self):
-        async with self.bot.db.cursor() as cur:
-            t1 = time.perf_counter()
-            await cur.execute("SELECT * FROM tickets")
-            t2 = time.perf_counter()
-            return round((t2-t1)*1000+2)
+        t1 = time.perf_counter()
+        await self.bot.db.fetchall("SELECT * FROM tickets")
+        t2 = time.perf_counter()
+        return round((t2-t1)*1000)
         
 
     @commands.hybrid_command(name="ping")
@@ -66,14 +65,22 @@ class Meta(commands.Cog):
             )
         await ctx.reply(embed=embed)
 
+    async def github_get(self, path: str, *, auth: bool = False) -> Any:
+        """GETs a GitHub API path through the cache, rate limit and server errors aren't cached."""
+        async def fetch() -> Any:
+            resp = await self.bot.http_client.get(f"https://api.github.com{path}", headers=self.github_headers if auth else None)
+            if resp.status in (403, 429) or resp.status >= 500:
+                raise RuntimeError(f"GitHub returned {resp.status}")
+            return resp.json()
+
+        return await self.github_cache.get_or_fetch((path, auth), fetch)
+
     async def get_latest_change(self):
-        async with aiohttp.ClientSession(headers=self.bot.config.github_headers) as session:
-            async with session.get(f"https://api.github.com/repos/0xhimangshu/Robo/commits?per_page=3") as r:
-                data = await r.json()
-                c = []
-                for i in range(3):
-                    c.append((data[i]['sha'], data[i]['commit']['message'], data[i]['commit']['author']['name'], data[i]['commit']['author']['date'], data[i]['html_url']))
-                return c
+        data = await self.github_get("/repos/0xhimangshu/Robo/commits?per_page=3", auth=True)
+        c = []
+        for i in range(3):
+            c.append((data[i]['sha'], data[i]['commit']['message'], data[i]['commit']['author']['name'], data[i]['commit']['author']['date'], data[i]['html_url']))
+        return c
             
     async def _commits(self):
         commits = await self.get_latest_change()
@@ -110,8 +117,7 @@ class Meta(commands.Cog):
     @commands.hybrid_command()
     async def stats(self, ctx: Context):
         """Get the bot's stats."""
-        with open("data/stats.json", "r") as f:
-            data = json.load(f)
+        stats = self.bot.stats
 
         mem = round(psutil.Process(os.getpid()).memory_info().rss / 1024 ** 2)
         tmem = round(psutil.virtual_memory().total / 1024 / 1024)
@@ -121,12 +127,21 @@ class Meta(commands.Cog):
         dpyversion = discord.__version__
 
         uptime = discord.utils.format_dt(self.bot.uptime, "R")
-        booted = data["booted"]
-        commands_ran = data["commands_ran"]
-        messages_seen = data["messages_seen"]
+        booted = stats.booted
+        commands_ran = stats.commands_ran
+        messages_seen = stats.messages_seen
+        top_commands = ", ".join(f"`{name}` ({count})" for name, count in stats.command_uses.most_common(3)) or "None"
 
         guilds = len(self.bot.guilds)
         users = len(self.bot.users)
+        clusters = ""
+        if self.bot.cluster is not None:
+            reports = await self.bot.cluster.stats()
+            guilds = sum(r["guilds"] for r in reports)
+            users = sum(r["users"] for r in reports)
+            commands_ran = sum(r["commands_ran"] for r in reports)
+            messages_seen = sum(r["messages_seen"] for r in reports)
+            clusters = f"**Clusters:** {len(reports)} (this is cluster {self.bot.cluster_id})\n"
         cachedmsg = len(self.bot.cached_messages)
 
         commands = len(self.bot.commands)
@@ -143,12 +158,15 @@ class Meta(commands.Cog):
             "\n"
             f"**__Bot Stats__**\n"
             f"**Uptime:** {uptime}\n"
+            f"**Booted:** {booted} times\n"
             f"**Commands Ran:** {commands_ran}\n"
+            f"**Top Commands:** {top_commands}\n"
             f"**Messages Seen:** {messages_seen}, {cachedmsg} cached\n"
             f"**Guilds:** {guilds}\n"
             f"**Users:** {users}\n"
             f"**Shards:** {shards}\n"
-            f"**Shard ID:** {shard_id}\n"
+            f"{clusters}"
+            f"**Shard ID:** {shard_id} ({stats.shard_messages[shard_id]} messages seen)\n"
             f"**Latency:** {latency}ms\n"
             f"**DB Latency:** {dblatency}ms\n"
             f"**Memory:** {mem}MB/{tmem}MB\n"
@@ -287,22 +305,13 @@ class Meta(commands.Cog):
         await ctx.send_help(ctx.command)
 
     async def get_user_repos(self, user: str):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://api.github.com/users/{user}/repos") as r:
-                data = await r.json()
-                return data
+        return await self.github_get(f"/users/{user}/repos")
             
     async def get_repo(self, user: str, repo: str):
-        async with aiohttp.ClientSession(headers=self.github_headers) as session:
-            async with session.get(f"https://api.github.com/repos/{user}/{repo}") as r:
-                data = await r.json()
-                return data
+        return await self.github_get(f"/repos/{user}/{repo}", auth=True)
             
     async def get_user(self, user: str):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://api.github.com/users/{user}") as r:
-                data = await r.json()
-                return data
+        return await self.github_get(f"/users/{user}")
             
 
     @github.command(name="repo")
@@ -383,10 +392,7 @@ class Meta(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def prefix(self, ctx: Context):
         """Get the bot's prefix."""
-        async with self.bot.db.cursor() as cur:
-            await cur.execute("SELECT prefix FROM guilds WHERE id = ?", (ctx.guild.id,))
-            prefix = await cur.fetchone()
-            prefix = prefix[0]
+        prefix = self.bot.prefixes.get(ctx.guild.id) or config.prefixes[0]
         await ctx.send(f"My prefix is `{prefix}`")
 
     @prefix.command(name="set")
@@ -394,13 +400,11 @@ class Meta(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def prefix_set(self, ctx: Context, prefix: str):
         """Set the bot's prefix."""
-        async with self.bot.db.cursor() as cur:
-            await cur.execute("SELECT prefix FROM guilds WHERE id = ?", (ctx.guild.id,))
-            data = await cur.fetchone()
-            if data is None:
-                await cur.execute("INSERT INTO guilds VALUES (?, ?)", (ctx.guild.id, prefix))
-            await cur.execute("UPDATE guilds SET prefix = ? WHERE id = ?", (prefix, ctx.guild.id))
-        await self.bot.db.commit()
+        await self.bot.db.execute(
+            "INSERT INTO guilds (id, prefix) VALUES (?, ?) ON CONFLICT (id) DO UPDATE SET prefix = excluded.prefix",
+            ctx.guild.id, prefix
+        )
+        self.bot.prefixes.set_guild_prefix(ctx.guild.id, prefix)
         await ctx.send(f"Prefix set to `{prefix}`")
 
     @prefix.command(name="reset")
@@ -408,7 +412,6 @@ class Meta(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def prefix_reset(self, ctx: Context):
         """Reset the bot's prefix."""
-        async with self.bot.db.cursor() as cur:
-            await cur.execute("DELETE FROM guilds WHERE id = ?", (ctx.guild.id,))
-        await self.bot.db.commit()
+        await self.bot.db.execute("DELETE FROM guilds WHERE id = ?", ctx.guild.id)
+        self.bot.prefixes.reset_guild_prefix(ctx.guild.id)
         await ctx.send(f"Prefix reset to `{config.prefixes[0]}`")
\ No newline at end of file
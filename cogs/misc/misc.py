@@ -2,36 +2,42 @@ from __future__ import annotations
 
 import asyncio
 import datetime
+import gzip
 import io
 import json
 import logging
+import math
 import os
 import random
 import re
 import string
+import time
 import zlib
-import aiohttp
 from typing import (TYPE_CHECKING, Annotated, Any, Generator, List, NamedTuple,
-                    Optional, Union)
+                    Optional, Tuple, Union)
 from collections import Counter
 
 import discord
 import yarl
 from discord import app_commands
 from discord.ext import commands, menus, tasks
-from lxml import html
+from lxml import etree, html
 from typing_extensions import Self
 
 from core import Robo
 from utils import Pages, fuzzy
+from utils.cache import AsyncCache
+from utils.singleflight import SingleFlight
+from utils.suggestions import SuggestionCache
 from utils.context import Context
 from utils.friendlytime import format_datetime_human_readable, time_formatter
 from utils.paginator import SimplePages
 from utils.formats import truncate_string, plural
 from utils.friendlytime import format_relative
+from utils.translator import Translator
 import config
 
-from .utils import translate, TagEdit, TagEditButton
+from .utils import TagCache, TagEdit, TagEditButton
 
 log = logging.getLogger(__name__)
 
@@ -133,6 +139,10 @@ class FreeDictionaryDefinition(NamedTuple):
             'children': [child.to_json() for child in self.children],
         }
 
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> Self:
+        return cls(data['definition'], data['example'], [cls.from_json(child) for child in data['children']])
+
     def to_markdown(self, *, indent: int = 2) -> str:
         content = self.definition
         if self.example:
@@ -158,6 +168,13 @@ class FreeDictionaryMeaning:
     def to_json(self) -> dict[str, Any]:
         return {'part_of_speech': self.part_of_speech, 'definitions': [defn.to_json() for defn in self.definitions]}
 
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> Self:
+        self = cls.__new__(cls)
+        self.part_of_speech = data['part_of_speech']
+        self.definitions = [FreeDictionaryDefinition.from_json(defn) for defn in data['definitions']]
+        return self
+
     @property
     def markdown(self) -> str:
         inner = '\n'.join(f'{i}. {defn.to_markdown()}' for i, defn in enumerate(self.definitions, start=1))
@@ -288,6 +305,80 @@ class FreeDictionaryWord:
             'etymology': self.etymology,
         }
 
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> Self:
+        # the parsing happens in __init__, so it is skipped entirely here
+        self = cls.__new__(cls)
+        self.raw_word = data['raw_word']
+        self.word = data['word']
+        self.pronunciation_url = data['pronunciation_url']
+        self.pronunciation = data['pronunciation']
+        self.meanings = [FreeDictionaryMeaning.from_json(meaning) for meaning in data['meanings']]
+        self.phrasal_verbs = [
+            FreeDictionaryPhrasalVerb(verb['word'], FreeDictionaryMeaning.from_json(verb['meaning']))
+            for verb in data['phrasal_verbs']
+        ]
+        self.etymology = data['etymology']
+        return self
+
+
+def find_definition_node(text: str, *, chunk_size: int = 16384) -> Tuple[Optional[str], Optional[Any]]:
+    """
+    Parses a page only up to the end of its #Definition element.
+
+    Returns the text of the first <h1> (the headword) and the #Definition element.
+    """
+    parser = etree.HTMLPullParser(events=('start', 'end'))
+    # keeps the HtmlElement helpers (text_content, find_class) the parsing code relies on
+    parser.set_element_class_lookup(html.HtmlElementClassLookup())
+
+    headword = None
+    target = None
+    try:
+        for start in range(0, len(text), chunk_size):
+            parser.feed(text[start:start + chunk_size])
+            for event, element in parser.read_events():
+                if event == 'end' and headword is None and element.tag == 'h1':
+                    # read before the element gets cleared below
+                    headword = element.text
+                if target is None:
+                    if event == 'start' and element.get('id') == 'Definition':
+                        target = element
+                    elif event == 'end':
+                        # nothing before the definitions is needed, don't keep it around
+                        element.clear()
+                elif event == 'end' and element is target:
+                    return headword, target
+        return headword, target
+    finally:
+        try:
+            parser.close()
+        except etree.LxmlError:
+            # the page was cut short on purpose, the parser may complain about it
+            pass
+
+
+def parse_free_dictionary_page(text: str, word: str, url: yarl.URL) -> Optional[FreeDictionaryWord]:
+    # this is blocking, it runs in a worker thread
+    headword, definitions = find_definition_node(text)
+    if definitions is None:
+        return None
+
+    section = definitions.xpath("section[@data-src='hm' or @data-src='hc_dict' or @data-src='rHouse']")
+    if not section:
+        return None
+
+    node = section[0]
+    h2: Optional[Any] = node.find('h2')
+    if h2 is None:
+        return None
+
+    try:
+        return FreeDictionaryWord(headword or word, h2.text, node, url)
+    except RuntimeError:
+        log.exception('Error happened while parsing free dictionary')
+        return None
+
 
 async def parse_free_dictionary_for_word(session: ClientSession, *, word: str) -> Optional[FreeDictionaryWord]:
     url = yarl.URL('https://www.thefreedictionary.com') / word
@@ -307,34 +398,14 @@ async def parse_free_dictionary_for_word(session: ClientSession, *, word: str) -
     }
 
     async with session.get(url, headers=headers) as resp:
-        if resp.status != 200:
+        if resp.status == 404:
             return None
+        if resp.status != 200:
+            # raised so a rate limit or an outage doesn't get cached as a missing word
+            raise RuntimeError(f'{resp.status} {resp.reason}')
 
         text = await resp.text()
-        document = html.document_fromstring(text)
-
-        try:
-            definitions = document.get_element_by_id('Definition')
-        except KeyError:
-            return None
-
-        h1 = document.find('h1')
-        raw_word = h1.text if h1 is not None else word
-
-        section = definitions.xpath("section[@data-src='hm' or @data-src='hc_dict' or @data-src='rHouse']")
-        if not section:
-            return None
-
-        node = section[0]
-        h2: Optional[Any] = node.find('h2')
-        if h2 is None:
-            return None
-
-        try:
-            return FreeDictionaryWord(raw_word, h2.text, node, resp.url)
-        except RuntimeError:
-            log.exception('Error happened while parsing free dictionary')
-            return None
+        return await asyncio.to_thread(parse_free_dictionary_page, text, word, resp.url)
 
 
 async def free_dictionary_autocomplete_query(session: ClientSession, *, query: str) -> list[str]:
@@ -437,6 +508,27 @@ RTFM_PAGE_TYPES = {
     'python': 'https://docs.python.org/3',
 }
 
+RTFM_CACHE_PATH = 'data/rtfm.json.gz'
+
+# parsed dictionary entries in the database are used for this long
+DICTIONARY_CACHE_TTL = 30 * 24 * 3600
+
+# how much tag_uses counts next to the text relevance in tag search
+TAG_USES_WEIGHT = 0.1
+
+
+def _read_rtfm_cache() -> dict[str, Any]:
+    with gzip.open(RTFM_CACHE_PATH, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_rtfm_cache(data: dict[str, Any]) -> None:
+    tmp = RTFM_CACHE_PATH + '.tmp'
+    with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp, RTFM_CACHE_PATH)
+
+
 class SphinxObjectFileReader:
     # Inspired by Sphinx's InventoryFileReader
     BUFSIZE = 16 * 1024
@@ -471,17 +563,67 @@ class SphinxObjectFileReader:
 
 class Misc(commands.Cog):
     """Misclenous commands for your server."""
-    _rtfm_cache: dict[str, dict[str, str]] 
     def __init__(self, bot: Robo):
         self.bot = bot
+        # filled from data/rtfm.json.gz right away, then refreshed in the background
+        self._rtfm_cache: dict[str, dict[str, str]] = {}
+        self._rtfm_meta: dict[str, dict[str, Optional[str]]] = {}
+        self._rtfm_index: dict[str, fuzzy.FinderIndex[str]] = {}
         self.ctx_menu = app_commands.ContextMenu(
             name='translate_',
             callback=self.translate_ctx,
         )
         self.bot.tree.add_command(self.ctx_menu)
+        self.urban_cache: AsyncCache[list[dict[str, Any]]] = AsyncCache('urban', ttl=3600, stale_ttl=6 * 3600, maxsize=512)
+        self.dictionary_cache: AsyncCache[Optional[FreeDictionaryWord]] = AsyncCache('dictionary', ttl=24 * 3600, maxsize=512)
+        self.translator = Translator(bot.http_client)
+        self.thumbnail_cache: AsyncCache[str] = AsyncCache('spotify_thumbnail', ttl=7 * 24 * 3600, maxsize=1024)
+        self._flights: SingleFlight[Any] = SingleFlight()
+        self.define_suggestions = SuggestionCache(
+            lambda prefix: free_dictionary_autocomplete_query(self.bot.session, query=prefix)
+        )
+        self.tags = TagCache(bot)
 
     async def cog_unload(self) -> None:
         self.bot.tree.remove_command(self.ctx_menu.name, type=self.ctx_menu.type)
+        self.refresh_rtfm.cancel()
+        await self.tags.close()
+
+    async def urban_lookup(self, word: str) -> list[dict[str, Any]]:
+        async def fetch() -> list[dict[str, Any]]:
+            url = 'http://api.urbandictionary.com/v0/define'
+            async with self.bot.session.get(url, params={'term': word}) as resp:
+                if resp.status != 200:
+                    raise RuntimeError(f'{resp.status} {resp.reason}')
+
+                js = await resp.json()
+                return js.get('list', [])
+
+        return await self.urban_cache.get_or_fetch(word.lower(), fetch)
+
+    async def dictionary_lookup(self, word: str) -> Optional[FreeDictionaryWord]:
+        key = word.lower()
+
+        async def fetch() -> Optional[FreeDictionaryWord]:
+            row = await self.bot.db.fetchone(
+                "SELECT data FROM dictionary_cache WHERE word = ? AND fetched_at > ?",
+                key, time.time() - DICTIONARY_CACHE_TTL
+            )
+            if row is not None:
+                return FreeDictionaryWord.from_json(json.loads(row[0]))
+
+            result = await parse_free_dictionary_for_word(self.bot.session, word=word)
+            if result is not None:
+                try:
+                    await self.bot.db.execute(
+                        "INSERT OR REPLACE INTO dictionary_cache (word, data, fetched_at) VALUES (?, ?, ?)",
+                        key, json.dumps(result.to_json()), time.time()
+                    )
+                except Exception as e:
+                    log.warning(f'Could not store the dictionary entry for {key!r}: {e}')
+            return result
+
+        return await self.dictionary_cache.get_or_fetch(key, fetch)
 
     @property
     def display_emoji(self) -> discord.PartialEmoji:
@@ -546,24 +688,90 @@ class Misc(commands.Cog):
         return result
 
     async def build_rtfm_lookup_table(self):
-        cache: dict[str, dict[str, str]] = {}
-        for key, page in RTFM_PAGE_TYPES.items():
-            cache[key] = {}
-            async with self.bot.session.get(page + '/objects.inv') as resp:
-                if resp.status != 200:
-                    raise RuntimeError('Cannot build rtfm lookup table, try again later.')
+        # every command and autocomplete that finds the table missing waits on the same build
+        await self._flights.do('rtfm', self._build_rtfm_lookup_table)
+
+    async def _fetch_rtfm_inventory(self, key: str, page: str) -> bool:
+        """Refreshes one inventory with a conditional request, returns whether it changed."""
+        meta = self._rtfm_meta.get(key, {})
+        headers = {}
+        if key in self._rtfm_cache:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        resp = await self.bot.http_client.get(page + '/objects.inv', headers=headers)
+        if resp.status == 304:
+            return False
+        if resp.status != 200:
+            raise RuntimeError(f'Cannot fetch the {key} rtfm inventory, got {resp.status}.')
+
+        # parsing the inventory is pure CPU work, keep it off the event loop
+        entries = await asyncio.to_thread(self.parse_object_inv, SphinxObjectFileReader(resp.body), page)
+        index = await asyncio.to_thread(fuzzy.FinderIndex, entries.items())
+        self._rtfm_cache[key] = entries
+        self._rtfm_index[key] = index
+        self._rtfm_meta[key] = {
+            'etag': resp.headers.get('ETag'),
+            'last_modified': resp.headers.get('Last-Modified'),
+        }
+        return True
+
+    async def _build_rtfm_lookup_table(self):
+        results = await asyncio.gather(
+            *(self._fetch_rtfm_inventory(key, page) for key, page in RTFM_PAGE_TYPES.items()),
+            return_exceptions=True,
+        )
+
+        changed = False
+        for key, result in zip(RTFM_PAGE_TYPES, results):
+            if isinstance(result, BaseException):
+                log.warning(f'Refreshing the {key} rtfm inventory failed: {result}')
+            else:
+                changed = changed or result
+
+        if not self._rtfm_cache:
+            raise RuntimeError('Cannot build rtfm lookup table, try again later.')
+
+        if changed:
+            data = {key: {**self._rtfm_meta.get(key, {}), 'entries': entries} for key, entries in self._rtfm_cache.items()}
+            await asyncio.to_thread(_write_rtfm_cache, data)
+
+    def _load_rtfm_cache(self) -> None:
+        try:
+            data = _read_rtfm_cache()
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            log.warning('The rtfm cache is unreadable, it will be downloaded again')
+            return
+
+        for key, value in data.items():
+            if key not in RTFM_PAGE_TYPES:
+                continue
+            self._rtfm_cache[key] = value.pop('entries')
+            self._rtfm_meta[key] = value
+            self._rtfm_index[key] = fuzzy.FinderIndex(self._rtfm_cache[key].items())
 
-                stream = SphinxObjectFileReader(await resp.read())
-                cache[key] = self.parse_object_inv(stream, page)
+    async def cog_load(self) -> None:
+        await asyncio.to_thread(self._load_rtfm_cache)
+        self.refresh_rtfm.start()
+        self.tags.start()
 
-        self._rtfm_cache = cache
+    @tasks.loop(hours=6)
+    async def refresh_rtfm(self):
+        try:
+            await self.build_rtfm_lookup_table()
+        except Exception as e:
+            log.warning(f'Refreshing the rtfm lookup table failed: {e}')
 
     async def do_rtfm(self, ctx: Context, key: str, obj: Optional[str]):
         if obj is None:
             await ctx.send(RTFM_PAGE_TYPES[key])
             return
 
-        if not hasattr(self, '_rtfm_cache'):
+        if key not in self._rtfm_cache:
             await ctx.typing()
             await self.build_rtfm_lookup_table()
 
@@ -579,8 +787,8 @@ class Misc(commands.Cog):
                     obj = f'abc.Messageable.{name}'
                     break
 
-        cache = list(self._rtfm_cache[key].items())
-        matches = fuzzy.finder(obj, cache, key=lambda t: t[0])[:8]
+        index = self._rtfm_index.get(key)
+        matches = index.search(obj, limit=8) if index is not None else []
 
         e = discord.Embed(colour=self.bot.config.color)
         if len(matches) == 0:
@@ -594,7 +802,7 @@ class Misc(commands.Cog):
     ) -> list[app_commands.Choice[str]]:
 
         # Degenerate case: not having built caching yet
-        if not hasattr(self, '_rtfm_cache'):
+        if not self._rtfm_cache:
             await interaction.response.autocomplete([])
             await self.build_rtfm_lookup_table()
             return []
@@ -613,8 +821,11 @@ class Misc(commands.Cog):
             key = 'stable'
         elif key == 'python':
             key = 'python'
-        matches = fuzzy.finder(current, self._rtfm_cache[key])[:10]
-        return [app_commands.Choice(name=m, value=m) for m in matches]
+        index = self._rtfm_index.get(key)
+        if index is None:
+            return []
+        matches = index.search(current, limit=10)
+        return [app_commands.Choice(name=m, value=m) for m, _ in matches]
     
 
     @commands.hybrid_group(aliases=['rtfd'], fallback="stable")
@@ -863,10 +1074,13 @@ class Misc(commands.Cog):
 
     async def generate_thumbnail(self, url: str):
         identifier = self.extract_track_id(url)
-        async with aiohttp.ClientSession() as s:
-            async with s.get(f"https://embed.spotify.com/oembed/?url=spotify:track:{identifier}") as r:
-                data = await r.json()
-                return data['thumbnail_url']
+
+        async def fetch() -> str:
+            data = await self.bot.http_client.get_json(f"https://embed.spotify.com/oembed/?url=spotify:track:{identifier}")
+            return data['thumbnail_url']
+
+        # a track's cover never changes
+        return await self.thumbnail_cache.get_or_fetch(identifier, fetch)
 
     @commands.hybrid_command(aliases=["ac", "actv"])
     @commands.guild_only()
@@ -925,7 +1139,11 @@ class Misc(commands.Cog):
     async def _define(self, ctx: Context, *, word: Optional[str] = None):
         """Looks up an English word in the dictionary."""
 
-        result = await parse_free_dictionary_for_word(self.bot.session, word=word)
+        try:
+            result = await self.dictionary_lookup(word)
+        except RuntimeError as e:
+            return await ctx.send(f'An error occurred: {e}')
+
         if result is None:
             return await ctx.send('Could not find that word.', ephemeral=True)
 
@@ -945,15 +1163,13 @@ class Misc(commands.Cog):
     async def urban(self, ctx: Context, *, word: Optional[str] = None):
         """Searches urban dictionary."""
 
-        url = 'http://api.urbandictionary.com/v0/define'
-        async with self.bot.session.get(url, params={'term': word}) as resp:
-            if resp.status != 200:
-                return await ctx.send(f'An error occurred: {resp.status} {resp.reason}')
+        try:
+            data = await self.urban_lookup(word)
+        except RuntimeError as e:
+            return await ctx.send(f'An error occurred: {e}')
 
-            js = await resp.json()
-            data = js.get('list', [])
-            if not data:
-                return await ctx.send('No results found, sorry.')
+        if not data:
+            return await ctx.send('No results found, sorry.')
 
         pages = Pages(UrbanDictionaryPageSource(data), ctx=ctx)
         await pages.start()
@@ -964,7 +1180,11 @@ class Misc(commands.Cog):
     async def _define_word(self, ctx: Context, *, word: str):
         """Looks up an English word in the dictionary."""
 
-        result = await parse_free_dictionary_for_word(self.bot.session, word=word)
+        try:
+            result = await self.dictionary_lookup(word)
+        except RuntimeError as e:
+            return await ctx.send(f'An error occurred: {e}')
+
         if result is None:
             return await ctx.send('Could not find that word.', ephemeral=True)
 
@@ -984,15 +1204,13 @@ class Misc(commands.Cog):
     async def _define_urban(self, ctx: Context, *, word: str):
         """Searches urban dictionary."""
 
-        url = 'http://api.urbandictionary.com/v0/define'
-        async with self.bot.session.get(url, params={'term': word}) as resp:
-            if resp.status != 200:
-                return await ctx.send(f'An error occurred: {resp.status} {resp.reason}')
+        try:
+            data = await self.urban_lookup(word)
+        except RuntimeError as e:
+            return await ctx.send(f'An error occurred: {e}')
 
-            js = await resp.json()
-            data = js.get('list', [])
-            if not data:
-                return await ctx.send('No results found, sorry.')
+        if not data:
+            return await ctx.send('No results found, sorry.')
 
         pages = Pages(UrbanDictionaryPageSource(data), ctx=ctx)
         await pages.start()
@@ -1001,10 +1219,7 @@ class Misc(commands.Cog):
     async def _define_word_autocomplete(
         self, interaction: discord.Interaction, query: str
     ) -> list[app_commands.Choice[str]]:
-        if not query:
-            return []
-
-        result = await free_dictionary_autocomplete_query(self.bot.session, query=query)
+        result = await self.define_suggestions.suggest(interaction.user.id, query)
         return [app_commands.Choice(name=word, value=word) for word in result][:25]
     
     @commands.hybrid_command()
@@ -1022,7 +1237,7 @@ class Misc(commands.Cog):
                     return await ctx.send('Missing a message to translate')
 
             try:
-                result = await translate(message, session=self.bot.session)
+                result = await self.translator.translate(message)
             except Exception as e:
                 return await ctx.send(f'An error occurred: {e.__class__.__name__}: {e}')
 
@@ -1035,7 +1250,7 @@ class Misc(commands.Cog):
         """Translates a message to English using Google translate.
         """
         try:
-            result = await translate(message.content, session=self.bot.session)
+            result = await self.translator.translate(message.content)
             
             embed = discord.Embed(colour=self.bot.color)
             embed.add_field(name=f'{result.source_language} ->', value=result.original)
@@ -1061,6 +1276,54 @@ class Misc(commands.Cog):
         result_str = ''.join(random.choice(letters_and_digits) for i in range(6))
         return result_str
 
+    async def search_tags(self, guild_id: int, query: str, *, limit: int = 20) -> list[tuple[str, int]]:
+        """Full text search over the names and content of a guild's tags, needs 3+ characters."""
+        # a quoted string is a plain substring for the trigram tokenizer, no query syntax
+        phrase = '"' + query.replace('"', '""') + '"'
+        rows = await self.bot.db.fetchall(
+            """
+            SELECT tags.tag_name, tags.tag_uses, bm25(tags_fts, 10.0, 1.0)
+            FROM tags_fts
+            JOIN tags ON tags.rowid = tags_fts.rowid
+            WHERE tags_fts MATCH ? AND tags.tag_guild_id = ?
+            ORDER BY bm25(tags_fts, 10.0, 1.0)
+            LIMIT ?
+            """,
+            phrase, guild_id, limit * 5
+        )
+        # bm25 is negative, lower is better, popular tags are pulled up a bit
+        rows.sort(key=lambda row: row[2] * (1 + TAG_USES_WEIGHT * math.log1p(row[1] or 0)))
+        return [(row[0], row[1]) for row in rows[:limit]]
+
+    async def tag_search_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        if interaction.guild_id is None:
+            return []
+
+        if len(current) >= 3:
+            names = [name for name, _ in await self.search_tags(interaction.guild_id, current, limit=25)]
+        elif current:
+            # too short for trigrams, most used tags starting with it
+            rows = await self.bot.db.fetchall(
+                """
+                SELECT tag_name FROM tags
+                WHERE tag_guild_id = ? AND tag_name >= ? AND tag_name < ?
+                ORDER BY tag_uses DESC
+                LIMIT 25
+                """,
+                interaction.guild_id, current, current + '\U0010ffff'
+            )
+            names = [row[0] for row in rows]
+        else:
+            rows = await self.bot.db.fetchall(
+                "SELECT tag_name FROM tags WHERE tag_guild_id = ? ORDER BY tag_uses DESC LIMIT 25",
+                interaction.guild_id
+            )
+            names = [row[0] for row in rows]
+
+        return [app_commands.Choice(name=name, value=name) for name in names if len(name) <= 100]
+
     @commands.hybrid_group()
     @app_commands.describe(tag="The tag to search for")
     async def tag(self, ctx: Context, tag: Optional[str] = None):
@@ -1082,25 +1345,15 @@ class Misc(commands.Cog):
         if ctx.interaction:
             await ctx.interaction.response.defer()
 
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                "SELECT * FROM tags WHERE tag_name = ? OR tag_id = ?",
-                (search, search)
-            )
-            data = await cur.fetchone()
-            if not data:
-                return await ctx.reply("That tag doesn't exist!")
-            
-            await ctx.channel.send(data[2])
-            if ctx.interaction:
-                await ctx.send(data[2])
-
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                "UPDATE tags SET tag_uses = tag_uses + 1 WHERE tag_name = ? OR tag_id = ?",
-                (search, search)
-            )
-            await self.bot.db.commit()
+        data = await self.tags.get(ctx.guild.id if ctx.guild else None, search)
+        if not data:
+            return await ctx.reply("That tag doesn't exist!")
+
+        await ctx.channel.send(data[2])
+        if ctx.interaction:
+            await ctx.send(data[2])
+
+        self.tags.record_use(ctx.guild.id if ctx.guild else None, data)
        
 
     @tag.command(name="create")
@@ -1124,49 +1377,39 @@ class Misc(commands.Cog):
         
         random_id = self.generate_id()
 
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                """
-                SELECT * FROM tags WHERE tag_name = ? AND tag_guild_id = ?
-                """,
-                (name, ctx.guild.id)
-            )
-            if await cur.fetchone():
-                return await ctx.reply("That tag already exists!")
-            
-            data = await cur.fetchall()
-            
-            for row in data:
-                if row[0] == name:
-                    return await ctx.reply("That tag already exists!")
-                
-                if row[1] == random_id:
-                    random_id = self.generate_id()
-                
-            await cur.execute(
-                """
-                INSERT INTO tags (tag_id, tag_name, tag_content, tag_owner_id, tag_guild_id, tag_uses, tag_created_at) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    random_id,
-                    name,
-                    content,
-                    ctx.author.id,
-                    ctx.guild.id,
-                    0,
-                    ctx.message.created_at
-                )
-            )
-            await self.bot.db.commit()
-            embed=discord.Embed()
-            embed.description = f"<:plus:1172608535050338434> | **Name:** `{name}` **ID:** `{random_id}`"
-            embed.color = self.bot.color
-            await ctx.channel.send(embed=embed)
-            if ctx.interaction:
-                await ctx.interaction.followup.send(embed=embed)
+        exists = await self.bot.db.fetchone(
+            "SELECT 1 FROM tags WHERE tag_name = ? AND tag_guild_id = ?",
+            name, ctx.guild.id
+        )
+        if exists:
+            return await ctx.reply("That tag already exists!")
+
+        while await self.bot.db.fetchone("SELECT 1 FROM tags WHERE tag_id = ?", random_id):
+            random_id = self.generate_id()
+
+        await self.bot.db.execute(
+            """
+            INSERT INTO tags (tag_id, tag_name, tag_content, tag_owner_id, tag_guild_id, tag_uses, tag_created_at) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            random_id,
+            name,
+            content,
+            ctx.author.id,
+            ctx.guild.id,
+            0,
+            ctx.message.created_at
+        )
+        self.tags.invalidate(ctx.guild.id, name)
+        embed=discord.Embed()
+        embed.description = f"<:plus:1172608535050338434> | **Name:** `{name}` **ID:** `{random_id}`"
+        embed.color = self.bot.color
+        await ctx.channel.send(embed=embed)
+        if ctx.interaction:
+            await ctx.interaction.followup.send(embed=embed)
 
     @tag.command(name="show")
     @app_commands.describe(search="The argument to search for")
+    @app_commands.autocomplete(search=tag_search_autocomplete)
     async def tag_show(self, ctx: Context, search: Optional[str]):
         """
         Show a tag.
@@ -1184,29 +1427,20 @@ class Misc(commands.Cog):
         if ctx.interaction:
             await ctx.interaction.response.defer()
 
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                "SELECT * FROM tags WHERE tag_name = ? OR tag_id = ?",
-                (search, search)
-            )
-            data = await cur.fetchone()
-            if not data:
-                return await ctx.reply("That tag doesn't exist!")
-            
-            await ctx.channel.send(data[2])
-            if ctx.interaction:
-                await ctx.send(data[2])
-
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                "UPDATE tags SET tag_uses = tag_uses + 1 WHERE tag_name = ? OR tag_id = ?",
-                (search, search)
-            )
-            await self.bot.db.commit()
+        data = await self.tags.get(ctx.guild.id if ctx.guild else None, search)
+        if not data:
+            return await ctx.reply("That tag doesn't exist!")
+
+        await ctx.channel.send(data[2])
+        if ctx.interaction:
+            await ctx.send(data[2])
+
+        self.tags.record_use(ctx.guild.id if ctx.guild else None, data)
 
 
     @tag.command(name="edit")
     @app_commands.describe(search="The tag to search for")
+    @app_commands.autocomplete(search=tag_search_autocomplete)
     async def tag_edit(self, ctx: Context, search: str):
         """
         Edit a tag.
@@ -1219,23 +1453,18 @@ class Misc(commands.Cog):
         if search is None:
                 return await ctx.reply("You need to provide a tag name or id!", delete_after=5)
 
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                "SELECT * FROM tags WHERE tag_name = ? OR tag_id = ?",
-                (search, search)
-            )
-            data = await cur.fetchone()
-            if not data:
-                return await ctx.reply("That tag doesn't exist!")
-            
-            owner = self.bot.get_user(data[3])
-            if ctx.author.id != owner.id:
-                return await ctx.reply("You don't own that tag!", ephemeral=True)
+        data = await self.tags.get(ctx.guild.id if ctx.guild else None, search)
+        if not data:
+            return await ctx.reply("That tag doesn't exist!")
 
-            if ctx.interaction:
-                await ctx.interaction.response.send_modal(TagEdit(tag_name=search, bot=self.bot))
-            else:
-                await ctx.reply(view=TagEditButton(tag_name=search, user=ctx.author, bot=self.bot))
+        owner = self.bot.get_user(data[3])
+        if ctx.author.id != owner.id:
+            return await ctx.reply("You don't own that tag!", ephemeral=True)
+
+        if ctx.interaction:
+            await ctx.interaction.response.send_modal(TagEdit(tag_id=data[0], cache=self.tags, bot=self.bot))
+        else:
+            await ctx.reply(view=TagEditButton(tag_id=data[0], cache=self.tags, user=ctx.author, bot=self.bot))
 
     @tag.command(name="list")
     async def tag_list(
@@ -1255,18 +1484,16 @@ class Misc(commands.Cog):
         if ctx.interaction:
             await ctx.interaction.response.defer()
 
-        async with self.bot.db.cursor() as cur: 
-            if member is not None:
-                await cur.execute(
-                    "SELECT * FROM tags WHERE tag_owner_id = ? AND tag_guild_id = ?",
-                    (member.id, ctx.guild.id)
-                )
-            else:
-                await cur.execute(
-                    "SELECT * FROM tags WHERE tag_guild_id = ?",
-                    (ctx.guild.id,)
-                )
-            data = await cur.fetchall()
+        if member is not None:
+            data = await self.bot.db.fetchall(
+                "SELECT * FROM tags WHERE tag_owner_id = ? AND tag_guild_id = ?",
+                member.id, ctx.guild.id
+            )
+        else:
+            data = await self.bot.db.fetchall(
+                "SELECT * FROM tags WHERE tag_guild_id = ?",
+                ctx.guild.id
+            )
 
         if member is not None:
             if not data:
@@ -1295,6 +1522,7 @@ class Misc(commands.Cog):
 
     @tag.command(name="info")
     @app_commands.describe(search="The tag to search for")
+    @app_commands.autocomplete(search=tag_search_autocomplete)
     async def tag_info(self, ctx: Context, search: Optional[str]):
         """
         Get info about a tag.
@@ -1310,33 +1538,29 @@ class Misc(commands.Cog):
         if ctx.interaction:
             await ctx.interaction.response.defer()
 
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                "SELECT * FROM tags WHERE tag_name = ? OR tag_id = ?",
-                (search, search)
-            )
-            data = await cur.fetchone()
-            if not data:
-                return await ctx.reply("That tag doesn't exist!")
-            if len(data[2]) > 100:
-                x = f" `+{len(data[2]) - 100} characters`\n"
-            else:
-                x = "\n"
-
-            embed=discord.Embed()
-            embed.description = (
-                f"**Name**: `{data[1]}`\n"
-                f"**ID**: `{data[0]}`\n"
-                f"**Content**: {truncate_string(value=data[2], max_length=100)}{x}"
-                f"**Uses**: `{data[5]}`\n"
-                f"**Owner**: `{self.bot.get_user(data[3]).name}`\n"
-                f"**Created At**: `{format_datetime_human_readable(dt=datetime.datetime.fromisoformat(data[6]).astimezone(datetime.timezone.utc))}`\n"
-            )
-            await ctx.send(embed=embed)
+        data = await self.tags.get(ctx.guild.id if ctx.guild else None, search)
+        if not data:
+            return await ctx.reply("That tag doesn't exist!")
+        if len(data[2]) > 100:
+            x = f" `+{len(data[2]) - 100} characters`\n"
+        else:
+            x = "\n"
+
+        embed=discord.Embed()
+        embed.description = (
+            f"**Name**: `{data[1]}`\n"
+            f"**ID**: `{data[0]}`\n"
+            f"**Content**: {truncate_string(value=data[2], max_length=100)}{x}"
+            f"**Uses**: `{data[5]}`\n"
+            f"**Owner**: `{self.bot.get_user(data[3]).name}`\n"
+            f"**Created At**: `{format_datetime_human_readable(dt=datetime.datetime.fromisoformat(data[6]).astimezone(datetime.timezone.utc))}`\n"
+        )
+        await ctx.send(embed=embed)
             
             
     @tag.command(name="delete")
     @app_commands.describe(search="The tag to search for")
+    @app_commands.autocomplete(search=tag_search_autocomplete)
     async def tag_delete(
         self,
         ctx: Context,
@@ -1356,24 +1580,17 @@ class Misc(commands.Cog):
 
         if search is None:
             return await ctx.reply("You need to provide a tag name or id!")
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                "SELECT * FROM tags WHERE tag_name = ? OR tag_id = ?",
-                (search, search)
-            )
-            data = await cur.fetchone()
-            if not data:
-                return await ctx.reply("That tag doesn't exist!")
-            
-            if data[3] != ctx.author.id:
-                return await ctx.reply("You don't own that tag!", ephemeral=True)
-            
-            await cur.execute(
-                "DELETE FROM tags WHERE tag_name = ? OR tag_id = ?",
-                (search, search)
-            )
-            await self.bot.db.commit()
-            await ctx.reply(embed=discord.Embed(description=f"<:trash:1172606399595937913> | **Name:** `{data[1]}` **ID:** `{data[0]}`", color=self.bot.color))
+        data = await self.tags.get(ctx.guild.id if ctx.guild else None, search)
+        if not data:
+            return await ctx.reply("That tag doesn't exist!")
+
+        if data[3] != ctx.author.id:
+            return await ctx.reply("You don't own that tag!", ephemeral=True)
+
+        await self.bot.db.execute("DELETE FROM tags WHERE tag_id = ?", data[0])
+        self.tags.invalidate(ctx.guild.id, data[0])
+        self.tags.forget_uses(ctx.guild.id, data[0])
+        await ctx.reply(embed=discord.Embed(description=f"<:trash:1172606399595937913> | **Name:** `{data[1]}` **ID:** `{data[0]}`", color=self.bot.color))
 
     @tag.command()
     @commands.guild_only()
@@ -1387,19 +1604,7 @@ class Misc(commands.Cog):
         if len(query) < 3:
             return await ctx.send('The query length must be at least three characters.')
 
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                """
-                SELECT tag_name, tag_uses
-                FROM tags
-                WHERE tag_name LIKE ?
-                AND tag_guild_id = ?
-                ORDER BY tag_uses DESC
-                LIMIT 20
-                """,
-                (f'%{query}%', ctx.guild.id)
-            )
-            results = await cur.fetchall()
+        results = await self.search_tags(ctx.guild.id, query)
 
         x = []
         for result in results:
@@ -1,2 +1,2 @@
-from .translator import *
-from .tag_view import *
\ No newline at end of file
+from .tag_view import *
+from .tag_cache import *
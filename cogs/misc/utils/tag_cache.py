@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import logging
+from collections import Counter, OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from discord.ext import tasks
+
+if TYPE_CHECKING:
+    from core import Robo
+
+log = logging.getLogger("Robo")
+
+# a row of the tags table, as a list so the use count can be bumped in place
+Tag = List[Any]
+TagKey = Tuple[Optional[int], str]
+
+
+class TagCache:
+    """
+    Guild scoped LRU cache of tag rows, found by name or by id.
+
+    Showing a tag only bumps a counter in memory, the counters are written
+    in one batched transaction every `FLUSH_INTERVAL` seconds. Every command
+    that changes a tag has to call `invalidate` afterwards.
+    """
+
+    FLUSH_INTERVAL = 5
+
+    def __init__(self, bot: Robo, *, maxsize: int = 2048) -> None:
+        self.bot = bot
+        self.maxsize = maxsize
+        # (guild_id, tag_id) -> row
+        self._rows: OrderedDict[TagKey, Tag] = OrderedDict()
+        # (guild_id, tag_name) -> tag_id
+        self._names: Dict[TagKey, str] = {}
+        self._pending: Counter[TagKey] = Counter()
+        # bumped by every invalidation, a lookup that raced one doesn't get cached
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _put(self, guild_id: Optional[int], row: Tag) -> None:
+        key = (guild_id, row[0])
+        # uses that are not flushed yet aren't in the row we just read
+        row[5] = (row[5] or 0) + self._pending.get(key, 0)
+        self._rows[key] = row
+        self._rows.move_to_end(key)
+        self._names[(guild_id, row[1])] = row[0]
+
+        while len(self._rows) > self.maxsize:
+            (old_guild, old_id), old = self._rows.popitem(last=False)
+            if self._names.get((old_guild, old[1])) == old_id:
+                del self._names[(old_guild, old[1])]
+
+    async def get(self, guild_id: Optional[int], search: str) -> Optional[Tag]:
+        """Returns the tag in `guild_id` whose name or id is `search`."""
+        tag_id = self._names.get((guild_id, search), search)
+        row = self._rows.get((guild_id, tag_id))
+        if row is not None:
+            self.hits += 1
+            self._rows.move_to_end((guild_id, tag_id))
+            return row
+
+        self.misses += 1
+        generation = self._generation
+        data = await self.bot.db.fetchone(
+            "SELECT * FROM tags WHERE tag_guild_id = ? AND (tag_name = ? OR tag_id = ?)",
+            guild_id, search, search
+        )
+        if data is None:
+            return None
+
+        row = list(data)
+        if generation == self._generation:
+            self._put(guild_id, row)
+        return row
+
+    def record_use(self, guild_id: Optional[int], row: Tag) -> None:
+        row[5] += 1
+        self._pending[(guild_id, row[0])] += 1
+
+    def invalidate(self, guild_id: Optional[int], search: str) -> None:
+        """Drops the tag whose name or id is `search`, call it after every write."""
+        self._generation += 1
+        tag_id = self._names.pop((guild_id, search), search)
+        row = self._rows.pop((guild_id, tag_id), None)
+        if row is not None and self._names.get((guild_id, row[1])) == tag_id:
+            del self._names[(guild_id, row[1])]
+
+    def forget_uses(self, guild_id: Optional[int], tag_id: str) -> None:
+        self._pending.pop((guild_id, tag_id), None)
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+
+        pending = self._pending
+        self._pending = Counter()
+        try:
+            await self.bot.db.executemany(
+                "UPDATE tags SET tag_uses = tag_uses + ? WHERE tag_id = ?",
+                [(count, tag_id) for (_, tag_id), count in pending.items()]
+            )
+        except Exception:
+            # keep the counts for the next try
+            self._pending.update(pending)
+            raise
+
+    @tasks.loop(seconds=FLUSH_INTERVAL)
+    async def flusher(self) -> None:
+        try:
+            await self.flush()
+        except Exception as e:
+            log.error(f"Failed to write tag uses: {e}")
+
+    def start(self) -> None:
+        if not self.flusher.is_running():
+            self.flusher.start()
+
+    async def close(self) -> None:
+        self.flusher.cancel()
+        await self.flush()
@@ -1,9 +1,10 @@
 import discord
 from discord import TextStyle
 from discord.interactions import Interaction
-import aiosqlite
 from discord.ext import commands
 
+from .tag_cache import TagCache
+
 class TagEdit(discord.ui.Modal, title="Tag Edit Form"):
     content=discord.ui.TextInput(
         label="Content",
@@ -13,9 +14,10 @@ class TagEdit(discord.ui.Modal, title="Tag Edit Form"):
         max_length=1990,
         required=True,
         )
-    def __init__(self, bot: commands.Bot, tag_name: str):
+    def __init__(self, bot: commands.Bot, tag_id: str, cache: TagCache):
         super().__init__(timeout=None)
-        self.tag_name = tag_name
+        self.tag_id = tag_id
+        self.cache = cache
         self.bot = bot
     
     async def on_submit(self, interaction: Interaction) -> None:
@@ -35,15 +37,14 @@ class TagEdit(discord.ui.Modal, title="Tag Edit Form"):
             )
         await interaction.response.send_message(embed=embed)
 
-        async with self.bot.db.cursor() as cursor:
-            await cursor.execute("UPDATE tags SET tag_content=? WHERE tag_name=?", (self.content.value, self.tag_name))
-
-        await self.bot.db.commit()
+        await self.bot.db.execute("UPDATE tags SET tag_content=? WHERE tag_id=?", self.content.value, self.tag_id)
+        self.cache.invalidate(interaction.guild_id, self.tag_id)
 
 class TagEditButton(discord.ui.View):
-    def __init__(self, bot: commands.Bot, tag_name: str, user: discord.Member):
+    def __init__(self, bot: commands.Bot, tag_id: str, cache: TagCache, user: discord.Member):
         super().__init__(timeout=None)
-        self.tag_name = tag_name
+        self.tag_id = tag_id
+        self.cache = cache
         self.user = user
         self.bot = bot
 
@@ -54,4 +55,4 @@ class TagEditButton(discord.ui.View):
 
     @discord.ui.button(label="Edit", style=discord.ButtonStyle.green)
     async def edit(self, interaction: Interaction, button: discord.ui.Button):
-        await interaction.response.send_modal(TagEdit(bot=self.bot, tag_name=self.tag_name))
+        await interaction.response.send_modal(TagEdit(bot=self.bot, tag_id=self.tag_id, cache=self.cache))
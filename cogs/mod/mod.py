@@ -2,7 +2,7 @@ import datetime
 import io
 import re
 from collections import Counter
-from typing import Annotated, Any, Callable, Literal, Optional, Union
+from typing import Annotated, Any, Callable, Literal, Optional, Set, Union
 
 import discord
 from discord import app_commands
@@ -14,6 +14,8 @@ from utils.context import Context, GuildContext
 from utils.converter import MemberConverter, Snowflake
 from utils.formats import plural
 
+from .utils import ACTIONS, ModActionExecutor
+
 
 class PurgeFlags(commands.FlagConverter):
     user: Optional[discord.User] = commands.flag(description="Remove messages from this user", default=None)
@@ -47,9 +49,9 @@ class MassbanFlags(commands.FlagConverter):
     channel: Optional[Union[discord.TextChannel, discord.Thread, discord.VoiceChannel]] = commands.flag(
         description='The channel to search for message history', default=None
     )
-    reason: Optional[str] = commands.flag(description='The reason to ban the members for', default=None)
+    reason: Optional[str] = commands.flag(description='The reason to ban, kick or time out the members for', default=None)
     username: Optional[str] = commands.flag(description='The regex that usernames must match', default=None)
-    bot: bool = commands.flag(description='ban bots (not webhooks!)', default=False)
+    bot: bool = commands.flag(description='Matches bots (not webhooks!)', default=False)
     created: Optional[int] = commands.flag(
         description='Matches users whose accounts were created less than specified minutes ago.', default=None
     )
@@ -71,7 +73,7 @@ class MassbanFlags(commands.FlagConverter):
     roles: Optional[bool] = commands.flag(
         description='Matches users depending on whether they have roles or not', default=None
     )
-    show: bool = commands.flag(description='Show members instead of banning them', default=False)
+    show: bool = commands.flag(description='Show members instead of acting on them', default=False)
     
     # Message history related flags
     contains: Optional[str] = commands.flag(description='The substring to search for in the message.', default=None)
@@ -88,6 +90,12 @@ class MassbanFlags(commands.FlagConverter):
     files: Optional[bool] = commands.flag(description='Whether the message should have attachments.', default=None)
     embeds: Optional[bool] = commands.flag(description='Whether the message should have embeds.', default=None)
 
+class MasstimeoutFlags(MassbanFlags):
+    # Discord allows a timeout of 28 days at most
+    minutes: commands.Range[int, 1, 40320] = commands.flag(
+        description='How many minutes to time the members out for', default=60
+    )
+
 class ActionReason(commands.Converter):
     async def convert(self, ctx: GuildContext, argument: str):
         ret = f'{ctx.author} (ID: {ctx.author.id}): {argument}'
@@ -95,7 +103,7 @@ class ActionReason(commands.Converter):
         if len(ret) > 512:
             reason_max = 512 - len(ret) + len(argument)
             raise commands.BadArgument(f'Reason is too long ({len(argument)}/{reason_max})')
-        return re
+        return ret
 
 def can_execute_action(ctx: GuildContext, user: discord.Member, target: discord.Member) -> bool:
     return user.id == ctx.bot.owner_id or user == ctx.guild.owner or user.top_role > target.top_role
@@ -104,6 +112,7 @@ class Mod(commands.Cog):
     """Commands for guild moderation."""
     def __init__(self, bot : Robo):
         self.bot = bot
+        self.actions = ModActionExecutor(bot)
 
     @property
     def display_emoji(self) -> discord.PartialEmoji:
@@ -240,49 +249,10 @@ class Mod(commands.Cog):
         else:
             await ctx.send(to_send, delete_after=10)
 
-    @commands.hybrid_command(usage='[flags...]')
-    @commands.guild_only()
-    @checks.hybrid_permissions_check(ban_members=True)
-    async def massban(self, ctx: Context, *, args: MassbanFlags):
-        """Mass bans multiple members from the server.
-
-        This command uses a syntax similar to Discord's search bar. To use this command
-        you and the bot must both have Ban Members permission. **Every option is optional.**
-
-        Users are only banned **if and only if** all conditions are met.
-
-        The following options are valid.
-
-        `channel:` Channel to search for message history.
-        `reason:` The reason for the ban.
-        `regex:` Regex that usernames must match.
-        `created:` Matches users whose accounts were created less than specified minutes ago.
-        `joined:` Matches users that joined less than specified minutes ago.
-        `joined-before:` Matches users who joined before the member ID given.
-        `joined-after:` Matches users who joined after the member ID given.
-        `avatar:` Matches users who have no avatar.
-        `roles:` Matches users that have no role.
-        `show:` Show members instead of banning them.
-
-        Message history filters (Requires `channel:`):
-
-        `contains:` A substring to search for in the message.
-        `starts:` A substring to search if the message starts with.
-        `ends:` A substring to search if the message ends with.
-        `match:` A regex to match the message content to.
-        `search:` How many messages to search. Default 100. Max 2000.
-        `after:` Messages must come after this message ID.
-        `before:` Messages must come before this message ID.
-        `files:` Checks if the message has attachments.
-        `embeds:` Checks if the message has embeds.
-        """
-
-        await ctx.defer()
+    async def _select_members(self, ctx: GuildContext, args: MassbanFlags) -> Optional[Set[discord.Member]]:
+        """The members matching `args`, or None once the reason why there are none was sent."""
         author = ctx.author
         members = []
-        reason = args.reason
-        if reason is None:
-            reason = f"banned by {ctx.author} (ID: {ctx.author.id})"
 
         if args.channel:
             before = discord.Object(id=args.before) if args.before else None
@@ -298,7 +268,8 @@ class Mod(commands.Cog):
                 try:
                     _match = re.compile(args.match)
                 except re.error as e:
-                    return await ctx.send(f'Invalid regex passed to `match:` flag: {e}')
+                    await ctx.send(f'Invalid regex passed to `match:` flag: {e}')
+                    return None
                 else:
                     predicates.append(lambda m, x=_match: x.match(m.content))
             if args.embeds:
@@ -330,7 +301,8 @@ class Mod(commands.Cog):
             try:
                 _regex = re.compile(args.username)
             except re.error as e:
-                return await ctx.send(f'Invalid regex passed to `username:` flag: {e}')
+                await ctx.send(f'Invalid regex passed to `username:` flag: {e}')
+                return None
             else:
                 predicates.append(lambda m, x=_regex: x.match(m.name))
 
@@ -373,9 +345,26 @@ class Mod(commands.Cog):
 
         members = {m for m in members if all(p(m) for p in predicates)}
         if len(members) == 0:
-            return await ctx.send('No members found matching criteria.')
+            await ctx.send('No members found matching criteria.')
+            return None
+        return members
+
+    async def _mass_action(
+        self,
+        ctx: GuildContext,
+        args: MassbanFlags,
+        action: str,
+        verb: str,
+        *,
+        duration: Optional[int] = None,
+    ) -> None:
+        await ctx.defer()
+        members = await self._select_members(ctx, args)
+        if members is None:
+            return
 
         if args.show:
+            now = discord.utils.utcnow()
             members = sorted(members, key=lambda m: m.joined_at or now)
             fmt = "\n".join(f'{m.id}\tJoined: {m.joined_at}\tCreated: {m.created_at}\t{m}' for m in members)
             content = f'Current Time: {discord.utils.utcnow()}\nTotal members: {len(members)}\n{fmt}'
@@ -387,25 +376,116 @@ class Mod(commands.Cog):
         else:
             reason = await ActionReason().convert(ctx, args.reason)
 
-        confirm = await ctx.confirm(f'This will ban **{plural(len(members)):member}**. Are you sure?')
+        confirm = await ctx.confirm(f'This will {verb} **{plural(len(members)):member}**. Are you sure?')
         if not confirm:
             return await ctx.send('Aborting.')
 
-        count = 0
-    
-        for member in members:
-            try:
-                await ctx.guild.ban(member, reason=reason)
-            except discord.HTTPException:
-                pass
-            else:
-                count += 1
-        mem = ", ".join(f"{m.mention}" for m in members)
-        await ctx.send(f'\nBanned {count}/{len(members)}\n{mem}')
-        
+        run = await self.actions.create(
+            ctx.guild.id, ctx.author.id, action, [m.id for m in members], reason=reason, duration=duration
+        )
+        status = await ctx.send(self.actions.render(run))
+        await self.actions.execute(run, ctx.guild, status)
+
+    @commands.hybrid_command(usage='[flags...]')
+    @commands.guild_only()
+    @checks.hybrid_permissions_check(ban_members=True)
+    async def massban(self, ctx: GuildContext, *, args: MassbanFlags):
+        """Mass bans multiple members from the server.
+
+        This command uses a syntax similar to Discord's search bar. To use this command
+        you and the bot must both have Ban Members permission. **Every option is optional.**
+
+        Users are only banned **if and only if** all conditions are met.
+
+        The following options are valid.
+
+        `channel:` Channel to search for message history.
+        `reason:` The reason for the ban.
+        `regex:` Regex that usernames must match.
+        `created:` Matches users whose accounts were created less than specified minutes ago.
+        `joined:` Matches users that joined less than specified minutes ago.
+        `joined-before:` Matches users who joined before the member ID given.
+        `joined-after:` Matches users who joined after the member ID given.
+        `avatar:` Matches users who have no avatar.
+        `roles:` Matches users that have no role.
+        `show:` Show members instead of banning them.
+
+        Message history filters (Requires `channel:`):
+
+        `contains:` A substring to search for in the message.
+        `starts:` A substring to search if the message starts with.
+        `ends:` A substring to search if the message ends with.
+        `match:` A regex to match the message content to.
+        `search:` How many messages to search. Default 100. Max 2000.
+        `after:` Messages must come after this message ID.
+        `before:` Messages must come before this message ID.
+        `files:` Checks if the message has attachments.
+        `embeds:` Checks if the message has embeds.
+        """
+        await self._mass_action(ctx, args, "ban", "ban")
+
+    @commands.hybrid_command(usage='[flags...]')
+    @commands.guild_only()
+    @checks.hybrid_permissions_check(kick_members=True)
+    async def masskick(self, ctx: GuildContext, *, args: MassbanFlags):
+        """Mass kicks multiple members from the server.
+
+        Takes the same options as `massban`, you and the bot must both have
+        Kick Members permission.
+        """
+        await self._mass_action(ctx, args, "kick", "kick")
+
+    @commands.hybrid_command(usage='[flags...]')
+    @commands.guild_only()
+    @checks.hybrid_permissions_check(moderate_members=True)
+    async def masstimeout(self, ctx: GuildContext, *, args: MasstimeoutFlags):
+        """Mass times out multiple members of the server.
+
+        Takes the same options as `massban`, you and the bot must both have
+        Timeout Members permission.
+
+        `minutes:` How long the timeout lasts. Default 60. Max 40320 (28 days).
+        """
+        await self._mass_action(ctx, args, "timeout", "time out", duration=args.minutes * 60)
+
+    @commands.hybrid_command()
+    @commands.guild_only()
+    @app_commands.describe(run='The run to resume, the newest unfinished one by default')
+    async def massresume(self, ctx: GuildContext, run: Optional[int] = None):
+        """Resumes an interrupted mass ban, kick or timeout.
+
+        Only the moderator who started it, or an administrator, can resume a run.
+
+        `run:` The run to resume, shown in the status message. Defaults to the newest unfinished one.
+        """
+        found = await self.actions.get(ctx.guild.id, run)
+        if found is None:
+            return await ctx.send('No unfinished run found.')
+        if self.actions.is_running(found):
+            return await ctx.send(f'Run `{found.run_id}` is still running.')
+
+        if found.author_id != ctx.author.id and not ctx.author.guild_permissions.administrator:
+            return await ctx.send('Only the moderator who started this run or an administrator can resume it.')
+        action = ACTIONS[found.action]
+        if not getattr(ctx.author.guild_permissions, action.permission):
+            return await ctx.send(f'You need the {action.permission.replace("_", " ").title()} permission.')
+        if not getattr(ctx.me.guild_permissions, action.permission):
+            return await ctx.send(f'I need the {action.permission.replace("_", " ").title()} permission.')
+
+        confirm = await ctx.confirm(
+            f'This will resume run `{found.run_id}` ({found.action}), **{plural(len(found.pending)):member}** left. Are you sure?'
+        )
+        if not confirm:
+            return await ctx.send('Aborting.')
+
+        status = await ctx.send(self.actions.render(found))
+        await self.actions.execute(found, ctx.guild, status)
+
 
     @massban.error
-    async def massban_error(self, ctx: GuildContext, error: commands.CommandError):
+    @masskick.error
+    @masstimeout.error
+    async def mass_action_error(self, ctx: GuildContext, error: commands.CommandError):
         if isinstance(error, commands.FlagError):
             await ctx.send(str(error), ephemeral=True)
 
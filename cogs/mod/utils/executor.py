@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import aiohttp
+import aiosqlite
+import discord
+
+if TYPE_CHECKING:
+    from core import Robo
+
+log = logging.getLogger("Robo")
+
+
+class ModRun:
+    """A mass moderation run, a row of `mod_runs` and its outstanding users."""
+
+    __slots__ = ("run_id", "guild_id", "author_id", "action", "reason", "duration", "pending", "done", "failed")
+
+    def __init__(
+        self,
+        run_id: int,
+        guild_id: int,
+        author_id: int,
+        action: str,
+        reason: Optional[str],
+        duration: Optional[int],
+        pending: List[int],
+        done: int = 0,
+        failed: int = 0,
+    ) -> None:
+        self.run_id = run_id
+        self.guild_id = guild_id
+        self.author_id = author_id
+        self.action = action
+        self.reason = reason
+        # seconds, timeouts only
+        self.duration = duration
+        self.pending = pending
+        self.done = done
+        self.failed = failed
+
+    @property
+    def total(self) -> int:
+        return len(self.pending) + self.done + self.failed
+
+
+async def _ban(guild: discord.Guild, user_id: int, run: ModRun) -> None:
+    await guild.ban(discord.Object(id=user_id), reason=run.reason)
+
+
+async def _kick(guild: discord.Guild, user_id: int, run: ModRun) -> None:
+    await guild.kick(discord.Object(id=user_id), reason=run.reason)
+
+
+async def _timeout(guild: discord.Guild, user_id: int, run: ModRun) -> None:
+    member = guild.get_member(user_id) or await guild.fetch_member(user_id)
+    await member.timeout(datetime.timedelta(seconds=run.duration or 0), reason=run.reason)
+
+
+class Action(NamedTuple):
+    apply: Callable[[discord.Guild, int, ModRun], Awaitable[None]]
+    # the guild permission needed to run it
+    permission: str
+    ongoing: str
+    past: str
+
+
+ACTIONS: Dict[str, Action] = {
+    "ban": Action(_ban, "ban_members", "Banning", "Banned"),
+    "kick": Action(_kick, "kick_members", "Kicking", "Kicked"),
+    "timeout": Action(_timeout, "moderate_members", "Timing out", "Timed out"),
+}
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, discord.HTTPException):
+        # discord.py already waits out the rate limit headers, a 429 that still
+        # gets here or a 5xx is worth another try, anything else won't change
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+class ModActionExecutor:
+    """
+    Applies a ban, kick or timeout to many users at once.
+
+    A run and every user in it are stored before anything is done, then
+    `CONCURRENCY` workers go through the users. discord.py keeps the
+    requests within the rate limit headers of the route, the workers only
+    keep the next request ready. Transient failures are retried with
+    backoff. The outcomes are written and the status message edited every
+    `PROGRESS_INTERVAL` seconds, so a run that got interrupted can be
+    resumed with the users that are still pending.
+    """
+
+    CONCURRENCY = 5
+    RETRIES = 3
+    BACKOFF = 1.0
+    PROGRESS_INTERVAL = 2.0
+
+    def __init__(self, bot: Robo) -> None:
+        self.bot = bot
+        self._running: Set[int] = set()
+
+    async def create(
+        self,
+        guild_id: int,
+        author_id: int,
+        action: str,
+        user_ids: Sequence[int],
+        *,
+        reason: Optional[str] = None,
+        duration: Optional[int] = None,
+    ) -> ModRun:
+        if action not in ACTIONS:
+            raise ValueError(f"unknown action {action!r}")
+        user_ids = list(dict.fromkeys(user_ids))
+
+        async def job(conn: aiosqlite.Connection) -> int:
+            async with conn.execute(
+                "INSERT INTO mod_runs (guild_id, author_id, action, reason, duration, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (guild_id, author_id, action, reason, duration, time.time())
+            ) as cur:
+                run_id = cur.lastrowid
+            await conn.executemany(
+                "INSERT INTO mod_run_targets (run_id, user_id) VALUES (?, ?)",
+                [(run_id, user_id) for user_id in user_ids]
+            )
+            return run_id
+
+        run_id = await self.bot.db.run(job)
+        return ModRun(run_id, guild_id, author_id, action, reason, duration, user_ids)
+
+    async def get(self, guild_id: int, run_id: Optional[int] = None) -> Optional[ModRun]:
+        """An unfinished run of `guild_id`, the newest one if `run_id` is None."""
+        if run_id is None:
+            row = await self.bot.db.fetchone(
+                "SELECT * FROM mod_runs WHERE guild_id = ? AND finished = 0 ORDER BY run_id DESC LIMIT 1",
+                guild_id
+            )
+        else:
+            row = await self.bot.db.fetchone(
+                "SELECT * FROM mod_runs WHERE guild_id = ? AND run_id = ? AND finished = 0",
+                guild_id, run_id
+            )
+        if row is None:
+            return None
+
+        run_id, guild_id, author_id, action, reason, duration = row[:6]
+        pending: List[int] = []
+        counts = {"done": 0, "failed": 0}
+        for user_id, status in await self.bot.db.fetchall(
+            "SELECT user_id, status FROM mod_run_targets WHERE run_id = ?", run_id
+        ):
+            if status == "pending":
+                pending.append(user_id)
+            else:
+                counts[status] += 1
+        return ModRun(run_id, guild_id, author_id, action, reason, duration, pending, counts["done"], counts["failed"])
+
+    def is_running(self, run: ModRun) -> bool:
+        return run.run_id in self._running
+
+    async def _apply(self, guild: discord.Guild, user_id: int, run: ModRun) -> Optional[str]:
+        """Applies the action to one user, returns the error if it failed."""
+        apply = ACTIONS[run.action].apply
+        for attempt in range(self.RETRIES + 1):
+            try:
+                await apply(guild, user_id, run)
+            except Exception as e:
+                if attempt < self.RETRIES and _retryable(e):
+                    await asyncio.sleep(self.BACKOFF * 2 ** attempt)
+                    continue
+                if isinstance(e, discord.HTTPException):
+                    return e.text or f"HTTP {e.status}"
+                return repr(e)
+            else:
+                return None
+        return None
+
+    def render(self, run: ModRun, *, finished: bool = False) -> str:
+        action = ACTIONS[run.action]
+        handled = run.done + run.failed
+        filled = 20 * handled // run.total if run.total else 20
+        bar = "█" * filled + "░" * (20 - filled)
+        verb = action.past if finished else action.ongoing
+        text = f"{verb} {handled}/{run.total} `{bar}`\n{run.done} succeeded, {run.failed} failed"
+        if not finished:
+            text += f"\nRun `{run.run_id}`, if this gets interrupted it can be resumed with `massresume {run.run_id}`"
+        return text
+
+    async def _write(self, run: ModRun, outcomes: List[Tuple[str, Optional[str], int, int]]) -> None:
+        if not outcomes:
+            return
+        rows, outcomes[:] = outcomes[:], []
+        await self.bot.db.executemany(
+            "UPDATE mod_run_targets SET status = ?, error = ? WHERE run_id = ? AND user_id = ?", rows
+        )
+
+    async def execute(self, run: ModRun, guild: discord.Guild, status: Optional[discord.Message] = None) -> ModRun:
+        """Works through the pending users of `run`, editing `status` as it goes."""
+        if run.run_id in self._running:
+            raise RuntimeError(f"run {run.run_id} is already running")
+        self._running.add(run.run_id)
+
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for user_id in run.pending:
+            queue.put_nowait(user_id)
+        # (status, error, run_id, user_id) rows waiting to be written
+        outcomes: List[Tuple[str, Optional[str], int, int]] = []
+
+        async def worker() -> None:
+            while True:
+                try:
+                    user_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                error = await self._apply(guild, user_id, run)
+                run.pending.remove(user_id)
+                if error is None:
+                    run.done += 1
+                    outcomes.append(("done", None, run.run_id, user_id))
+                else:
+                    run.failed += 1
+                    outcomes.append(("failed", error, run.run_id, user_id))
+
+        async def progress() -> None:
+            shown = None
+            while True:
+                await asyncio.sleep(self.PROGRESS_INTERVAL)
+                try:
+                    await self._write(run, outcomes)
+                except Exception as e:
+                    log.error(f"Failed to write the outcomes of mod run {run.run_id}: {e!r}")
+                text = self.render(run)
+                if status is not None and text != shown:
+                    shown = text
+                    try:
+                        await status.edit(content=text)
+                    except discord.HTTPException:
+                        pass
+
+        reporter = asyncio.create_task(progress())
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.CONCURRENCY, len(run.pending)))))
+        finally:
+            reporter.cancel()
+            self._running.discard(run.run_id)
+            # written even when cancelled, so a resume doesn't redo them
+            await self._write(run, outcomes)
+
+        await self.bot.db.execute("UPDATE mod_runs SET finished = 1 WHERE run_id = ?", run.run_id)
+        if status is not None:
+            try:
+                await status.edit(content=self.render(run, finished=True))
+            except discord.HTTPException:
+                pass
+        return run
@@ -14,6 +14,7 @@ from ..features.baseclass import Feature
 from ..flags import Flags
 from ..math import mean_stddev
 from ..modules import ExtensionConverter
+from ..paginators import PaginatorInterface, WrappedPaginator
 from ..repl import inspections
 from ..types import ContextA
 
@@ -189,6 +190,28 @@ class ManagementFeature(Feature):
             if self.bot.latency > 0.0:
                 websocket_readings.append(self.bot.latency)
 
+    @Feature.Command(parent="robo", name="lag")
+    async def robo_lag(self, ctx: ContextA):
+        """
+        Shows the worst event loop stalls and what was blocking the loop.
+        """
+
+        monitor = self.bot.lag
+        paginator = WrappedPaginator(prefix='```py', suffix='```', max_size=1980)
+        paginator.add_line(
+            f"Last tick {monitor.last_lag * 1000:.1f}ms late, worst {monitor.max_lag * 1000:.0f}ms, "
+            f"{monitor.total_stalls} stalls over {monitor.threshold * 1000:.0f}ms"
+        )
+
+        for stall in monitor.worst():
+            paginator.add_line(empty=True)
+            paginator.add_line(f"# {stall.lag * 1000:.0f}ms at {stall.when:%Y-%m-%d %H:%M:%S}")
+            for frame in stall.stack[-6:]:
+                paginator.add_line(frame.rstrip())
+
+        interface = PaginatorInterface(ctx.bot, paginator, owner=ctx.author)
+        await interface.send_to(ctx)
+
     SLASH_COMMAND_ERROR = re.compile(r"In ((?:\d+\.[a-z]+\.?)+)")
 
     @Feature.Command(parent="robo", name="sync")
@@ -14,6 +14,7 @@ from discord import app_commands
 from discord.ext import commands
 from typing_extensions import Annotated
 
+from cogs.events.utils import COINS, find_coin, sparkline
 from core import Robo
 from utils.context import Context
 from utils.converter import (ColorConverter, MemberConverter, RoleConverter,
@@ -21,17 +22,22 @@ from utils.converter import (ColorConverter, MemberConverter, RoleConverter,
 from utils.formats import format_dt
 from utils.views import PermissionView, PingRoleSelect
 
-from .utils import EmojiURL, TicketClose, TicketCreate, emoji_name
+from .utils import AfkEntry, AfkIndex, EmojiURL, TicketClose, TicketCreate, emoji_name
 
 
 class AfkFlag(commands.FlagConverter):
     globally: Optional[bool] = commands.flag(description="Whether to set your AFK globally or not (default: True)", default=True)
+
+class WelcomeFlag(commands.FlagConverter):
+    message: Optional[str] = commands.flag(description="The welcome message, {members}, {server} and {count} are filled in", default=None)
+    image: Optional[str] = commands.flag(description="URL of an image to show in the welcome", default=None)
     
 class Utility(commands.Cog):
     """
     Commands for guild customization."""
     def __init__(self, bot: Robo):
         self.bot = bot
+        self.afk_index = AfkIndex(bot)
 
     @property
     def display_emoji(self) -> discord.PartialEmoji:
@@ -53,6 +59,12 @@ class Utility(commands.Cog):
         except commands.errors.ExtensionAlreadyLoaded as e:
             ...
 
+        await self.afk_index.load()
+        self.afk_index.start()
+
+    async def cog_unload(self) -> None:
+        await self.afk_index.close()
+
     @commands.hybrid_command(
         name="emoji",
         description="Creates a new emoji in the server using imoji url or file",
@@ -241,12 +253,6 @@ class Utility(commands.Cog):
         if ctx.interaction:
             await ctx.interaction.response.defer(thinking=True)
 
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                "SELECT * FROM afk WHERE afk_user_id = ?", (ctx.author.id,)
-            )
-            afk = await cur.fetchone()
-
         if option == "global":
             globally = True
 
@@ -262,20 +268,23 @@ class Utility(commands.Cog):
             reason = reason.replace("@", "@\u200b").replace("&", "&\u200b").replace("guild", "").replace("global", "").replace("guild", "")
        
 
-        if afk is None:
-            async with self.bot.db.cursor() as cur:
-                await cur.execute(
-                    "INSERT INTO afk (afk_user_id, afk_reason, afk_global, afk_from, afk_mentions, afk_guild) VALUES (?, ?, ?, ?, ?, ?)",
-                    (
-                        ctx.author.id,
-                        reason,
-                        globally,
-                        str(ctx.message.created_at),
-                        0,
-                        ctx.guild.id if not globally else None,
-                    ),
-                    )
-                await self.bot.db.commit()
+        if ctx.author.id not in self.afk_index:
+            # the old row can still be there while its removal waits for the next flush
+            await self.bot.db.execute(
+                "INSERT OR REPLACE INTO afk (afk_user_id, afk_reason, afk_global, afk_from, afk_mentions, afk_guild) VALUES (?, ?, ?, ?, ?, ?)",
+                ctx.author.id,
+                reason,
+                globally,
+                str(ctx.message.created_at),
+                0,
+                ctx.guild.id if not globally else None,
+            )
+            self.afk_index.add(AfkEntry(
+                ctx.author.id,
+                reason,
+                ctx.message.created_at,
+                guild_id=ctx.guild.id if not globally else None,
+            ))
             await ctx.send(
                 (
                     f"> I've set your AFK {' for this guild' if not globally else ''}\n"
@@ -314,73 +323,41 @@ class Utility(commands.Cog):
 
         This is a listener, so it will only work if the bot is online when the message is sent
         """
-        async with self.bot.db.cursor() as cur:
-            await cur.execute("SELECT * FROM afk")
-            afk_list = await cur.fetchall()
-
-        for afk in afk_list:
-            if bool(afk[2]):
-                user = self.bot.get_user(afk[0])
-                time = self.timecalc(message, afk[3])
-                mentions = afk[4] 
-
-                # Check for mentions before checking if the author is AFK
-                for mention in message.mentions:
-                    if mention.id == afk[0]:
-                        await message.channel.send(
-                            f"> {user.name} is AFK\n> Reason: {afk[1]}"
-                        )
-                        async with self.bot.db.cursor() as cur:
-                            await cur.execute(
-                                "UPDATE afk SET afk_mentions = ? WHERE afk_user_id = ?",
-                                (mentions, afk[0]),
-                            )
-                            await self.bot.db.commit()
-                        return
+        if not self.afk_index:
+            return
 
-                if message.author.id == afk[0]:
-                    async with self.bot.db.cursor() as cur:
-                        await cur.execute(
-                            "DELETE FROM afk WHERE afk_user_id = ?", (message.author.id,)
-                        )
-                        await self.bot.db.commit()
-                    await message.channel.send(
-                        f"> Welcome back {user.name}! I've removed your AFK.\n> You were afk for {time}\n{f'> You were mentioned {mentions} times' if mentions > 0 else ''} "
-                    )
-                    return
-            else:
-                if message.guild is not None:
-                    if message.guild.id == afk[5]:
-                        user = self.bot.get_user(afk[0])
-                        time = self.timecalc(message, afk[3])
-                        mentions = afk[4] + 1
-
-                        # Check for mentions before checking if the author is AFK
-                        for mention in message.mentions:
-                            if mention.id == afk[0]:
-                                await message.channel.send(
-                                    f"> {user.name} is AFK\n> Reason: {afk[1]}"
-                                )
-                                async with self.bot.db.cursor() as cur:
-                                    await cur.execute(
-                                        "UPDATE afk SET afk_mentions = ? WHERE afk_user_id = ?",
-                                        (mentions, afk[0]),
-                                    )
-                                    await self.bot.db.commit()
-                                return
-
-                        if message.author.id == afk[0]:
-                            async with self.bot.db.cursor() as cur:
-                                await cur.execute(
-                                    "DELETE FROM afk WHERE afk_user_id = ?", (message.author.id,)
-                                )
-                                await self.bot.db.commit()
-                            await message.channel.send(
-                                f"> Welcome back {user.name}! I've removed your AFK.\n> You were afk for {time}\n{f'> You were mentioned {mentions} times' if mentions > 0 else ''} "
-                            )
-                            return
+        guild_id = message.guild.id if message.guild is not None else None
+
+        # Check for mentions before checking if the author is AFK
+        for mention in message.mentions:
+            afk = self.afk_index.get(mention.id, guild_id)
+            if afk is not None:
+                self.afk_index.mentioned(afk)
+                await message.channel.send(
+                    f"> {mention.name} is AFK\n> Reason: {afk.reason}"
+                )
+                return
+
+        afk = self.afk_index.get(message.author.id, guild_id)
+        # the message that set the AFK doesn't count
+        if afk is None or message.created_at <= afk.since:
+            return
+
+        self.afk_index.remove(afk)
+        time = self.timecalc(message, afk.since)
+        mentions = afk.mentions
+        await message.channel.send(
+            f"> Welcome back {message.author.name}! I've removed your AFK.\n> You were afk for {time}\n{f'> You were mentioned {mentions} times' if mentions > 0 else ''} "
+        )
+
+    @commands.Cog.listener()
+    async def on_cluster_afk_add(self, data: dict):
+        self.afk_index.apply_add(AfkEntry.from_payload(data))
+
+    @commands.Cog.listener()
+    async def on_cluster_afk_remove(self, user_id: int):
+        self.afk_index.apply_remove(user_id)
 
-      
     @commands.hybrid_group()
     async def ticket(self, ctx: Context):
         """
@@ -422,11 +399,7 @@ class Utility(commands.Cog):
         """
         if ctx.interaction:
             await ctx.defer()
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                "SELECT * FROM tickets WHERE ticket_guild_id = ?", (ctx.guild.id,)
-            )
-            data = await cur.fetchone()
+        data = await self.bot.db.fetchone("SELECT * FROM tickets WHERE ticket_guild_id = ?", ctx.guild.id)
 
         if data is not None:
             return await ctx.send("Ticket system is already setup in this server", delete_after=10)
@@ -505,17 +478,13 @@ class Utility(commands.Cog):
 
         await asyncio.sleep(1)
         
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                "INSERT INTO tickets (ticket_guild_id, ticket_category_id, ticket_channel_id, ticket_ping_role_id) VALUES (?, ?, ?, ?)",
-                (
-                    ctx.guild.id,
-                    cat.id,
-                    chan.id,
-                    role.id,
-                ),
-            )
-            await self.bot.db.commit()
+        await self.bot.db.execute(
+            "INSERT INTO tickets (ticket_guild_id, ticket_category_id, ticket_channel_id, ticket_ping_role_id) VALUES (?, ?, ?, ?)",
+            ctx.guild.id,
+            cat.id,
+            chan.id,
+            role.id,
+        )
 
         embed.description += "Setup complete\n"
         await msge.edit(embed=embed)
@@ -536,11 +505,7 @@ class Utility(commands.Cog):
         Deletes ticket system in the server
         """
 
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                "SELECT * FROM tickets WHERE ticket_guild_id = ?", (ctx.guild.id,)
-            )
-            data = await cur.fetchone()
+        data = await self.bot.db.fetchone("SELECT * FROM tickets WHERE ticket_guild_id = ?", ctx.guild.id)
 
         if data is None:
             return await ctx.send("Ticket system is not setup in this server")
@@ -551,15 +516,11 @@ class Utility(commands.Cog):
         
         x = await ctx.send("Please wait")
 
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                "SELECT * FROM tickets WHERE ticket_guild_id = ?", (ctx.guild.id,)
-            )
-            data = await cur.fetchone()
+        data = await self.bot.db.fetchone("SELECT * FROM tickets WHERE ticket_guild_id = ?", ctx.guild.id)
 
         cat = ctx.guild.get_channel(data[1])
         chan = ctx.guild.get_channel(data[2])
-        role = ctx.guild.get_role(data[3])
+        role = ctx.guild.get_role(data["ticket_ping_role_id"])
 
         await x.edit(content="Deleting ticket system...")
 
@@ -577,11 +538,7 @@ class Utility(commands.Cog):
 
         await x.edit(content="Ticket system deleted")
         
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                "DELETE FROM tickets WHERE ticket_guild_id = ?", (ctx.guild.id,)
-            )
-            await self.bot.db.commit()
+        await self.bot.db.execute("DELETE FROM tickets WHERE ticket_guild_id = ?", ctx.guild.id)
 
     @ticket.group(name="pingrole")
     async def ticket_pingrole(self, ctx: Context):
@@ -597,11 +554,7 @@ class Utility(commands.Cog):
     @commands.has_permissions(manage_channels=True)
     @app_commands.guild_only()
     async def add_pingrole(self, ctx: Context):
-        async with self.bot.db.cursor() as cur:
-            await cur.execute(
-                "SELECT * FROM tickets WHERE ticket_guild_id = ?", (ctx.guild.id,)
-            )
-            data = await cur.fetchone()
+        data = await self.bot.db.fetchone("SELECT * FROM tickets WHERE ticket_guild_id = ?", ctx.guild.id)
 
         if data is None:
             return await ctx.send("Ticket system is not setup in this server")
@@ -615,36 +568,127 @@ class Utility(commands.Cog):
 
     @commands.hybrid_command()
     @commands.guild_only()
+    @commands.has_permissions(manage_channels=True)
     async def crypto(self, ctx: Context, channel: Optional[discord.TextChannel]):
         """
         Get crypto updates
         `r.crypto #channel` - Get crypto updates in the channel
         """
+        crypto = self.bot.get_cog('Crypto')
+        if crypto is None:
+            return await ctx.send("Crypto updates are not available right now")
 
-        async with self.bot.db.cursor() as cur:
-            await cur.execute("SELECT * FROM crypto")
-            data = await cur.fetchone()
+        channel = channel or ctx.channel
+        try:
+            msg = await channel.send("Please wait...")
+        except discord.HTTPException:
+            return await ctx.send(f"I can't send messages in {channel.mention}")
 
-        if data is None:
-            async with self.bot.db.cursor() as cur:
-                msg = await ctx.send("Please wait...")
-                await cur.execute(
-                    "INSERT INTO crypto (guild_id, channel_id, message_id) VALUES (?, ?, ?)",
-                    (ctx.guild.id, channel.id, msg.id),
-                )
-                await self.bot.db.commit()
-                await msg.edit(content=f"Set crypto updates in {channel.mention}")
+        await crypto.ticker.subscribe(ctx.guild.id, channel.id, msg.id)
+        await ctx.send(f"Set crypto updates in {channel.mention}")
 
-        else:
-            async with self.bot.db.cursor() as cur:
-                msg = await ctx.send("Please wait...")
-                await cur.execute(
-                    "UPDATE crypto SET channel_id = ?  WHERE guild_id = ? ",
-                    (channel.id, ctx.guild.id),
-                )
-                await cur.execute(
-                    "UPDATE crypto SET message_id = ? WHERE guild_id = ? ",
-                    (msg.id, ctx.guild.id),
-                )
-                await self.bot.db.commit()
-                await ctx.send(f"Set crypto updates in {channel.mention}")
\ No newline at end of file
+    @commands.hybrid_command(aliases=["chart"])
+    @app_commands.describe(
+        coin="The coin, by name or symbol",
+        span="How far back to show (default: 24h)",
+    )
+    async def price(self, ctx: Context, coin: str, span: Literal["24h", "7d", "30d"] = "24h"):
+        """
+        Shows the recent price of a coin
+
+        `coin:` - The coin, by name or symbol (btc, eth, ...)
+        `span:` - How far back to show, 24h, 7d or 30d (default: 24h)
+        """
+        coin_id = find_coin(coin)
+        if coin_id is None:
+            return await ctx.send(f"Unknown coin, try one of {', '.join(COINS.values())}")
+
+        crypto = self.bot.get_cog('Crypto')
+        history = crypto.ticker.history if crypto is not None else None
+        if history is None or not history.window(coin_id, "usd", span):
+            return await ctx.send("No prices recorded yet, they are only recorded while a crypto ticker is set up")
+
+        embed = discord.Embed(
+            title=f"{COINS[coin_id]} ({span})",
+            color=self.bot.color,
+            timestamp=discord.utils.utcnow()
+        )
+        for currency, symbol in (("usd", "$"), ("inr", "₹")):
+            values = history.window(coin_id, currency, span)
+            if not values:
+                continue
+            changes = []
+            for label, seconds in (("1h", 3600), ("24h", 86400)):
+                change = history.change(coin_id, currency, seconds)
+                changes.append(f"{label}: {'n/a' if change is None else f'{change:+.2f}%'}")
+            embed.add_field(
+                name=currency.upper(),
+                value=(
+                    f"```{sparkline(values)}```"
+                    f"> Low {symbol} {min(values):,.2f} · High {symbol} {max(values):,.2f}\n"
+                    f"> Now {symbol} {values[-1]:,.2f} · {' · '.join(changes)}"
+                ),
+                inline=False
+            )
+        await ctx.send(embed=embed)
+
+    @price.autocomplete("coin")
+    async def price_coin_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        current = current.lower()
+        return [
+            app_commands.Choice(name=name, value=coin)
+            for coin, name in COINS.items()
+            if current in coin or current in name.lower()
+        ]
+
+    @commands.hybrid_group()
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    @app_commands.guild_only()
+    async def welcome(self, ctx: Context):
+        """
+        Welcome new members
+        `r.welcome set #channel` - Welcome new members in the channel
+        `r.welcome remove` - Stop welcoming new members
+        """
+        if ctx.invoked_subcommand is None:
+            await ctx.send_help(ctx.command)
+
+    @welcome.command(name="set")
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    @app_commands.describe(channel="The channel to welcome new members in")
+    async def welcome_set(self, ctx: Context, channel: discord.TextChannel, *, flags: WelcomeFlag):
+        """
+        Sets the channel and message to welcome new members with
+
+        `channel:` - The channel to welcome new members in
+        `message:` - The message, `{members}`, `{server}` and `{count}` are filled in
+        `image:` - URL of an image to show in the welcome
+        """
+        greeting = self.bot.get_cog('Greeting')
+        if greeting is None:
+            return await ctx.send("Welcome messages are not available right now")
+
+        if flags.message is not None and len(flags.message) > 1000:
+            return await ctx.send("The welcome message can be at most 1000 characters long")
+        if flags.image is not None and not flags.image.startswith(("https://", "http://")):
+            return await ctx.send("The image has to be a link")
+        if not channel.permissions_for(ctx.me).send_messages:
+            return await ctx.send(f"I can't send messages in {channel.mention}")
+
+        await greeting.welcome.set(ctx.guild.id, channel.id, flags.message, flags.image)
+        await ctx.send(f"New members will be welcomed in {channel.mention}")
+
+    @welcome.command(name="remove")
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    async def welcome_remove(self, ctx: Context):
+        """Stops welcoming new members"""
+        greeting = self.bot.get_cog('Greeting')
+        if greeting is None:
+            return await ctx.send("Welcome messages are not available right now")
+
+        if not await greeting.welcome.remove(ctx.guild.id):
+            return await ctx.send("Welcome messages are not set up in this server")
+        await ctx.send("New members won't be welcomed anymore")
@@ -1,2 +1,3 @@
 from .emoji import *
-from .view import *
\ No newline at end of file
+from .view import *
+from .afk import *
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import datetime
+import logging
+from typing import TYPE_CHECKING, Any, Dict, Optional, Set
+
+import aiosqlite
+from discord.ext import tasks
+
+if TYPE_CHECKING:
+    from core import Robo
+
+log = logging.getLogger("Robo")
+
+
+class AfkEntry:
+    __slots__ = ("user_id", "reason", "since", "mentions", "guild_id")
+
+    def __init__(self, user_id: int, reason: str, since: datetime.datetime, mentions: int = 0, guild_id: Optional[int] = None) -> None:
+        self.user_id = user_id
+        self.reason = reason
+        self.since = since
+        self.mentions = mentions
+        # None for a global AFK
+        self.guild_id = guild_id
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {"user_id": self.user_id, "reason": self.reason, "since": self.since.isoformat(), "guild_id": self.guild_id}
+
+    @classmethod
+    def from_payload(cls, data: Dict[str, Any]) -> AfkEntry:
+        return cls(data["user_id"], data["reason"], datetime.datetime.fromisoformat(data["since"]), guild_id=data["guild_id"])
+
+
+class AfkIndex:
+    """
+    The whole `afk` table in memory, global entries by user id and guild
+    entries by guild id and user id, so a message only has to look up its
+    author and mentions.
+
+    Mention counts and removals are written in one batch every
+    `FLUSH_INTERVAL` seconds.
+
+    `afk_user_id` is the primary key, so a user has one entry at most and
+    adding one replaces the old. Under the cluster launcher every add and
+    remove is broadcast, the other clusters only update their memory and the
+    database write is left to the cluster that made the change.
+    """
+
+    FLUSH_INTERVAL = 10
+
+    def __init__(self, bot: Robo) -> None:
+        self.bot = bot
+        self.global_entries: Dict[int, AfkEntry] = {}
+        self.guild_entries: Dict[int, Dict[int, AfkEntry]] = {}
+        # user_id -> their entry, global or not, so the hot checks don't scan every guild
+        self._users: Dict[int, AfkEntry] = {}
+        # user_id -> mentions not written yet, added to the stored count so
+        # clusters counting mentions of the same AFK don't overwrite each other
+        self._mentions: Dict[int, int] = {}
+        self._removed: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._users
+
+    async def load(self) -> None:
+        rows = await self.bot.db.fetchall(
+            "SELECT afk_user_id, afk_reason, afk_global, afk_from, afk_mentions, afk_guild FROM afk"
+        )
+        self.global_entries.clear()
+        self.guild_entries.clear()
+        self._users.clear()
+        for user_id, reason, globally, since, mentions, guild_id in rows:
+            since = datetime.datetime.fromisoformat(since)
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=datetime.timezone.utc)
+            self._put(AfkEntry(
+                user_id,
+                reason,
+                since,
+                mentions or 0,
+                None if globally else guild_id,
+            ))
+        self.bot.logger.info(f"Loaded {len(self)} AFK entries")
+
+    def _put(self, entry: AfkEntry) -> None:
+        old = self._users.get(entry.user_id)
+        if old is not None:
+            self._discard(old)
+        self._users[entry.user_id] = entry
+        if entry.guild_id is None:
+            self.global_entries[entry.user_id] = entry
+        else:
+            self.guild_entries.setdefault(entry.guild_id, {})[entry.user_id] = entry
+
+    def get(self, user_id: int, guild_id: Optional[int]) -> Optional[AfkEntry]:
+        """The AFK entry of `user_id` that applies in `guild_id`, if any."""
+        entry = self.global_entries.get(user_id)
+        if entry is None and guild_id is not None:
+            entries = self.guild_entries.get(guild_id)
+            if entries is not None:
+                entry = entries.get(user_id)
+        return entry
+
+    def add(self, entry: AfkEntry) -> None:
+        self.apply_add(entry)
+        if self.bot.cluster is not None:
+            self.bot.cluster.broadcast("afk_add", entry.to_payload())
+
+    def apply_add(self, entry: AfkEntry) -> None:
+        """Adds an entry whose row was just inserted, here or by another cluster."""
+        # a removal that is still queued must not delete the new row
+        self._removed.discard(entry.user_id)
+        self._mentions.pop(entry.user_id, None)
+        self._put(entry)
+
+    def remove(self, entry: AfkEntry) -> None:
+        self._discard(entry)
+        self._mentions.pop(entry.user_id, None)
+        self._removed.add(entry.user_id)
+        if self.bot.cluster is not None:
+            self.bot.cluster.broadcast("afk_remove", entry.user_id)
+
+    def apply_remove(self, user_id: int) -> None:
+        """Drops an entry another cluster removed, it deletes the row itself."""
+        entry = self._users.get(user_id)
+        if entry is not None:
+            self._discard(entry)
+            # its count is added to a row that is gone, nothing to lose
+            self._mentions.pop(user_id, None)
+
+    def _discard(self, entry: AfkEntry) -> None:
+        if self._users.get(entry.user_id) is entry:
+            del self._users[entry.user_id]
+        if entry.guild_id is None:
+            self.global_entries.pop(entry.user_id, None)
+        else:
+            entries = self.guild_entries.get(entry.guild_id, {})
+            entries.pop(entry.user_id, None)
+            if not entries:
+                self.guild_entries.pop(entry.guild_id, None)
+
+    def mentioned(self, entry: AfkEntry) -> None:
+        entry.mentions += 1
+        self._mentions[entry.user_id] = self._mentions.get(entry.user_id, 0) + 1
+
+    async def flush(self) -> None:
+        if not self._mentions and not self._removed:
+            return
+
+        mentions, removed = self._mentions, self._removed
+        self._mentions, self._removed = {}, set()
+
+        async def job(conn: aiosqlite.Connection) -> None:
+            if removed:
+                await conn.executemany("DELETE FROM afk WHERE afk_user_id = ?", [(user_id,) for user_id in removed])
+            if mentions:
+                await conn.executemany(
+                    "UPDATE afk SET afk_mentions = COALESCE(afk_mentions, 0) + ? WHERE afk_user_id = ?",
+                    [(count, user_id) for user_id, count in mentions.items()]
+                )
+
+        try:
+            await self.bot.db.run(job)
+        except Exception:
+            # keep them for the next try, unless they changed in the meantime
+            for user_id, count in mentions.items():
+                if user_id in self:
+                    self._mentions[user_id] = self._mentions.get(user_id, 0) + count
+            self._removed.update(user_id for user_id in removed if user_id not in self)
+            raise
+
+    @tasks.loop(seconds=FLUSH_INTERVAL)
+    async def flusher(self) -> None:
+        try:
+            await self.flush()
+        except Exception as e:
+            log.error(f"Failed to write AFK changes: {e}")
+
+    def start(self) -> None:
+        if not self.flusher.is_running():
+            self.flusher.start()
+
+    async def close(self) -> None:
+        self.flusher.cancel()
+        await self.flush()
@@ -22,13 +22,9 @@ class TicketReason(discord.ui.Modal, title="Ticket Reason"):
     async def on_submit(self, interaction: discord.Interaction):
 
         await interaction.response.defer(ephemeral=True)
-        async with self.bot.db.cursor() as cur:
-            await cur.execute("SELECT * FROM tickets WHERE ticket_guild_id = ?", (interaction.guild.id,))
-            data = await cur.fetchall()
- 
-        data = data[0]
+        data = await self.bot.db.fetchone("SELECT * FROM tickets WHERE ticket_guild_id = ?", interaction.guild.id)
         category = discord.utils.get(interaction.guild.categories, id=data[1])
-        role = interaction.guild.get_role(data[3])
+        role = interaction.guild.get_role(data["ticket_ping_role_id"])
         ticket = await interaction.guild.create_text_channel(f"ticket-{interaction.user.name}", category=category)
         await ticket.set_permissions(interaction.user, read_messages=True, send_messages=True)
         await ticket.set_permissions(interaction.guild.default_role, read_messages=False, send_messages=False)
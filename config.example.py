@@ -5,6 +5,14 @@ client_id = 0
 owner_id = 0
 owner_ids = []
 
+# number of processes to spread the shards over, 0 runs everything in one process
+clusters = 0
+# None asks discord for the recommended shard count
+shard_count = None
+
+# write the logs as JSON lines instead of plain text
+log_json = False
+
 extensions = [
     "developer",
     "events",
@@ -1 +1,2 @@
-from .bot import Robo
\ No newline at end of file
+from .bot import Robo
+from .cluster import ClusterLauncher
@@ -1,18 +1,31 @@
+import asyncio
+import hashlib
 import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
-from typing import Callable, Coroutine, List, Union, Optional
+import time
+from typing import Union, Optional
 
 import aiohttp
-import aiosqlite
 import datetime
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
 import sys
 import config
+from utils.buttons import LockView
 from utils.context import Context
 
+from .cluster import RESTART_EXIT_CODE, ClusterClient
+from .db import Database, migrate
+from .http import HTTPClient
+from .lag import LoopLagMonitor
+from .logs import setup_logging
+from .metrics import CommandMetrics
+from .prefix import PrefixResolver
+from .startup import StartupPipeline
+from .stats import Stats
+
 from cogs.robocog import flags
 
 flags.Flags.NO_DM_TRACEBACK = True
@@ -22,14 +35,23 @@ flags.Flags.NO_UNDERSCORE = True
 
 from utils.formats import format_dt
 
-on_startup: List[Callable[["Robo"], Coroutine]] = []
+class RoboTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        self.client.metrics.on_app_command_start(interaction)
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError) -> None:
+        self.client.metrics.on_app_command_error(interaction)
+        await super().on_error(interaction, error)
+
 
-class Robo(commands.Bot):
+class Robo(commands.AutoShardedBot):
     def __init__(
             self, 
             intents=discord.Intents.all(),
             owner_ids=config.owner_ids,
             case_insensitive=True,
+            cluster_id: Optional[int] = None,
             *args,
             **kwargs
         ):
@@ -38,66 +60,108 @@ class Robo(commands.Bot):
             owner_ids=owner_ids,
             case_insensitive=case_insensitive,
             command_prefix=self.get_prefix,
+            tree_cls=RoboTree,
             *args,
             **kwargs
         )
         self.owner_id = config.owner_id
         self.owner_ids = config.owner_ids
         self.uptime = None
+        self.http_client = HTTPClient()
+        # the pooled session of http_client, for code that needs a raw session
         self.session: aiohttp.ClientSession = None
         self.color = config.color2
         self.support_invite = config.support_invite
         self.ram_usage = None
+        # set when running under the cluster launcher
+        self.cluster_id = cluster_id
+        self.cluster: Optional[ClusterClient] = None
         self.setup_logging()
         self.config = config
         self.MAINTENANCE = False
-        self.db = None
+        self.db: Database = None
+        self.prefixes = PrefixResolver(self)
+        self.stats = Stats(self, "data/stats.json" if cluster_id is None else f"data/stats-{cluster_id}.json")
+        self.metrics = CommandMetrics(self)
+        self.metrics.install()
+        self.lag = LoopLagMonitor(self)
+        self.startup = StartupPipeline(self)
+        self._register_startup()
 
     async def setup_hook(self) -> None:
         self.uptime = datetime.datetime.now()
-        self.db = await aiosqlite.connect("data/robo.db")
-        for coro_func in on_startup:
-            self.loop.create_task(coro_func(self))
-
+        self.lag.start()
+        await self.startup.run()
+
+    def _register_startup(self) -> None:
+        stage = self.startup.add
+        stage("database", self._setup_database)
+        stage("http", self._setup_http)
+        stage("prefixes", self.prefixes.load, after=["database"])
+        stage("stats", self._setup_stats)
+        stage("views", self._setup_views)
+        stage("extensions", self.load_extensions, after=["database", "http", "prefixes"])
+        # a failed sync (a 429, a bad command payload) must not keep the bot offline
+        stage("sync", self.sync_app_commands, after=["extensions"], fatal=False)
+
+    async def _setup_database(self) -> None:
+        self.db = Database("data/robo.db")
+        await self.db.connect()
+        if self.cluster_id is None:
+            # under the cluster launcher the migrations already ran before any cluster started
+            await migrate(self.db)
+
+    async def _setup_http(self) -> None:
+        await self.http_client.start()
+        self.session = self.http_client.session
+
+    async def _setup_stats(self) -> None:
+        self.stats.on_boot()
+        self.stats.start()
+        if self.cluster is not None:
+            self.cluster.start()
+
+    async def _setup_views(self) -> None:
+        self.add_view(LockView())
 
     async def get_prefix(self, message: discord.Message):
-        async with self.db.cursor() as cursor:
-            await cursor.execute("SELECT * FROM no_prefix")
-            np = await cursor.fetchall()
-            await cursor.execute("SELECT * FROM guilds WHERE id = ?", (message.guild.id,))
-            p = await cursor.fetchone()
-
-        np_ids = [row[0] for row in np]
-
-        if p is None:
-            if message.author.id in np_ids:
-                extra = [p for p in config.prefixes]
-                extra.append("")
-                return commands.when_mentioned_or(*extra)(self, message)
-            else:
-                return commands.when_mentioned_or(*config.prefixes)(self, message)
+        return self.prefixes.resolve(message)
+
+    async def _load_extension(self, cog: str) -> None:
+        start = time.perf_counter()
+        try:
+            await self.load_extension(f"cogs.{cog}")
+        except Exception as e:
+            self.logger.error(f"Error while loading {cog}: {e.args[0]} {e.with_traceback(e.__traceback__)}")
         else:
-            if message.author.id in np_ids:
-                extra = [p for p in config.prefixes]
-                extra.append(p[1])
-                extra.append("")
-                return commands.when_mentioned_or(*extra)(self, message)
-            else:
-                return commands.when_mentioned_or(*config.prefixes, p[1])(self, message)
+            self.logger.info(f"Loaded {cog} in {(time.perf_counter() - start) * 1000:.0f}ms")
 
-    @on_startup.append
     async def load_extensions(self):
-        # for cog in os.listdir("cogs"): 
-        for cog in config.extensions:
-            try:
-                await self.load_extension(f"cogs.{cog}")
-            except Exception as e:
-                self.logger.error(f"Error while loading {cog}: {e.args[0]} {e.with_traceback(e.__traceback__)}")
-            else:   
-                self.logger.info(f"Loaded {cog}")
-        
+        # the cogs don't depend on each other, their setup and cog_load can overlap
+        await asyncio.gather(*(self._load_extension(cog) for cog in config.extensions))
+
+    async def sync_app_commands(self, *, force: bool = False) -> bool:
+        """Syncs the global commands, unless they didn't change since the last sync."""
+        if self.cluster_id not in (None, 0):
+            # global commands only have to be synced by one cluster
+            return False
+
+        payload = [command.to_dict() for command in self.tree._get_all_commands(guild=None)]
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        key = f"app_commands_hash:{self.application_id}"
+
+        if not force and await self.db.fetchval("SELECT value FROM bot_state WHERE key=?", key) == digest:
+            self.logger.info(f"Global commands unchanged, skipped syncing {len(payload)} commands")
+            return False
+
         synced = await self.tree.sync()
+        await self.db.execute(
+            "INSERT INTO bot_state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+            key,
+            digest,
+        )
         self.logger.info(f"Synced {len(synced)} global commands")
+        return True
 
     async def get_context(self, origin: Union[discord.Interaction, discord.Message], /, *, cls=Context) -> Context:
         return await super().get_context(origin, cls=cls)
@@ -114,30 +178,12 @@ class Robo(commands.Bot):
                 if self.MAINTENANCE and message.author.id != self.owner_id:
                     return await message.channel.send(f"[Bot is in maintenance mode. Please try again later.](<{config.support_invite}>)")
                 await self.invoke(ctx)
-            try:
-                with open("data/stats.json", "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            
-                with open("data/stats.json", "w", encoding="utf-8") as f:
-                    data["commands_ran"] += 1
-                
-                    json.dump(data, f, indent=4)
-            except json.JSONDecodeError:
-                pass
+                self.stats.on_command(ctx)
 
     async def on_message(self, message: discord.Message):
         if message.author.bot:
             return
-        try:
-            with open("data/stats.json", "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            with open("data/stats.json", "w", encoding="utf-8") as f:
-                data["messages_seen"] += 1
-            
-                json.dump(data, f, indent=4)
-        except json.JSONDecodeError:
-            pass
+        self.stats.on_message(message)
 
         if message.content == self.user.mention:
             embed = discord.Embed(
@@ -173,32 +219,18 @@ class Robo(commands.Bot):
 
     def setup_logging(self):
         self.logger = logging.getLogger("Robo")
-        self.logger.setLevel(logging.INFO)  
-
-        dt_fmt = '%Y-%m-%d %H:%M:%S'
-        formatter = logging.Formatter('{asctime} {levelname:<8} {name} {message}', dt_fmt, style='{')
-
-        stream_handler = logging.StreamHandler()
-        stream_handler.setFormatter(formatter)
-        self.logger.addHandler(stream_handler)
-
-        file_handler = RotatingFileHandler(filename='robo.log', mode="a", maxBytes=1024 * 1024 * 5, backupCount=5)
-        file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
+        filename = 'robo.log' if self.cluster_id is None else f'robo-{self.cluster_id}.log'
+        # discord.py's own logs go through the same queue, see boot()
+        self.log_listener = setup_logging(
+            "Robo",
+            "discord",
+            filename=filename,
+            json_lines=getattr(config, "log_json", False),
+        )
 
     def boot(self):
         self.logger.info("Booting up...")
-        super().run(config.token)
-
-        try:
-            with open("data/stats.json", "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            with open("data/stats.json", "w", encoding="utf-8") as f:
-                data["booted"] += 1
-                json.dump(data, f, indent=4)
-        except json.JSONDecodeError:
-            pass
+        super().run(config.token, log_handler=None)
 
         if KeyboardInterrupt:
             os._exit(0)
@@ -207,39 +239,44 @@ class Robo(commands.Bot):
     def clearshell(self):
         os.system("cls" if os.name == "nt" else "clear")
 
+    async def close(self) -> None:
+        self.stats.stop()
+        self.lag.stop()
+        if self.cluster is not None:
+            self.cluster.stop()
+        await super().close()
+        await self.http_client.close()
+        self.log_listener.stop()
+        if self.db is not None:
+            await self.db.close()
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether `guild_id` is on one of the shards of this process."""
+        if self.shard_ids is None or not self.shard_count:
+            return True
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
+
+    def set_maintenance(self, enabled: bool) -> None:
+        self.MAINTENANCE = enabled
+        if self.cluster is not None:
+            self.cluster.broadcast("maintenance", enabled)
+
+    async def _restart_cluster(self) -> None:
+        await self.close()
+        os._exit(RESTART_EXIT_CODE)
+
     def reboot(self):
-        with open("data/stats.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
+        self.stats.mark_reboot()
 
-        data["boot_m"]["sent"] = False
-        
-        with open("data/stats.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+        if self.cluster is not None:
+            # the launcher starts this cluster again once the process exits
+            self.loop.create_task(self._restart_cluster())
+            return
 
         loop = self.loop
         loop.create_task(self.close())
         loop.stop()
         
+        self.log_listener.stop()
         self.clearshell()
         os.execv(sys.executable, ["python"] + sys.argv)
-
-    @commands.command(hidden=True)
-    @commands.is_owner()
-    async def reboot(self, ctx: Context):
-        """Reboots the bot"""
-        with open("data/stats.json", "r") as f:
-            data = json.load(f)
-
-        data["boot_m"]["sent"] = "false"
-        data["boot_m"]["id"] = ctx.channel.id
-
-        with open("data/stats.json", "w") as f:
-            json.dump(data, f, indent=4)
-
-        await ctx.send("Rebooting...")
-        if os.name == "nt":
-            await self.bot.reboot()
-        if os.name == "posix":
-            os.system("pm2 restart robo")
-        else:
-            await ctx.send("Reboot failed.")
@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import urllib.request
+from logging.handlers import QueueListener
+from multiprocessing.connection import Connection, wait
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from discord.ext import tasks
+
+import config
+
+from .logs import setup_logging
+
+if TYPE_CHECKING:
+    from .bot import Robo
+
+log = logging.getLogger("Robo")
+
+# a cluster exiting with this code is restarted right away, without backoff
+RESTART_EXIT_CODE = 75
+
+REPORT_INTERVAL = 15
+
+
+def fetch_shard_count(token: str) -> int:
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "DiscordBot (robo, 1.0)"},
+    )
+    with urllib.request.urlopen(request, timeout=10) as resp:
+        return json.load(resp)["shards"]
+
+
+def split_shards(shard_count: int, clusters: int) -> List[List[int]]:
+    # contiguous ranges, so the shards of a cluster share identify buckets
+    clusters = max(1, min(clusters, shard_count))
+    size, extra = divmod(shard_count, clusters)
+    ranges: List[List[int]] = []
+    start = 0
+    for index in range(clusters):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def _run_cluster(
+    factory: Callable[..., Robo],
+    cluster_id: int,
+    shard_ids: List[int],
+    shard_count: int,
+    conn: Connection,
+    maintenance: bool,
+) -> None:
+    bot = factory(shard_ids=shard_ids, shard_count=shard_count, cluster_id=cluster_id)
+    bot.cluster = ClusterClient(bot, cluster_id, conn)
+    bot.MAINTENANCE = maintenance
+    bot.logger.info(f"Cluster {cluster_id} starting with shards {shard_ids[0]}-{shard_ids[-1]} of {shard_count}")
+    bot.boot()
+
+
+class Cluster:
+    def __init__(self, cluster_id: int, shard_ids: List[int]) -> None:
+        self.id = cluster_id
+        self.shard_ids = shard_ids
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.conn: Optional[Connection] = None
+        self.started_at: float = 0.0
+        self.failures: int = 0
+        self.restart_at: Optional[float] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class ClusterLauncher:
+    """
+    Runs the bot as several processes, each one owning a range of shards.
+
+    The launcher is the supervisor: it restarts clusters that die (with an
+    exponential backoff for crash loops), keeps the latest stats report of
+    every cluster and relays broadcasts such as the maintenance toggle.
+    Clusters talk to it over a pipe, see `ClusterClient`.
+    """
+
+    def __init__(self, factory: Callable[..., Robo], *, clusters: int, shard_count: Optional[int] = None) -> None:
+        self.factory = factory
+        self.cluster_count = clusters
+        self.shard_count = shard_count
+        self.clusters: List[Cluster] = []
+        self.reports: Dict[int, Dict[str, Any]] = {}
+        self.maintenance = False
+        self._context = multiprocessing.get_context("spawn")
+        self._stopping = False
+        self._log_listener: Optional[QueueListener] = None
+
+    def _prepare(self) -> None:
+        # migrations run once here instead of racing in every cluster,
+        # Robo skips them when it is started with a cluster_id
+        from .db import Database, migrate
+
+        async def runner() -> None:
+            db = Database("data/robo.db", readers=1)
+            await db.connect()
+            try:
+                await migrate(db)
+            finally:
+                await db.close()
+
+        asyncio.run(runner())
+
+    def _spawn(self, cluster: Cluster) -> None:
+        parent, child = self._context.Pipe()
+        process = self._context.Process(
+            target=_run_cluster,
+            args=(self.factory, cluster.id, cluster.shard_ids, self.shard_count, child, self.maintenance),
+            name=f"robo-cluster-{cluster.id}",
+        )
+        process.start()
+        child.close()
+
+        cluster.process = process
+        cluster.conn = parent
+        cluster.started_at = time.monotonic()
+        cluster.restart_at = None
+        log.info(f"Started cluster {cluster.id} (pid {process.pid})")
+
+    def _send(self, cluster: Cluster, payload: Dict[str, Any]) -> None:
+        if cluster.conn is None or not cluster.alive:
+            return
+        try:
+            cluster.conn.send(payload)
+        except (OSError, EOFError):
+            pass
+
+    def _handle(self, cluster: Cluster, payload: Dict[str, Any]) -> None:
+        op = payload.get("op")
+        if op == "stats":
+            self.reports[cluster.id] = payload["data"]
+        elif op == "request":
+            if payload["action"] == "stats":
+                data: Any = [self.reports[key] for key in sorted(self.reports)]
+            else:
+                data = None
+            self._send(cluster, {"op": "response", "nonce": payload["nonce"], "data": data})
+        elif op == "broadcast":
+            if payload["event"] == "maintenance":
+                self.maintenance = bool(payload["data"])
+            # every event is relayed, the sender already applied it itself
+            for other in self.clusters:
+                if other is not cluster:
+                    self._send(other, payload)
+
+    def _on_exit(self, cluster: Cluster) -> None:
+        assert cluster.process is not None
+        code = cluster.process.exitcode
+        if cluster.conn is not None:
+            cluster.conn.close()
+            cluster.conn = None
+        self.reports.pop(cluster.id, None)
+
+        if self._stopping or code == 0:
+            log.info(f"Cluster {cluster.id} stopped")
+            cluster.process = None
+            return
+
+        if code == RESTART_EXIT_CODE:
+            delay = 0.0
+        else:
+            # a cluster that ran for a while isn't crash looping
+            if time.monotonic() - cluster.started_at > 300:
+                cluster.failures = 0
+            cluster.failures += 1
+            delay = min(2 ** cluster.failures, 120)
+            log.error(f"Cluster {cluster.id} died with exit code {code}, restarting in {delay}s")
+
+        cluster.process = None
+        cluster.restart_at = time.monotonic() + delay
+
+    def run(self) -> None:
+        # the clusters set up their own logging, the launcher needs its own for the supervisor
+        self._log_listener = setup_logging("Robo", filename="robo-launcher.log")
+        try:
+            if self.shard_count is None:
+                self.shard_count = fetch_shard_count(config.token)
+
+            self._prepare()
+            for cluster_id, shard_ids in enumerate(split_shards(self.shard_count, self.cluster_count)):
+                self.clusters.append(Cluster(cluster_id, shard_ids))
+            log.info(f"Launching {len(self.clusters)} clusters for {self.shard_count} shards")
+
+            for cluster in self.clusters:
+                self._spawn(cluster)
+
+            self._supervise()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._stopping = True
+            self._shutdown()
+
+    def _supervise(self) -> None:
+        while True:
+            waitables: Dict[Any, Cluster] = {}
+            for cluster in self.clusters:
+                if cluster.process is not None:
+                    waitables[cluster.process.sentinel] = cluster
+                if cluster.conn is not None:
+                    waitables[cluster.conn] = cluster
+
+            if not waitables and all(c.restart_at is None for c in self.clusters):
+                log.info("All clusters stopped")
+                return
+
+            for ready in wait(list(waitables), timeout=1.0):
+                cluster = waitables[ready]
+                if ready is cluster.conn:
+                    try:
+                        self._handle(cluster, cluster.conn.recv())
+                    except (EOFError, OSError):
+                        # the process is going away, its sentinel handles the rest
+                        cluster.conn.close()
+                        cluster.conn = None
+                elif cluster.process is not None and not cluster.process.is_alive():
+                    cluster.process.join()
+                    self._on_exit(cluster)
+
+            now = time.monotonic()
+            for cluster in self.clusters:
+                if cluster.restart_at is not None and cluster.restart_at <= now:
+                    self._spawn(cluster)
+
+    def _shutdown(self) -> None:
+        for cluster in self.clusters:
+            if cluster.alive:
+                cluster.process.terminate()  # type: ignore
+        for cluster in self.clusters:
+            if cluster.process is not None:
+                cluster.process.join(timeout=30)
+                if cluster.process.is_alive():
+                    cluster.process.kill()
+        log.info("Launcher stopped")
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
+
+
+class ClusterClient:
+    """
+    The cluster side of the launcher pipe.
+
+    A thread blocks on the pipe and hands every message to the event loop,
+    stats are reported to the launcher every `REPORT_INTERVAL` seconds.
+    """
+
+    def __init__(self, bot: Robo, cluster_id: int, conn: Connection) -> None:
+        self.bot = bot
+        self.id = cluster_id
+        self.conn = conn
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self._send_lock = threading.Lock()
+        self._nonce = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        threading.Thread(target=self._reader, name=f"robo-cluster-{self.id}-ipc", daemon=True).start()
+        self.reporter.start()
+
+    def stop(self) -> None:
+        self.reporter.cancel()
+
+    def _reader(self) -> None:
+        assert self._loop is not None
+        while True:
+            try:
+                payload = self.conn.recv()
+            except (EOFError, OSError):
+                # the launcher is gone, there is nobody left to supervise us
+                log.error("Lost the connection to the cluster launcher")
+                self._loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self.bot.close()))
+                return
+            self._loop.call_soon_threadsafe(self._dispatch, payload)
+
+    def _dispatch(self, payload: Dict[str, Any]) -> None:
+        op = payload.get("op")
+        if op == "response":
+            fut = self._waiters.pop(payload["nonce"], None)
+            if fut is not None and not fut.done():
+                fut.set_result(payload["data"])
+        elif op == "broadcast":
+            event, data = payload["event"], payload["data"]
+            if event == "maintenance":
+                self.bot.MAINTENANCE = bool(data)
+                log.info(f"Maintenance mode {'enabled' if self.bot.MAINTENANCE else 'disabled'} by the launcher")
+            elif event == "no_prefix_add":
+                self.bot.prefixes.no_prefix.add(data)
+            elif event == "no_prefix_remove":
+                self.bot.prefixes.no_prefix.discard(data)
+            else:
+                # anything else is for the cogs, as an on_cluster_<event> listener
+                self.bot.dispatch(f"cluster_{event}", data)
+
+    def send(self, payload: Dict[str, Any]) -> None:
+        with self._send_lock:
+            self.conn.send(payload)
+
+    async def request(self, action: str, *, timeout: float = 5.0) -> Any:
+        self._nonce += 1
+        nonce = f"{self.id}-{self._nonce}"
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters[nonce] = fut
+        self.send({"op": "request", "action": action, "nonce": nonce})
+        try:
+            return await asyncio.wait_for(fut, timeout=timeout)
+        finally:
+            self._waiters.pop(nonce, None)
+
+    def broadcast(self, event: str, data: Any) -> None:
+        self.send({"op": "broadcast", "event": event, "data": data})
+
+    def report(self) -> Dict[str, Any]:
+        bot = self.bot
+        return {
+            "cluster": self.id,
+            "pid": os.getpid(),
+            "shards": list(bot.shard_ids or []),
+            "guilds": len(bot.guilds),
+            "users": len(bot.users),
+            "latency": bot.latency,
+            "messages_seen": bot.stats.messages_seen,
+            "commands_ran": bot.stats.commands_ran,
+            "command_uses": dict(bot.stats.command_uses.most_common(10)),
+        }
+
+    @tasks.loop(seconds=REPORT_INTERVAL)
+    async def reporter(self) -> None:
+        try:
+            self.send({"op": "stats", "data": self.report()})
+        except (OSError, EOFError):
+            pass
+
+    async def stats(self) -> List[Dict[str, Any]]:
+        """Latest stats of every cluster, this one is always up to date."""
+        try:
+            reports = await self.request("stats")
+        except asyncio.TimeoutError:
+            reports = []
+        reports = [r for r in reports if r["cluster"] != self.id]
+        reports.append(self.report())
+        reports.sort(key=lambda r: r["cluster"])
+        return reports
@@ -0,0 +1,2 @@
+from .database import Database, Row
+from .migrations import migrate
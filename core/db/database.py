@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+from contextlib import asynccontextmanager
+from typing import (Any, AsyncIterator, Awaitable, Callable, Iterable, List,
+                    Optional, Sequence, Tuple, TypeVar)
+
+import aiosqlite
+
+T = TypeVar("T")
+
+log = logging.getLogger("Robo")
+
+Row = sqlite3.Row
+WriteJob = Callable[[aiosqlite.Connection], Awaitable[Any]]
+
+PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA mmap_size = 67108864",
+)
+
+
+class Database:
+    """
+    SQLite access layer used by every cog.
+
+    The database runs in WAL mode so readers never wait for the writer.
+    Reads are served by a small pool of read-only connections, writes are
+    pushed onto a queue and executed by a single writer task which commits
+    everything that is queued at the same time in one transaction.
+
+    Every connection keeps a cache of prepared statements, so the same
+    query text is only compiled once per connection.
+    """
+
+    MAX_BATCH = 64
+
+    def __init__(self, path: str, *, readers: int = 4, cached_statements: int = 256) -> None:
+        self.path = path
+        self.reader_count = readers
+        self.cached_statements = cached_statements
+        self._readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._all_readers: List[aiosqlite.Connection] = []
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._queue: asyncio.Queue[Optional[Tuple[WriteJob, asyncio.Future]]] = asyncio.Queue()
+        self._writer_task: Optional[asyncio.Task] = None
+
+    async def _open(self, *, readonly: bool) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(
+            self.path,
+            isolation_level=None,
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            await conn.execute(pragma)
+        if readonly:
+            await conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    async def connect(self) -> None:
+        self._writer = await self._open(readonly=False)
+        async with self._writer.execute("PRAGMA journal_mode = WAL") as cur:
+            mode = await cur.fetchone()
+        if mode is None or mode[0].lower() != "wal":
+            log.warning(f"Could not switch {self.path} to WAL mode, running in {mode[0] if mode else 'unknown'} mode")
+
+        for _ in range(self.reader_count):
+            conn = await self._open(readonly=True)
+            self._all_readers.append(conn)
+            self._readers.put_nowait(conn)
+
+        self._writer_task = asyncio.create_task(self._writer_loop(), name="robo-db-writer")
+        log.info(f"Opened {self.path} with {self.reader_count} readers")
+
+    async def close(self) -> None:
+        if self._writer_task is not None:
+            # the sentinel lets the writer finish everything queued before it
+            self._queue.put_nowait(None)
+            await self._writer_task
+            self._writer_task = None
+
+        for conn in self._all_readers:
+            await conn.close()
+        self._all_readers.clear()
+
+        if self._writer is not None:
+            await self._writer.execute("PRAGMA optimize")
+            await self._writer.close()
+            self._writer = None
+
+    # reads
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrows a read-only connection from the pool."""
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    async def fetchall(self, query: str, *args: Any) -> List[Row]:
+        async with self.acquire() as conn:
+            async with conn.execute(query, args) as cur:
+                return list(await cur.fetchall())
+
+    async def fetchone(self, query: str, *args: Any) -> Optional[Row]:
+        async with self.acquire() as conn:
+            async with conn.execute(query, args) as cur:
+                return await cur.fetchone()
+
+    async def fetchval(self, query: str, *args: Any, default: Any = None) -> Any:
+        row = await self.fetchone(query, *args)
+        if row is None:
+            return default
+        return row[0]
+
+    # writes
+
+    async def _writer_loop(self) -> None:
+        while True:
+            item = await self._queue.get()
+            batch = [item]
+            while len(batch) < self.MAX_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            jobs = [job for job in batch if job is not None]
+            if jobs:
+                try:
+                    await self._run_batch(jobs)
+                except Exception as e:
+                    # a broken batch must never take the writer down with it
+                    log.exception(f"Database write batch failed: {e}")
+                    for _, fut in jobs:
+                        if not fut.done():
+                            fut.set_exception(e)
+
+            if None in batch:
+                return
+
+    async def _run_batch(self, jobs: List[Tuple[WriteJob, asyncio.Future]]) -> None:
+        conn = self._writer
+        assert conn is not None
+        done: List[Tuple[asyncio.Future, Any]] = []
+
+        def fail(futures: Iterable[asyncio.Future], error: BaseException) -> None:
+            for fut in futures:
+                if not fut.done():
+                    fut.set_exception(error)
+
+        try:
+            await conn.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            fail((fut for _, fut in jobs), e)
+            return
+
+        for index, (job, fut) in enumerate(jobs):
+            # each job gets a savepoint so one failing write doesn't undo the others
+            error: Optional[Exception] = None
+            try:
+                await conn.execute("SAVEPOINT job")
+                result = await job(conn)
+            except Exception as e:
+                error = e
+                fail((fut,), e)
+                try:
+                    if conn.in_transaction:
+                        await conn.execute("ROLLBACK TO job")
+                        await conn.execute("RELEASE job")
+                except Exception as cleanup_error:
+                    log.error(f"Database savepoint cleanup failed: {cleanup_error}")
+                    error = cleanup_error
+                else:
+                    if conn.in_transaction:
+                        continue
+            else:
+                try:
+                    await conn.execute("RELEASE job")
+                except Exception as e:
+                    error = e
+                    fail((fut,), e)
+                else:
+                    done.append((fut, result))
+                    continue
+
+            # sqlite ended the whole transaction (OR ROLLBACK, SQLITE_FULL,
+            # SQLITE_IOERR, ...) or it can't be trusted anymore, nothing of it stays
+            log.error(f"Database transaction lost: {error}")
+            try:
+                if conn.in_transaction:
+                    await conn.execute("ROLLBACK")
+            except Exception as rollback_error:
+                log.error(f"Database rollback failed: {rollback_error}")
+            fail((fut for fut, _ in done), error)
+            fail((fut for _, fut in jobs[index + 1:]), error)
+            return
+
+        try:
+            await conn.execute("COMMIT")
+        except Exception as e:
+            log.error(f"Database commit failed: {e}")
+            try:
+                if conn.in_transaction:
+                    await conn.execute("ROLLBACK")
+            except Exception as rollback_error:
+                log.error(f"Database rollback failed: {rollback_error}")
+            fail((fut for fut, _ in done), e)
+            return
+
+        for fut, result in done:
+            if not fut.done():
+                fut.set_result(result)
+
+    async def run(self, job: Callable[[aiosqlite.Connection], Awaitable[T]]) -> T:
+        """
+        Runs `job` with the writer connection inside a transaction.
+
+        Returns once the transaction that contains the job is committed.
+        """
+        if self._writer_task is None:
+            raise RuntimeError("Database is not connected")
+
+        fut: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((job, fut))
+        return await fut
+
+    async def execute(self, query: str, *args: Any) -> int:
+        """Runs a single write and returns the number of changed rows."""
+
+        async def job(conn: aiosqlite.Connection) -> int:
+            async with conn.execute(query, args) as cur:
+                return cur.rowcount
+
+        return await self.run(job)
+
+    async def executemany(self, query: str, rows: Iterable[Sequence[Any]]) -> int:
+        rows = list(rows)
+
+        async def job(conn: aiosqlite.Connection) -> int:
+            async with conn.executemany(query, rows) as cur:
+                return cur.rowcount
+
+        return await self.run(job)
+
+    async def transaction(self, statements: Iterable[Tuple[str, Sequence[Any]]]) -> None:
+        """Runs several writes atomically, either all of them apply or none."""
+        statements = list(statements)
+
+        async def job(conn: aiosqlite.Connection) -> None:
+            for query, args in statements:
+                await conn.execute(query, args)
+
+        await self.run(job)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import datetime
+import logging
+import os
+import re
+import sqlite3
+import time
+from typing import List, NamedTuple
+
+import aiosqlite
+
+from .database import Database
+
+log = logging.getLogger("Robo")
+
+MIGRATIONS_PATH = "data/migrations"
+
+_filename_regex = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: str
+
+
+class AppliedMigration(NamedTuple):
+    version: int
+    name: str
+    duration: float
+
+
+def find_migrations(path: str = MIGRATIONS_PATH) -> List[Migration]:
+    migrations: List[Migration] = []
+    for filename in os.listdir(path):
+        match = _filename_regex.match(filename)
+        if match is None:
+            continue
+        migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(path, filename)))
+
+    migrations.sort()
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {path}")
+    return migrations
+
+
+def split_statements(script: str) -> List[str]:
+    # executescript() would commit the writer's transaction, so the script is
+    # split into complete statements (this understands triggers as well)
+    statements: List[str] = []
+    buffer = ""
+    for line in script.splitlines(keepends=True):
+        if not buffer and (not line.strip() or line.lstrip().startswith("--")):
+            continue
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ""
+
+    if buffer.strip():
+        raise RuntimeError(f"Incomplete statement in migration: {buffer.strip()[:80]}")
+    return statements
+
+
+async def migrate(db: Database, path: str = MIGRATIONS_PATH) -> List[AppliedMigration]:
+    """
+    Brings the database to the latest schema.
+
+    Migrations are the numbered `.sql` files in `path`. Every migration runs
+    in its own transaction and is recorded in `schema_migrations` together
+    with the time it took, so each one is applied exactly once.
+    """
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL,
+            duration_ms REAL NOT NULL
+        )
+        """
+    )
+    rows = await db.fetchall("SELECT version FROM schema_migrations")
+    current = {row[0] for row in rows}
+
+    applied: List[AppliedMigration] = []
+    for migration in find_migrations(path):
+        if migration.version in current:
+            continue
+
+        with open(migration.path, "r", encoding="utf-8") as f:
+            statements = split_statements(f.read())
+
+        async def job(conn: aiosqlite.Connection, migration: Migration = migration, statements: List[str] = statements) -> float:
+            start = time.perf_counter()
+            for statement in statements:
+                await conn.execute(statement)
+            duration = (time.perf_counter() - start) * 1000
+            await conn.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at, duration_ms) VALUES (?, ?, ?, ?)",
+                (migration.version, migration.name, datetime.datetime.utcnow().isoformat(), duration),
+            )
+            return duration
+
+        try:
+            duration = await db.run(job)
+        except Exception:
+            log.exception(f"Migration {migration.version:04} {migration.name} failed")
+            raise
+
+        log.info(f"Applied migration {migration.version:04} {migration.name} in {duration:.2f}ms")
+        applied.append(AppliedMigration(migration.version, migration.name, duration))
+
+    if not applied:
+        log.info("Database schema is up to date")
+    return applied
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+from typing import Any, Mapping, NamedTuple, Optional
+
+import aiohttp
+
+log = logging.getLogger("Robo")
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class Response(NamedTuple):
+    status: int
+    headers: Mapping[str, str]
+    body: bytes
+    url: str
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding, errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class HTTPClient:
+    """
+    The one HTTP client of the bot, created by the startup pipeline.
+
+    All requests share a single pooled connector, so connections (and their
+    TLS handshakes) are reused, DNS answers are cached and no single host can
+    take up the whole pool. Idempotent requests are retried with exponential
+    backoff on connection errors, timeouts, 429s and 5xx responses.
+
+    `bot.session` is the underlying session, for code that needs a raw
+    `aiohttp.ClientSession` (webhooks for example).
+    """
+
+    def __init__(
+        self,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        dns_ttl: int = 300,
+        timeout: float = 15.0,
+        connect_timeout: float = 5.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        user_agent: str = "Robo (https://github.com/0xhimangshu/Robo)",
+    ) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.user_agent = user_agent
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        if self.session is not None and not self.session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_ttl,
+            enable_cleanup_closed=True,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            headers={"User-Agent": self.user_agent},
+        )
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _delay(self, attempt: int, resp: Optional[aiohttp.ClientResponse]) -> float:
+        if resp is not None and resp.status == 429:
+            retry_after = resp.headers.get("Retry-After")
+            if retry_after is not None:
+                try:
+                    return min(float(retry_after), 60.0)
+                except ValueError:
+                    pass
+        # exponential backoff with full jitter
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        retries: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Response:
+        """
+        Sends a request and reads the whole body.
+
+        Non 2xx responses are returned, not raised, once the retries are used up.
+        """
+        if self.session is None:
+            raise RuntimeError("HTTP client is not started")
+
+        method = method.upper()
+        if retries is None:
+            retries = self.retries if method in IDEMPOTENT_METHODS else 0
+
+        attempt = 0
+        while True:
+            try:
+                async with self.session.request(method, url, **kwargs) as resp:
+                    if resp.status in RETRY_STATUSES and attempt < retries:
+                        delay = self._delay(attempt, resp)
+                    else:
+                        return Response(resp.status, resp.headers, await resp.read(), str(resp.url))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= retries:
+                    raise
+                delay = self._delay(attempt, None)
+                log.debug(f"{method} {url} failed with {e!r}, retrying in {delay:.2f}s")
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs: Any) -> Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def get_json(self, url: str, **kwargs: Any) -> Any:
+        resp = await self.request("GET", url, **kwargs)
+        return resp.json()
+
+    async def get_text(self, url: str, **kwargs: Any) -> str:
+        resp = await self.request("GET", url, **kwargs)
+        return resp.text()
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import TYPE_CHECKING, Deque, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from .bot import Robo
+
+log = logging.getLogger("Robo")
+
+
+class Stall(NamedTuple):
+    when: datetime.datetime
+    lag: float
+    stack: List[str]
+
+    @property
+    def location(self) -> str:
+        # the innermost frame that belongs to us is usually the culprit
+        for line in reversed(self.stack):
+            if "site-packages" not in line and "/lib/python" not in line:
+                return line.splitlines()[0].strip()
+        return self.stack[-1].splitlines()[0].strip() if self.stack else "unknown"
+
+
+class LoopLagMonitor:
+    """
+    Watches the event loop for callbacks that block it.
+
+    A task on the loop wakes up every `interval` seconds and measures how
+    late it woke up. A helper thread watches the same heartbeat, and once the
+    loop has been silent for `threshold` seconds it grabs the loop thread's
+    current stack, which is the code that is blocking it right now.
+
+    The slowest stalls are kept in a small ring buffer for `robo lag`.
+    """
+
+    def __init__(self, bot: Robo, *, interval: float = 0.25, threshold: float = 0.25, keep: int = 25) -> None:
+        self.bot = bot
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls: Deque[Stall] = deque(maxlen=keep)
+
+        self.last_lag: float = 0.0
+        self.max_lag: float = 0.0
+        self.total_stalls: int = 0
+
+        self._beat: float = time.perf_counter()
+        self._stack: Optional[List[str]] = None
+        self._lock = threading.Lock()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="robo-loop-lag")
+        self._thread = threading.Thread(target=self._watch, name="robo-loop-lag-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            self._beat = expected
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - expected, 0.0)
+            self.last_lag = lag
+
+            with self._lock:
+                stack, self._stack = self._stack, None
+
+            if lag >= self.threshold:
+                self._record(lag, stack)
+
+    def _record(self, lag: float, stack: Optional[List[str]]) -> None:
+        stall = Stall(datetime.datetime.now(), lag, stack or [])
+        self.total_stalls += 1
+        self.max_lag = max(self.max_lag, lag)
+
+        if len(self.stalls) == self.stalls.maxlen:
+            # only replace the mildest stall, so the buffer keeps the worst ones
+            mildest = min(self.stalls, key=lambda s: s.lag)
+            if mildest.lag >= lag:
+                log.warning(f"Event loop blocked for {lag * 1000:.0f}ms at {stall.location}")
+                return
+            self.stalls.remove(mildest)
+        self.stalls.append(stall)
+
+        log.warning(
+            f"Event loop blocked for {lag * 1000:.0f}ms at {stall.location}\n" + "".join(stall.stack[-8:]).rstrip()
+        )
+
+    def _watch(self) -> None:
+        # runs in its own thread, the loop thread may be stuck
+        while not self._stopped.wait(self.interval / 2):
+            overdue = time.perf_counter() - self._beat
+            if overdue < self.threshold:
+                continue
+
+            with self._lock:
+                if self._stack is not None:
+                    # already captured this stall
+                    continue
+                frame = sys._current_frames().get(self._loop_thread)  # type: ignore
+                if frame is None:
+                    continue
+                self._stack = traceback.format_stack(frame)
+
+    def worst(self) -> List[Stall]:
+        return sorted(self.stalls, key=lambda s: s.lag, reverse=True)
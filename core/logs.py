@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import datetime
+import json
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional, Tuple
+
+# extra fields a record can carry, e.g. log.info("...", extra={"guild": guild.id})
+STRUCTURED_FIELDS = ("guild", "command", "latency", "cluster")
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats every record as a single JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `limit` records per logger through every `period` seconds.
+
+    Warnings and errors are never dropped. The next record that passes after
+    a dropped burst mentions how many records were suppressed.
+    """
+
+    def __init__(self, limit: int = 50, period: float = 10.0) -> None:
+        super().__init__()
+        self.limit = limit
+        self.period = period
+        self._windows: Dict[str, Tuple[float, int, int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            start, count, dropped = self._windows.get(record.name, (now, 0, 0))
+            if now - start >= self.period:
+                start, count = now, 0
+
+            if count >= self.limit and record.levelno < logging.WARNING:
+                self._windows[record.name] = (start, count, dropped + 1)
+                return False
+
+            self._windows[record.name] = (start, count + 1, 0)
+
+        if dropped:
+            record.msg = f"{record.msg} ({dropped} similar records suppressed)"
+        return True
+
+
+class _PreparedQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # unlike the default prepare() this keeps the traceback out of the
+        # message, so the listener's formatter (plain or JSON) lays it out
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(
+    *names: str,
+    filename: str = "robo.log",
+    json_lines: bool = False,
+    level: int = logging.INFO,
+    rate_limit: Optional[int] = 50,
+) -> QueueListener:
+    """
+    Routes the given loggers through a queue to a background thread.
+
+    Log calls on the event loop only put the record on a queue, the console
+    and the rotating file are written (and rotated) by the listener thread.
+    The returned listener has to be stopped on shutdown to flush the queue.
+    """
+    if json_lines:
+        formatter: logging.Formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter("{asctime} {levelname:<8} {name} {message}", "%Y-%m-%d %H:%M:%S", style="{")
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    file_handler = RotatingFileHandler(filename=filename, mode="a", maxBytes=1024 * 1024 * 5, backupCount=5, encoding="utf-8")
+    file_handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _PreparedQueueHandler(log_queue)
+    if rate_limit:
+        queue_handler.addFilter(RateLimitFilter(limit=rate_limit))
+
+    for name in names:
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+        # creating a second bot in the same process must not duplicate every line
+        for handler in [h for h in logger.handlers if isinstance(h, _PreparedQueueHandler)]:
+            logger.removeHandler(handler)
+        logger.addHandler(queue_handler)
+
+    listener = QueueListener(log_queue, stream_handler, file_handler, respect_handler_level=True)
+    listener.start()
+    return listener
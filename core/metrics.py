@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import logging
+import time
+from array import array
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+from discord.ext.commands.hybrid import HybridAppCommand
+
+if TYPE_CHECKING:
+    from utils.context import Context
+
+    from .bot import Robo
+
+log = logging.getLogger("Robo")
+
+
+class Histogram:
+    """
+    Fixed size log-linear latency histogram (the HdrHistogram layout).
+
+    Values are recorded in microseconds. Every power of two is split into
+    16 linear sub-buckets, which keeps the relative error of a percentile
+    under ~6% while the whole histogram is a single 384 slot array.
+    """
+
+    SUB_BITS = 4
+    SUB_COUNT = 1 << SUB_BITS
+    BUCKETS = 24 * SUB_COUNT  # up to ~2^27us, a bit more than two minutes
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts = array("L", bytes(array("L").itemsize * self.BUCKETS))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        if value < cls.SUB_COUNT:
+            return value
+        exponent = value.bit_length() - cls.SUB_BITS - 1
+        index = (exponent + 1) * cls.SUB_COUNT + (value >> exponent) - cls.SUB_COUNT
+        return min(index, cls.BUCKETS - 1)
+
+    @classmethod
+    def _value(cls, index: int) -> float:
+        # midpoint of the bucket, in microseconds
+        if index < cls.SUB_COUNT:
+            return float(index)
+        exponent = index // cls.SUB_COUNT - 1
+        sub = index % cls.SUB_COUNT + cls.SUB_COUNT
+        low = sub << exponent
+        return low + ((1 << exponent) - 1) / 2
+
+    def record(self, seconds: float) -> None:
+        micros = max(int(seconds * 1_000_000), 0)
+        self.counts[self._index(micros)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent: float) -> float:
+        """Returns the given percentile in seconds."""
+        if self.count == 0:
+            return 0.0
+
+        target = max(1, int(round(self.count * percent / 100)))
+        seen = 0
+        for index, amount in enumerate(self.counts):
+            seen += amount
+            if seen >= target:
+                return self._value(index) / 1_000_000
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class Timing:
+    __slots__ = ("wall", "first_response", "errors")
+
+    def __init__(self) -> None:
+        self.wall = Histogram()
+        self.first_response = Histogram()
+        self.errors = 0
+
+    @property
+    def error_rate(self) -> float:
+        # failed checks/converters count as errors without a wall time
+        calls = max(self.wall.count, self.errors)
+        return self.errors / calls if calls else 0.0
+
+
+class CommandMetrics:
+    """
+    Records how long every prefix, hybrid and application command takes.
+
+    Wall time runs from the global before_invoke hook (or the tree's
+    interaction_check for slash commands) to the end of the command, first
+    response is the time until the first message, defer or modal was sent.
+    """
+
+    STARTED = "robo_started"
+    FIRST_RESPONSE = "robo_first_response"
+    # commands slower than this are logged with their guild and latency
+    SLOW_COMMAND = 5.0
+
+    def __init__(self, bot: Robo) -> None:
+        self.bot = bot
+        self.commands: Dict[str, Timing] = {}
+        self.cogs: Dict[str, Timing] = {}
+
+    def install(self) -> None:
+        self.bot.before_invoke(self.before_invoke)
+        self.bot.after_invoke(self.after_invoke)
+        self.bot.add_listener(self.on_command_error, "on_command_error")
+        self.bot.add_listener(self.on_app_command_completion, "on_app_command_completion")
+        _patch_interaction_response()
+
+    def _timings(self, command: Union[commands.Command, app_commands.Command, app_commands.ContextMenu]) -> List[Timing]:
+        name = command.qualified_name
+        if isinstance(command, commands.Command):
+            cog = command.cog_name or "No Category"
+        else:
+            binding = getattr(command, "binding", None)
+            cog = binding.qualified_name if isinstance(binding, commands.Cog) else "No Category"
+
+        try:
+            per_command = self.commands[name]
+        except KeyError:
+            per_command = self.commands[name] = Timing()
+        try:
+            per_cog = self.cogs[cog]
+        except KeyError:
+            per_cog = self.cogs[cog] = Timing()
+        return [per_command, per_cog]
+
+    def _record(
+        self,
+        command: Any,
+        started: Optional[float],
+        first_response: Optional[float],
+        failed: bool,
+        guild_id: Optional[int] = None,
+    ) -> None:
+        now = time.perf_counter()
+        if started is not None and now - started >= self.SLOW_COMMAND:
+            log.warning(
+                f"Slow command {command.qualified_name} took {now - started:.2f}s",
+                extra={"guild": guild_id, "command": command.qualified_name, "latency": round(now - started, 3)},
+            )
+        for timing in self._timings(command):
+            if failed:
+                timing.errors += 1
+            if started is None:
+                continue
+            timing.wall.record(now - started)
+            if first_response is not None:
+                timing.first_response.record(first_response - started)
+
+    # prefix and hybrid commands
+
+    @staticmethod
+    def _first_response(ctx: Context) -> Optional[float]:
+        if ctx.interaction is not None:
+            return ctx.interaction.extras.get(CommandMetrics.FIRST_RESPONSE)
+        return ctx.first_response_at
+
+    async def before_invoke(self, ctx: Context) -> None:
+        ctx.started_at = time.perf_counter()
+
+    async def after_invoke(self, ctx: Context) -> None:
+        if ctx.timing_recorded or ctx.command is None:
+            return
+        ctx.timing_recorded = True
+        self._record(ctx.command, ctx.started_at, self._first_response(ctx), ctx.command_failed, ctx.guild and ctx.guild.id)
+
+    async def on_command_error(self, ctx: Context, error: Exception) -> None:
+        # hybrid commands skip the after hook when they raise, and failed
+        # checks or converters never reach before_invoke at all
+        if ctx.timing_recorded or ctx.command is None:
+            return
+        ctx.timing_recorded = True
+        self._record(ctx.command, ctx.started_at, self._first_response(ctx), True, ctx.guild and ctx.guild.id)
+
+    # application commands
+
+    def on_app_command_start(self, interaction: discord.Interaction) -> None:
+        interaction.extras.setdefault(self.STARTED, time.perf_counter())
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command: Any) -> None:
+        if isinstance(command, HybridAppCommand):
+            # already recorded through the command hooks
+            return
+        extras = interaction.extras
+        self._record(command, extras.get(self.STARTED), extras.get(self.FIRST_RESPONSE), False, interaction.guild_id)
+
+    def on_app_command_error(self, interaction: discord.Interaction) -> None:
+        command = interaction.command
+        if command is None or isinstance(command, HybridAppCommand):
+            return
+        extras = interaction.extras
+        self._record(command, extras.get(self.STARTED), extras.get(self.FIRST_RESPONSE), True, interaction.guild_id)
+
+
+def _patch_interaction_response() -> None:
+    # every way of acknowledging an interaction stamps the time of the first response
+    cls = discord.InteractionResponse
+    if getattr(cls, "_robo_patched", False):
+        return
+
+    def wrap(name: str) -> None:
+        original = getattr(cls, name)
+
+        async def wrapper(self: discord.InteractionResponse, *args: Any, **kwargs: Any) -> Any:
+            self._parent.extras.setdefault(CommandMetrics.FIRST_RESPONSE, time.perf_counter())
+            return await original(self, *args, **kwargs)
+
+        wrapper.__name__ = original.__name__
+        wrapper.__doc__ = original.__doc__
+        setattr(cls, name, wrapper)
+
+    for name in ("defer", "send_message", "send_modal", "edit_message"):
+        wrap(name)
+    cls._robo_patched = True  # type: ignore
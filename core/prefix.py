@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Optional, Set, Tuple
+
+import discord
+
+import config
+
+if TYPE_CHECKING:
+    from .bot import Robo
+
+
+class PrefixResolver:
+    """
+    Keeps the guild prefixes and the no-prefix users in memory so that
+    resolving the prefix of a message is a dict lookup instead of two queries.
+
+    The resolver is loaded once in `Robo.setup_hook` and every command that
+    writes to `guilds` or `no_prefix` has to call the matching update method,
+    which also tells the other clusters about no-prefix changes.
+    """
+
+    def __init__(self, bot: Robo) -> None:
+        self.bot = bot
+        self.guild_prefixes: Dict[int, str] = {}
+        self.no_prefix: Set[int] = set()
+        # guild_id -> (normal prefixes, prefixes for no-prefix users)
+        self._cache: Dict[Optional[int], Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+        self._mentions: Tuple[str, ...] = ()
+
+    async def load(self) -> None:
+        guilds = await self.bot.db.fetchall("SELECT id, prefix FROM guilds")
+        users = await self.bot.db.fetchall("SELECT user_id FROM no_prefix")
+
+        self.guild_prefixes = {row[0]: row[1] for row in guilds if row[1]}
+        self.no_prefix = {row[0] for row in users}
+        self._cache.clear()
+        self.bot.logger.info(f"Loaded {len(self.guild_prefixes)} guild prefixes and {len(self.no_prefix)} no-prefix users")
+
+    def _build(self, guild_id: Optional[int]) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        if not self._mentions:
+            # bot.user is only available once we are logged in
+            user_id = self.bot.user.id
+            self._mentions = (f"<@{user_id}> ", f"<@!{user_id}> ")
+
+        prefixes = list(config.prefixes)
+        custom = self.guild_prefixes.get(guild_id) if guild_id is not None else None
+        if custom is not None and custom not in prefixes:
+            prefixes.append(custom)
+
+        normal = self._mentions + tuple(prefixes)
+        # the empty prefix has to be last, otherwise it would match before the real ones
+        entry = (normal, normal + ("",))
+        self._cache[guild_id] = entry
+        return entry
+
+    def resolve(self, message: discord.Message) -> Tuple[str, ...]:
+        guild_id = message.guild.id if message.guild is not None else None
+        try:
+            normal, extra = self._cache[guild_id]
+        except KeyError:
+            normal, extra = self._build(guild_id)
+
+        if message.author.id in self.no_prefix:
+            return extra
+        return normal
+
+    def get(self, guild_id: int) -> Optional[str]:
+        return self.guild_prefixes.get(guild_id)
+
+    def set_guild_prefix(self, guild_id: int, prefix: str) -> None:
+        self.guild_prefixes[guild_id] = prefix
+        self._cache.pop(guild_id, None)
+
+    def reset_guild_prefix(self, guild_id: int) -> None:
+        self.guild_prefixes.pop(guild_id, None)
+        self._cache.pop(guild_id, None)
+
+    # no-prefix users are bot wide, the other clusters get told about changes.
+    # guild prefixes only matter to the cluster that owns the guild.
+
+    def add_no_prefix(self, user_id: int) -> None:
+        self.no_prefix.add(user_id)
+        if self.bot.cluster is not None:
+            self.bot.cluster.broadcast("no_prefix_add", user_id)
+
+    def remove_no_prefix(self, user_id: int) -> None:
+        self.no_prefix.discard(user_id)
+        if self.bot.cluster is not None:
+            self.bot.cluster.broadcast("no_prefix_remove", user_id)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, NamedTuple, Sequence, Set
+
+if TYPE_CHECKING:
+    from .bot import Robo
+
+log = logging.getLogger("Robo")
+
+StageFunc = Callable[[], Awaitable[None]]
+
+
+class Stage(NamedTuple):
+    name: str
+    func: StageFunc
+    after: Sequence[str]
+    # a failing non fatal stage is logged instead of aborting the startup
+    fatal: bool = True
+
+
+class StartupPipeline:
+    """
+    Runs the bot's init stages in dependency order, exactly once.
+
+    Every stage names the stages it has to wait for. Stages whose
+    dependencies are all done run concurrently, and each one is timed.
+    Running the pipeline again (a second setup_hook, a reconnect) is a no-op
+    for the stages that already finished. An exception in a stage aborts the
+    startup, unless the stage was added with `fatal=False`.
+    """
+
+    def __init__(self, bot: Robo) -> None:
+        self.bot = bot
+        self.stages: Dict[str, Stage] = {}
+        self.done: Set[str] = set()
+        self.timings: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    def add(self, name: str, func: StageFunc, *, after: Sequence[str] = (), fatal: bool = True) -> None:
+        if name in self.stages:
+            raise ValueError(f"Startup stage {name} is already registered")
+        self.stages[name] = Stage(name, func, tuple(after), fatal)
+
+    def _order(self) -> List[List[Stage]]:
+        # groups of stages, every group only depends on the groups before it
+        pending = {name: stage for name, stage in self.stages.items() if name not in self.done}
+        finished = set(self.done)
+        levels: List[List[Stage]] = []
+        while pending:
+            for stage in pending.values():
+                missing = [dep for dep in stage.after if dep not in self.stages]
+                if missing:
+                    raise RuntimeError(f"Startup stage {stage.name} depends on unknown stages {missing}")
+
+            ready = [stage for stage in pending.values() if all(dep in finished for dep in stage.after)]
+            if not ready:
+                raise RuntimeError(f"Startup stages have a dependency cycle: {', '.join(pending)}")
+            levels.append(ready)
+            for stage in ready:
+                finished.add(stage.name)
+                del pending[stage.name]
+        return levels
+
+    async def _run_stage(self, stage: Stage) -> None:
+        start = time.perf_counter()
+        try:
+            await stage.func()
+        except Exception:
+            if stage.fatal:
+                raise
+            log.exception(f"Startup stage {stage.name} failed, starting without it")
+        self.timings[stage.name] = time.perf_counter() - start
+        self.done.add(stage.name)
+        log.info(f"Startup stage {stage.name} finished in {self.timings[stage.name] * 1000:.0f}ms")
+
+    async def run(self) -> None:
+        async with self._lock:
+            start = time.perf_counter()
+            for level in self._order():
+                await asyncio.gather(*(self._run_stage(stage) for stage in level))
+            log.info(f"Startup finished in {(time.perf_counter() - start) * 1000:.0f}ms")
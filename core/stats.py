@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+import discord
+from discord.ext import commands, tasks
+
+if TYPE_CHECKING:
+    from .bot import Robo
+
+log = logging.getLogger("Robo")
+
+
+class Stats:
+    """
+    In-memory bot counters that are periodically written to `data/stats.json`.
+
+    The file is replaced atomically (temp file + rename) so a crash in the
+    middle of a write can never leave a half written file behind.
+    """
+
+    FLUSH_INTERVAL = 60
+
+    def __init__(self, bot: Robo, path: str = "data/stats.json") -> None:
+        self.bot = bot
+        self.path = path
+        data = self._read()
+
+        self.booted: int = data.get("booted", 0)
+        self.commands_ran: int = data.get("commands_ran", 0)
+        self.messages_seen: int = data.get("messages_seen", 0)
+        self.boot_m: Dict[str, Any] = data.get("boot_m", {"sent": "true", "id": "null"})
+
+        self.command_uses: Counter[str] = Counter(data.get("command_uses", {}))
+        # json keys are always strings, the ids are converted back here
+        self.guild_messages: Counter[int] = Counter({int(k): v for k, v in data.get("guild_messages", {}).items()})
+        self.guild_commands: Counter[int] = Counter({int(k): v for k, v in data.get("guild_commands", {}).items()})
+        self.shard_messages: Counter[int] = Counter({int(k): v for k, v in data.get("shard_messages", {}).items()})
+
+        self._dirty = False
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            log.warning(f"{self.path} is corrupted, starting the stats from zero")
+            return {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "booted": self.booted,
+            "commands_ran": self.commands_ran,
+            "messages_seen": self.messages_seen,
+            "boot_m": dict(self.boot_m),
+            "command_uses": dict(self.command_uses),
+            "guild_messages": {str(k): v for k, v in self.guild_messages.items()},
+            "guild_commands": {str(k): v for k, v in self.guild_commands.items()},
+            "shard_messages": {str(k): v for k, v in self.shard_messages.items()},
+        }
+
+    def on_boot(self) -> None:
+        self.booted += 1
+        self._dirty = True
+
+    def on_message(self, message: discord.Message) -> None:
+        self.messages_seen += 1
+        if message.guild is not None:
+            self.guild_messages[message.guild.id] += 1
+            self.shard_messages[message.guild.shard_id] += 1
+        self._dirty = True
+
+    def on_command(self, ctx: commands.Context) -> None:
+        self.commands_ran += 1
+        if ctx.command is not None:
+            self.command_uses[ctx.command.qualified_name] += 1
+        if ctx.guild is not None:
+            self.guild_commands[ctx.guild.id] += 1
+        self._dirty = True
+
+    @property
+    def reboot_channel_id(self) -> Optional[int]:
+        """The channel that asked for a reboot, if the reboot message is still pending."""
+        if self.boot_m.get("sent") == "true" or self.boot_m.get("id") in (None, "null"):
+            return None
+        return int(self.boot_m["id"])
+
+    def mark_reboot(self, channel_id: Optional[int] = None) -> None:
+        self.boot_m["sent"] = "false"
+        if channel_id is not None:
+            self.boot_m["id"] = channel_id
+        # the process is about to be replaced, this has to hit the disk right away
+        self.flush()
+
+    def mark_reboot_sent(self) -> None:
+        self.boot_m["sent"] = "true"
+        self.boot_m["id"] = "null"
+        self._dirty = True
+
+    @staticmethod
+    def _write(path: str, data: Dict[str, Any]) -> None:
+        directory = os.path.dirname(path) or "."
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".stats-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def flush(self) -> None:
+        self._write(self.path, self.to_dict())
+        self._dirty = False
+
+    async def flush_async(self) -> None:
+        if not self._dirty:
+            return
+        # snapshot on the loop, write in a thread
+        data = self.to_dict()
+        self._dirty = False
+        try:
+            await self.bot.loop.run_in_executor(None, self._write, self.path, data)
+        except Exception:
+            self._dirty = True
+            raise
+
+    @tasks.loop(seconds=FLUSH_INTERVAL)
+    async def flusher(self) -> None:
+        try:
+            await self.flush_async()
+        except Exception as e:
+            log.error(f"Failed to write stats: {e}")
+
+    def start(self) -> None:
+        if not self.flusher.is_running():
+            self.flusher.start()
+
+    def stop(self) -> None:
+        self.flusher.cancel()
+        if self._dirty:
+            self.flush()
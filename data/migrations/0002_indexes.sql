@@ -0,0 +1,16 @@
+-- tag lookups by name inside a guild (tag create, and tag show once scoped)
+CREATE INDEX IF NOT EXISTS idx_tags_guild_name ON tags (tag_guild_id, tag_name);
+
+-- `tag_name = ? OR tag_id = ?` can only use an index for both sides of the OR
+CREATE INDEX IF NOT EXISTS idx_tags_name ON tags (tag_name);
+
+-- tag search ordered by uses, covers the selected columns
+CREATE INDEX IF NOT EXISTS idx_tags_guild_uses ON tags (tag_guild_id, tag_uses DESC, tag_name);
+
+-- tag list for a member
+CREATE INDEX IF NOT EXISTS idx_tags_owner_guild ON tags (tag_owner_id, tag_guild_id);
+
+-- guild scoped afk entries
+CREATE INDEX IF NOT EXISTS idx_afk_guild ON afk (afk_guild);
+
+ANALYZE;
@@ -0,0 +1,5 @@
+-- small key/value store for things the bot has to remember between boots
+CREATE TABLE IF NOT EXISTS bot_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
@@ -0,0 +1,28 @@
+-- full text index over tag names and content, the trigram tokenizer makes
+-- any substring of three or more characters searchable (needs sqlite 3.34)
+CREATE VIRTUAL TABLE IF NOT EXISTS tags_fts USING fts5 (
+    tag_name,
+    tag_content,
+    content = 'tags',
+    content_rowid = 'rowid',
+    tokenize = 'trigram'
+);
+
+-- the index points at the implicit rowid of tags, VACUUM can renumber those,
+-- so run `INSERT INTO tags_fts (tags_fts) VALUES ('rebuild')` after one
+CREATE TRIGGER IF NOT EXISTS tags_fts_insert AFTER INSERT ON tags BEGIN
+    INSERT INTO tags_fts (rowid, tag_name, tag_content) VALUES (new.rowid, new.tag_name, new.tag_content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tags_fts_delete AFTER DELETE ON tags BEGIN
+    INSERT INTO tags_fts (tags_fts, rowid, tag_name, tag_content) VALUES ('delete', old.rowid, old.tag_name, old.tag_content);
+END;
+
+-- only name and content are indexed, bumping tag_uses doesn't touch the index
+CREATE TRIGGER IF NOT EXISTS tags_fts_update AFTER UPDATE OF tag_name, tag_content ON tags BEGIN
+    INSERT INTO tags_fts (tags_fts, rowid, tag_name, tag_content) VALUES ('delete', old.rowid, old.tag_name, old.tag_content);
+    INSERT INTO tags_fts (rowid, tag_name, tag_content) VALUES (new.rowid, new.tag_name, new.tag_content);
+END;
+
+-- index the tags that already exist
+INSERT INTO tags_fts (tags_fts) VALUES ('rebuild');
@@ -0,0 +1,7 @@
+-- parsed dictionary entries (FreeDictionaryWord.to_json), so a word is only
+-- fetched and parsed once for every cluster and across restarts
+CREATE TABLE IF NOT EXISTS dictionary_cache (
+    word TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
@@ -0,0 +1,25 @@
+-- mass moderation runs (massban and friends), one row per command
+CREATE TABLE IF NOT EXISTS mod_runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER NOT NULL,
+    author_id INTEGER NOT NULL,
+    -- ban, kick or timeout
+    action TEXT NOT NULL,
+    reason TEXT,
+    -- seconds, timeouts only
+    duration INTEGER,
+    created_at REAL NOT NULL,
+    finished INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS mod_runs_guild_idx ON mod_runs (guild_id, finished);
+
+-- the outcome per user, an interrupted run is resumed from the pending ones
+CREATE TABLE IF NOT EXISTS mod_run_targets (
+    run_id INTEGER NOT NULL REFERENCES mod_runs (run_id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL,
+    -- pending, done or failed
+    status TEXT NOT NULL DEFAULT 'pending',
+    error TEXT,
+    PRIMARY KEY (run_id, user_id)
+) WITHOUT ROWID;
@@ -1,6 +1,15 @@
-from core import Robo
+import config
+from core import ClusterLauncher, Robo
 from helpcommand import PaginatedHelpCommand
 
+
+def create_bot(**options) -> Robo:
+    return Robo(help_command=PaginatedHelpCommand(), **options)
+
+
 if __name__=="__main__":
-    bot = Robo(help_command=PaginatedHelpCommand())
-    bot.boot()
+    if getattr(config, "clusters", 0):
+        ClusterLauncher(create_bot, clusters=config.clusters, shard_count=getattr(config, "shard_count", None)).run()
+    else:
+        bot = create_bot()
+        bot.boot()
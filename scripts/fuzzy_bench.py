@@ -0,0 +1,91 @@
+"""
+Compares the difflib scorers in utils.fuzzy with the bit-parallel ones.
+
+    python -m scripts.fuzzy_bench [choices] [queries]
+
+from the root of the repository.
+"""
+
+from __future__ import annotations
+
+import random
+import string
+import sys
+import time
+from typing import Callable
+
+from utils import fuzzy
+
+PAIRS = [
+    (fuzzy.ratio, fuzzy.fast_ratio),
+    (fuzzy.partial_ratio, fuzzy.fast_partial_ratio),
+    (fuzzy.token_sort_ratio, fuzzy.fast_token_sort_ratio),
+]
+
+
+def make_words(count: int, rng: random.Random) -> list[str]:
+    syllables = [a + b for a in 'bcdfghklmnprstvw' for b in 'aeiou']
+    words = []
+    for _ in range(count):
+        parts = [''.join(rng.choices(syllables, k=rng.randint(1, 4))) for _ in range(rng.randint(1, 3))]
+        words.append(' '.join(parts))
+    return words
+
+
+def typo(word: str, rng: random.Random) -> str:
+    chars = list(word)
+    for _ in range(rng.randint(0, 2)):
+        i = rng.randrange(len(chars))
+        op = rng.randrange(3)
+        if op == 0:
+            chars[i] = rng.choice(string.ascii_lowercase)
+        elif op == 1:
+            del chars[i]
+            if not chars:
+                chars.append(rng.choice(string.ascii_lowercase))
+        else:
+            chars.insert(i, rng.choice(string.ascii_lowercase))
+    return ''.join(chars)
+
+
+def timed(func: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main(choice_count: int = 2000, query_count: int = 20) -> None:
+    rng = random.Random(0)
+    choices = make_words(choice_count, rng)
+    queries = [typo(rng.choice(choices), rng) for _ in range(query_count)]
+
+    print(f'{choice_count} choices, {query_count} queries\n')
+    # the fast scorers use the real LCS where difflib matches greedily, so they
+    # can only score higher, `lower` should always be 0%
+    print(f'{"scorer":<24} {"difflib":>9} {"fast":>9} {"speedup":>8} {"same":>6} {"lower":>6} {"max diff":>8}')
+    for slow, fast in PAIRS:
+        slow_time = timed(lambda: [fuzzy.extract(q, choices, scorer=slow, limit=10) for q in queries])
+        fast_time = timed(lambda: [fuzzy.extract(q, choices, scorer=fast, limit=10) for q in queries])
+
+        sample = [(q, c) for q in queries[:5] for c in choices]
+        diffs = [fast(q, c) - slow(q, c) for q, c in sample]
+        same = sum(d == 0 for d in diffs) / len(diffs)
+        lower = sum(d < 0 for d in diffs) / len(diffs)
+        max_diff = max(map(abs, diffs))
+        print(
+            f'{fast.__name__:<24} {slow_time:>8.3f}s {fast_time:>8.3f}s {slow_time / fast_time:>7.1f}x'
+            f' {same:>6.1%} {lower:>6.1%} {max_diff:>8}'
+        )
+
+    print()
+    batch = timed(lambda: fuzzy.extract_many(queries, choices, scorer=fuzzy.fast_token_sort_ratio))
+    single = timed(lambda: [fuzzy.extract(q, choices, scorer=fuzzy.fast_token_sort_ratio) for q in queries])
+    print(f'extract_many token sort   {batch:.3f}s vs {single:.3f}s one query at a time')
+
+    for cutoff in (0, 60, 80):
+        took = timed(lambda: [fuzzy.extract(q, choices, scorer=fuzzy.levenshtein_ratio, score_cutoff=cutoff) for q in queries])
+        print(f'levenshtein_ratio cutoff {cutoff:<3} {took:.3f}s')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
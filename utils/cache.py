@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+from .singleflight import SingleFlight
+
+log = logging.getLogger("Robo")
+
+T = TypeVar('T')
+
+# every cache registers itself here, so the owner commands can show their stats
+caches: Dict[str, AsyncCache[Any]] = {}
+
+
+class AsyncCache(Generic[T]):
+    """
+    A size bounded LRU cache for the results of async lookups.
+
+    An entry is fresh for `ttl` seconds. After that, for another `stale_ttl`
+    seconds, the old value is still returned right away while a single
+    background task fetches a new one (stale-while-revalidate). Older entries
+    are fetched again in the foreground. Failed fetches are never cached.
+
+    Concurrent misses for the same key share a single fetch.
+    """
+
+    def __init__(self, name: str, *, ttl: float, stale_ttl: float = 0.0, maxsize: int = 256) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, Tuple[float, T]] = OrderedDict()
+        # holds the refresh tasks, so they can't be garbage collected mid flight
+        self._refreshing: Dict[Hashable, asyncio.Task[None]] = {}
+        self._flights: SingleFlight[T] = SingleFlight()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refresh_errors = 0
+
+        caches[name] = self
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable) -> Optional[T]:
+        """Returns a fresh cached value without fetching, or None."""
+        entry = self._data.get(key)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            return None
+        return entry[1]
+
+    def set(self, key: Hashable, value: T) -> None:
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[T]]) -> T:
+        value = await fetch()
+        self.set(key, value)
+        return value
+
+    async def _refresh(self, key: Hashable, fetch: Callable[[], Awaitable[T]]) -> None:
+        try:
+            await self._flights.do(key, lambda: self._fetch(key, fetch))
+        except Exception as e:
+            self.refresh_errors += 1
+            log.debug(f"Refreshing {self.name} cache entry {key!r} failed: {e!r}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[T]]) -> T:
+        entry = self._data.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return entry[1]
+
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._data.move_to_end(key)
+                if key not in self._refreshing:
+                    self._refreshing[key] = asyncio.create_task(self._refresh(key, fetch))
+                return entry[1]
+
+        self.misses += 1
+        return await self._flights.do(key, lambda: self._fetch(key, fetch))
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'refresh_errors': self.refresh_errors,
+            'coalesced': self._flights.coalesced,
+            'hit_rate': self.hit_rate,
+        }
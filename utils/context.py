@@ -1,5 +1,6 @@
 import asyncio
 import io
+import time
 from contextlib import suppress
 from typing import (Any, Callable, Generic, List, Optional,
                     TypeVar, Union)
@@ -18,6 +19,10 @@ class Context(commands.Context[commands.Bot], Generic[T]):
     bot: commands.Bot
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
+        # filled in by core.metrics
+        self.started_at: Optional[float] = None
+        self.first_response_at: Optional[float] = None
+        self.timing_recorded: bool = False
   
     @discord.utils.cached_property
     def replied_reference(self) -> Optional[discord.MessageReference]:
@@ -65,6 +70,8 @@ class Context(commands.Context[commands.Bot], Generic[T]):
             if isinstance(embeds, discord.Embed):
                 __set_embed_defaults(embeds)
 
+        if self.first_response_at is None:
+            self.first_response_at = time.perf_counter()
         return await super().send(str(content)[:1990] if content else None, **kwargs)
     
     async def error(self, message: str, delete_after: bool = None, **kwargs: Any) -> Optional[discord.Message]:
@@ -172,6 +179,11 @@ class Context(commands.Context[commands.Bot], Generic[T]):
         else:
             return await self.send(content)
         
+    async def defer(self, *, ephemeral: bool = False) -> None:
+        if self.first_response_at is None:
+            self.first_response_at = time.perf_counter()
+        await super().defer(ephemeral=ephemeral)
+
     async def on_command_error(self, error: Exception) -> None:
         await self.error(f"```py\n{error}\n```")
 
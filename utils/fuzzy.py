@@ -12,7 +12,7 @@ from __future__ import annotations
 
 import re
 import heapq
-from typing import Callable, Iterable, Literal, Optional, Sequence, TypeVar, Generator, overload
+from typing import Callable, Generic, Iterable, Literal, Optional, Sequence, TypeVar, Generator, overload
 from difflib import SequenceMatcher
 
 T = TypeVar('T')
@@ -74,6 +74,202 @@ def partial_token_sort_ratio(a: str, b: str) -> int:
     return partial_ratio(a, b)
 
 
+# Bit-parallel scorers.
+#
+# Every character of one string is a bit of a python int, so a whole column of
+# the dynamic programming matrix is updated with a few integer operations per
+# character of the other string (Hyyrö's LCS and Myers/Hyyrö's Levenshtein).
+# fast_ratio is difflib's 2*M/T with M being the longest common subsequence,
+# it gives the same score as ratio() unless difflib's greedy matching misses
+# part of the LCS, so it is never lower. fast_partial_ratio scores a superset
+# of the windows partial_ratio does, so the same holds for it. All of them take
+# a score_cutoff and return 0 if it isn't reached. The LCS stops once the
+# characters left can't lift it to the cutoff anymore, the Levenshtein distance
+# once it can't drop below the distance the cutoff allows.
+
+
+class _Prepared:
+    __slots__ = ('text', 'length', '_masks')
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.length = len(text)
+        self._masks: Optional[dict[str, int]] = None
+
+    @property
+    def masks(self) -> dict[str, int]:
+        # built on first use, extract_many reuses them for every query
+        if self._masks is None:
+            masks: dict[str, int] = {}
+            bit = 1
+            for char in self.text:
+                masks[char] = masks.get(char, 0) | bit
+                bit <<= 1
+            self._masks = masks
+        return self._masks
+
+
+def _lcs(pattern: _Prepared, text: str, at_least: int = 0) -> int:
+    """
+    The length of the longest common subsequence, or some smaller number once
+    it's clear it won't reach `at_least`.
+    """
+    masks = pattern.masks
+    full = (1 << pattern.length) - 1
+    v = full
+    # every character adds one to the LCS at most, so it can only fall short
+    # in the last `at_least` characters, only those are checked
+    split = max(len(text) - at_least, 0)
+    for char in text[:split]:
+        u = v & masks.get(char, 0)
+        v = ((v + u) | (v - u)) & full
+
+    remaining = len(text) - split
+    for char in text[split:]:
+        u = v & masks.get(char, 0)
+        v = ((v + u) | (v - u)) & full
+        remaining -= 1
+        lcs = pattern.length - bin(v).count('1')
+        if lcs + remaining < at_least:
+            return lcs
+    return pattern.length - bin(v).count('1')
+
+
+def _levenshtein(pattern: _Prepared, text: str, max_distance: int) -> int:
+    m, n = pattern.length, len(text)
+    if abs(m - n) > max_distance:
+        return max_distance + 1
+    if not m or not n:
+        return m or n
+
+    masks = pattern.masks
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    vp, vn = full, 0
+    distance = m
+    remaining = n
+    for char in text:
+        eq = masks.get(char, 0)
+        xv = eq | vn
+        xh = (((eq & vp) + vp) ^ vp) | eq
+        hp = vn | ~(xh | vp)
+        hn = vp & xh
+        if hp & last:
+            distance += 1
+        elif hn & last:
+            distance -= 1
+
+        remaining -= 1
+        # every character left can lower the distance by one at most
+        if distance - remaining > max_distance:
+            return max_distance + 1
+
+        hp = (hp << 1) | 1
+        hn <<= 1
+        vp = (hn | ~(xv | hp)) & full
+        vn = hp & xv
+    return distance
+
+
+def _fast_ratio(a: _Prepared, b: _Prepared, score_cutoff: int) -> int:
+    total = a.length + b.length
+    if not total:
+        return 100
+    # the LCS can't be longer than the shorter string
+    if int(round(200 * min(a.length, b.length) / total)) < score_cutoff:
+        return 0
+    pattern, text = (a, b) if a.length >= b.length else (b, a)
+    # anything shorter rounds to less than score_cutoff
+    at_least = int((score_cutoff - 1) * total / 200)
+    score = int(round(200 * _lcs(pattern, text.text, at_least) / total))
+    return score if score >= score_cutoff else 0
+
+
+def _fast_partial_ratio(a: _Prepared, b: _Prepared, score_cutoff: int) -> int:
+    short, long = (a, b) if a.length <= b.length else (b, a)
+    if not short.length:
+        return 100
+
+    # Score the windows of the long string as long as the short one, and like
+    # difflib the ones cut off by its end, as 2*M/T of the short string and the
+    # window. A window that starts with a character the short string doesn't
+    # have never beats the one right after it, which is as good but shorter.
+    masks = short.masks
+    text = long.text
+    size = short.length
+    best = 0.0
+    for start in range(long.length):
+        width = min(size, long.length - start)
+        if 2 * width / (size + width) <= best:
+            # only gets smaller for the cut off windows after this one
+            break
+        if text[start] not in masks:
+            continue
+        # a window only matters if it beats the best one and the cutoff
+        at_least = max(int(best * (size + width) / 2) + 1, int((score_cutoff - 1) * (size + width) / 200))
+        best = max(best, 2 * _lcs(short, text[start:start + size], at_least) / (size + width))
+        if best == 1.0:
+            break
+
+    # difflib's partial_ratio rounds anything above 99 up
+    score = 100 if 100 * best > 99 else int(round(100 * best))
+    return score if score >= score_cutoff else 0
+
+
+def _levenshtein_ratio(a: _Prepared, b: _Prepared, score_cutoff: int) -> int:
+    longest = max(a.length, b.length)
+    if not longest:
+        return 100
+    max_distance = int(longest * (100 - score_cutoff + 0.5) / 100)
+    pattern, text = (a, b) if a.length >= b.length else (b, a)
+    distance = _levenshtein(pattern, text.text, max_distance)
+    score = int(round(100 * (longest - distance) / longest))
+    return score if score >= score_cutoff and score > 0 else 0
+
+
+def fast_ratio(a: str, b: str, *, score_cutoff: int = 0) -> int:
+    return _fast_ratio(_Prepared(a), _Prepared(b), score_cutoff)
+
+
+def fast_partial_ratio(a: str, b: str, *, score_cutoff: int = 0) -> int:
+    return _fast_partial_ratio(_Prepared(a), _Prepared(b), score_cutoff)
+
+
+def fast_token_sort_ratio(a: str, b: str, *, score_cutoff: int = 0) -> int:
+    return _fast_ratio(_Prepared(_sort_tokens(a)), _Prepared(_sort_tokens(b)), score_cutoff)
+
+
+def fast_partial_token_sort_ratio(a: str, b: str, *, score_cutoff: int = 0) -> int:
+    return _fast_partial_ratio(_Prepared(_sort_tokens(a)), _Prepared(_sort_tokens(b)), score_cutoff)
+
+
+def levenshtein(a: str, b: str, *, max_distance: Optional[int] = None) -> int:
+    """Returns the edit distance, or ``max_distance + 1`` once it's known to be larger."""
+    if max_distance is None:
+        max_distance = max(len(a), len(b))
+    return _levenshtein(_Prepared(a), b, max_distance)
+
+
+def levenshtein_ratio(a: str, b: str, *, score_cutoff: int = 0) -> int:
+    return _levenshtein_ratio(_Prepared(a), _Prepared(b), score_cutoff)
+
+
+# scorer -> (processor, scorer working on prepared strings), used by the extract functions
+_Processor = Optional[Callable[[str], str]]
+_PreparedScorer = Callable[[_Prepared, _Prepared, int], int]
+_prepared_scorers: dict[Callable[..., int], tuple[_Processor, _PreparedScorer]] = {
+    fast_ratio: (None, _fast_ratio),
+    fast_partial_ratio: (None, _fast_partial_ratio),
+    fast_token_sort_ratio: (_sort_tokens, _fast_ratio),
+    fast_partial_token_sort_ratio: (_sort_tokens, _fast_partial_ratio),
+    levenshtein_ratio: (None, _levenshtein_ratio),
+}
+
+
+def _prepare(text: str, processor: _Processor) -> _Prepared:
+    return _Prepared(processor(text) if processor else text)
+
+
 @overload
 def _extraction_generator(
     query: str,
@@ -100,6 +296,12 @@ def _extraction_generator(
     scorer: Callable[[str, str], int] = quick_ratio,
     score_cutoff: int = 0,
 ) -> Generator[tuple[str, int, T] | tuple[str, int], None, None]:
+    if scorer in _prepared_scorers:
+        processor, prepared_scorer = _prepared_scorers[scorer]
+        prepared = _prepare(query, processor)
+        yield from _prepared_generator(prepared, _prepare_choices(choices, processor), prepared_scorer, score_cutoff)
+        return
+
     if isinstance(choices, dict):
         for key, value in choices.items():
             score = scorer(query, key)
@@ -112,6 +314,27 @@ def _extraction_generator(
                 yield (choice, score)
 
 
+_PreparedChoices = list[tuple[_Prepared, str, Optional[tuple[T]]]]
+
+
+def _prepare_choices(choices: Sequence[str] | dict[str, T], processor: _Processor) -> _PreparedChoices[T]:
+    if isinstance(choices, dict):
+        return [(_prepare(key, processor), key, (value,)) for key, value in choices.items()]
+    return [(_prepare(choice, processor), choice, None) for choice in choices]
+
+
+def _prepared_generator(
+    query: _Prepared,
+    choices: _PreparedChoices[T],
+    scorer: _PreparedScorer,
+    score_cutoff: int,
+) -> Generator[tuple[str, int, T] | tuple[str, int], None, None]:
+    for prepared, choice, value in choices:
+        score = scorer(query, prepared, score_cutoff)
+        if score >= score_cutoff:
+            yield (choice, score) if value is None else (choice, score, value[0])
+
+
 @overload
 def extract(
     query: str,
@@ -151,6 +374,55 @@ def extract(
     return sorted(it, key=key, reverse=True)  # type: ignore
 
 
+@overload
+def extract_many(
+    queries: Iterable[str],
+    choices: Sequence[str],
+    *,
+    scorer: Callable[..., int] = ...,
+    score_cutoff: int = ...,
+    limit: Optional[int] = ...,
+) -> list[list[tuple[str, int]]]:
+    ...
+
+
+@overload
+def extract_many(
+    queries: Iterable[str],
+    choices: dict[str, T],
+    *,
+    scorer: Callable[..., int] = ...,
+    score_cutoff: int = ...,
+    limit: Optional[int] = ...,
+) -> list[list[tuple[str, int, T]]]:
+    ...
+
+
+def extract_many(
+    queries: Iterable[str],
+    choices: dict[str, T] | Sequence[str],
+    *,
+    scorer: Callable[..., int] = fast_ratio,
+    score_cutoff: int = 0,
+    limit: Optional[int] = 10,
+) -> list[list[tuple[str, int]]] | list[list[tuple[str, int, T]]]:
+    """Like :func:`extract` for several queries, with the choices processed only once."""
+    key = lambda t: t[1]
+    if scorer not in _prepared_scorers:
+        return [extract(query, choices, scorer=scorer, score_cutoff=score_cutoff, limit=limit) for query in queries]  # type: ignore
+
+    processor, prepared_scorer = _prepared_scorers[scorer]
+    prepared = _prepare_choices(choices, processor)
+    results = []
+    for query in queries:
+        it = _prepared_generator(_prepare(query, processor), prepared, prepared_scorer, score_cutoff)
+        if limit is not None:
+            results.append(heapq.nlargest(limit, it, key=key))
+        else:
+            results.append(sorted(it, key=key, reverse=True))
+    return results  # type: ignore
+
+
 @overload
 def extract_one(
     query: str,
@@ -350,6 +622,74 @@ def finder(
         return [z for _, _, z in sorted(suggestions, key=sort_key)]
 
 
+class FinderIndex(Generic[T]):
+    """A prebuilt index that gives the same results as :func:`finder` for a fixed collection.
+
+    ``finder``'s lazy regex matches from the first occurrence of the first
+    character and then takes the earliest position of every following one,
+    so a match is just a chain of ``str.find`` calls on the lowered key.
+    Only keys that contain every character of the query are checked, these
+    come from intersecting per character sets of key positions, and the
+    best ``limit`` results are picked with a heap instead of a full sort.
+    """
+
+    def __init__(self, items: Iterable[tuple[str, T]]) -> None:
+        self.keys: list[str] = []
+        self.values: list[T] = []
+        self.lowered: list[str] = []
+        positions: dict[str, set[int]] = {}
+
+        for index, (key, value) in enumerate(items):
+            lowered = key.lower()
+            self.keys.append(key)
+            self.values.append(value)
+            self.lowered.append(lowered)
+            for char in set(lowered):
+                try:
+                    positions[char].add(index)
+                except KeyError:
+                    positions[char] = {index}
+
+        self.positions: dict[str, frozenset[int]] = {char: frozenset(indices) for char, indices in positions.items()}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def search(self, text: str, *, limit: Optional[int] = None) -> list[tuple[str, T]]:
+        query = str(text).lower()
+        keys = self.keys
+
+        if not query:
+            # an empty pattern matches everything at the same spot
+            order = heapq.nsmallest(limit, range(len(keys)), key=keys.__getitem__) if limit else sorted(range(len(keys)), key=keys.__getitem__)
+            return [(keys[i], self.values[i]) for i in order]
+
+        sets: list[frozenset[int]] = []
+        for char in set(query):
+            indices = self.positions.get(char)
+            if indices is None:
+                return []
+            sets.append(indices)
+        sets.sort(key=len)
+        candidates = sets[0].intersection(*sets[1:])
+
+        first, rest = query[0], query[1:]
+        lowered = self.lowered
+        results: list[tuple[int, int, str, int]] = []
+        for i in candidates:
+            name = lowered[i]
+            start = pos = name.find(first)
+            for char in rest:
+                pos = name.find(char, pos + 1)
+                if pos == -1:
+                    break
+            else:
+                results.append((pos - start + 1, start, keys[i], i))
+
+        best = heapq.nsmallest(limit, results) if limit else sorted(results)
+        return [(keys[i], self.values[i]) for _, _, _, i in best]
+
+
 def find(text: str, collection: Iterable[str], *, key: Optional[Callable[[str], str]] = None) -> Optional[str]:
     try:
         return finder(text, collection, key=key)[0]
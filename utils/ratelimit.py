@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Deque
+
+
+class RateLimiter:
+    """
+    Lets at most `rate` calls through every `per` seconds.
+
+    `acquire` waits until the call fits in the window, callers are served in
+    the order they arrived.
+    """
+
+    def __init__(self, rate: int, per: float) -> None:
+        self.rate = rate
+        self.per = per
+        self._calls: Deque[float] = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            while self._calls and now - self._calls[0] >= self.per:
+                self._calls.popleft()
+
+            if len(self._calls) >= self.rate:
+                await asyncio.sleep(self.per - (now - self._calls[0]))
+                self._calls.popleft()
+
+            self._calls.append(time.monotonic())
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, *args: object) -> None:
+        pass
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight(Generic[T]):
+    """
+    Collapses concurrent calls with the same key into one.
+
+    The first caller starts the coroutine, everyone who asks for the same key
+    while it is still running awaits that same task instead of starting a
+    new one. A waiter being cancelled (an autocomplete that timed out, for
+    example) doesn't cancel the shared task for the others.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[Hashable, asyncio.Task[T]] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    def _done(self, key: Hashable, task: asyncio.Task[Any]) -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        # mark the exception as retrieved, the waiters may all be gone
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._flights[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .singleflight import SingleFlight
+
+log = logging.getLogger("Robo")
+
+
+class SuggestionCache:
+    """
+    Caches the suggestion lists of a slow upstream autocomplete by prefix.
+
+    Upstream returns at most some fixed number of suggestions. A list shorter
+    than the longest one seen so far can't have been cut off, so it holds
+    every suggestion for its prefix, and any longer prefix is answered by
+    filtering it locally.
+
+    Upstream is only asked once a user stopped typing for `debounce`
+    seconds. If it doesn't answer within `budget` seconds (Discord gives an
+    autocomplete 3), the best cached list is used instead and the request
+    keeps running to fill the cache for the next keystroke.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[List[str]]],
+        *,
+        ttl: float = 3600.0,
+        maxsize: int = 2048,
+        debounce: float = 0.3,
+        budget: float = 2.0,
+    ) -> None:
+        self.fetch = fetch
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.debounce = debounce
+        self.budget = budget
+        # prefix -> (fetched at, suggestions)
+        self._lists: OrderedDict[str, Tuple[float, List[str]]] = OrderedDict()
+        self._longest = 0
+        self._flights: SingleFlight[List[str]] = SingleFlight()
+        # user id -> number of their newest request
+        self._latest: Dict[int, int] = {}
+        self._counter = itertools.count()
+
+        self.hits = 0
+        self.fetches = 0
+        self.fallbacks = 0
+
+    def _get(self, prefix: str) -> Optional[List[str]]:
+        entry = self._lists.get(prefix)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= self.ttl:
+            del self._lists[prefix]
+            return None
+        self._lists.move_to_end(prefix)
+        return entry[1]
+
+    def _complete(self, suggestions: List[str]) -> bool:
+        return len(suggestions) < self._longest
+
+    def cached(self, prefix: str, *, complete_only: bool = True) -> Optional[List[str]]:
+        """The suggestions for `prefix` from the cache alone, or None."""
+        exact = self._get(prefix)
+        if exact is not None:
+            return exact
+
+        for end in range(len(prefix) - 1, 0, -1):
+            shorter = self._get(prefix[:end])
+            if shorter is None:
+                continue
+            if complete_only and not self._complete(shorter):
+                # a shorter prefix's list would be cut off even more
+                return None
+            return [word for word in shorter if word.lower().startswith(prefix)]
+        return None
+
+    async def _fetch(self, prefix: str) -> List[str]:
+        self.fetches += 1
+        suggestions = await self.fetch(prefix)
+        self._longest = max(self._longest, len(suggestions))
+        # an empty list can also mean upstream failed, don't remember it
+        if suggestions:
+            self._lists[prefix] = (time.monotonic(), suggestions)
+            self._lists.move_to_end(prefix)
+            while len(self._lists) > self.maxsize:
+                self._lists.popitem(last=False)
+        return suggestions
+
+    def _fallback(self, prefix: str) -> List[str]:
+        self.fallbacks += 1
+        return self.cached(prefix, complete_only=False) or []
+
+    async def suggest(self, user_id: int, query: str) -> List[str]:
+        prefix = query.strip().lower()
+        if not prefix:
+            return []
+
+        local = self.cached(prefix)
+        if local is not None:
+            self.hits += 1
+            return local
+
+        number = next(self._counter)
+        self._latest[user_id] = number
+        start = time.monotonic()
+        await asyncio.sleep(self.debounce)
+        if self._latest.get(user_id) != number:
+            # they kept typing, Discord ignores this answer anyway
+            return self._fallback(prefix)
+
+        try:
+            remaining = self.budget - (time.monotonic() - start)
+            # the flight is shielded, timing out here doesn't cancel the request
+            return await asyncio.wait_for(self._flights.do(prefix, lambda: self._fetch(prefix)), timeout=remaining)
+        except asyncio.TimeoutError:
+            return self._fallback(prefix)
+        except Exception as e:
+            log.debug(f"Autocomplete lookup for {prefix!r} failed: {e!r}")
+            return self._fallback(prefix)
+        finally:
+            if self._latest.get(user_id) == number:
+                del self._latest[user_id]
@@ -1,8 +1,16 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, NamedTuple, TypedDict
+
+import asyncio
+import hashlib
+import re
+from typing import TYPE_CHECKING, Any, NamedTuple, TypedDict
+from urllib.parse import quote
+
+from .cache import AsyncCache
+from .ratelimit import RateLimiter
 
 if TYPE_CHECKING:
-    from aiohttp import ClientSession
+    from core.http import HTTPClient
 
 LANGUAGES = {
     'af': 'Afrikaans',
@@ -134,45 +142,151 @@ class TranslateResult(NamedTuple):
     target_language: str
 
 
-async def translate(text: str, *, src: str = 'auto', dest: str = 'en', session: ClientSession) -> TranslateResult:
-    # This was discovered by the people here:
-    # https://github.com/ssut/py-googletrans/issues/268
-    query = {
-        'dj': '1',
-        'dt': ['sp', 't', 'ld', 'bd'],
-        'client': 'dict-chrome-ex',
-        # Source Language
-        'sl': src,
-        # Target Language
-        'tl': dest,
-        # Query
-        'q': text,
-    }
+# the `q` parameter is kept well below the URL length Google accepts
+MAX_QUERY_LENGTH = 1800
+
+_piece_regex = re.compile(r'[^.!?\u3002\uff01\uff1f\n]*(?:[.!?\u3002\uff01\uff1f]+|\n)?\s*')
+_word_regex = re.compile(r'\S+\s*|\s+')
+
+
+def _encoded_length(text: str) -> int:
+    return len(quote(text, safe=''))
+
+
+def _hard_split(text: str, limit: int) -> list[str]:
+    parts: list[str] = []
+    current = ''
+    size = 0
+    for char in text:
+        char_size = _encoded_length(char)
+        if current and size + char_size > limit:
+            parts.append(current)
+            current, size = '', 0
+        current += char
+        size += char_size
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _pieces(text: str, limit: int) -> list[str]:
+    # sentences, then words for sentences that are too long, then characters
+    pieces: list[str] = []
+    for sentence in _piece_regex.findall(text):
+        if not sentence:
+            continue
+        if _encoded_length(sentence) <= limit:
+            pieces.append(sentence)
+            continue
+        for word in _word_regex.findall(sentence):
+            if _encoded_length(word) <= limit:
+                pieces.append(word)
+            else:
+                pieces.extend(_hard_split(word, limit))
+    return pieces
+
+
+def split_text(text: str, limit: int = MAX_QUERY_LENGTH) -> list[str]:
+    """Splits `text` at sentence boundaries into chunks whose URL encoded length is at most `limit`."""
+    chunks: list[str] = []
+    current = ''
+    size = 0
+    for piece in _pieces(text, limit):
+        # percent encoding is per character, so the lengths just add up
+        piece_size = _encoded_length(piece)
+        if current and size + piece_size > limit:
+            chunks.append(current)
+            current, size = '', 0
+        current += piece
+        size += piece_size
+    if current:
+        chunks.append(current)
+    return chunks
 
-    headers = {
+
+class _Chunk(NamedTuple):
+    source: str
+    translated: str
+
+
+class Translator:
+    """
+    Google translate client.
+
+    Long text is split at sentence boundaries into chunks that fit in a
+    query string. The chunks are translated concurrently, at most `rate`
+    requests every `per` seconds, and put back together in order. Results
+    are memoized by (text hash, source, target) in a bounded cache.
+    """
+
+    URL = 'https://clients5.google.com/translate_a/single'
+    HEADERS = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/104.0.0.0 Safari/537.36'
     }
 
-    target_language = LANGUAGES.get(dest, 'Unknown')
+    def __init__(
+        self,
+        http: HTTPClient,
+        *,
+        concurrency: int = 4,
+        rate: int = 5,
+        per: float = 1.0,
+        ttl: float = 24 * 3600,
+        maxsize: int = 1024,
+    ) -> None:
+        self.http = http
+        self.cache: AsyncCache[TranslateResult] = AsyncCache('translate', ttl=ttl, maxsize=maxsize)
+        self._limiter = RateLimiter(rate, per)
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _translate_chunk(self, text: str, src: str, dest: str) -> _Chunk:
+        # This was discovered by the people here:
+        # https://github.com/ssut/py-googletrans/issues/268
+        query: dict[str, Any] = {
+            'dj': '1',
+            'dt': ['sp', 't', 'ld', 'bd'],
+            'client': 'dict-chrome-ex',
+            # Source Language
+            'sl': src,
+            # Target Language
+            'tl': dest,
+            # Query
+            'q': text,
+        }
+
+        async with self._semaphore:
+            await self._limiter.acquire()
+            resp = await self.http.get(self.URL, params=query, headers=self.HEADERS)
 
-    async with session.get('https://clients5.google.com/translate_a/single', params=query, headers=headers) as resp:
         if resp.status != 200:
-            text = await resp.text()
-            raise TranslateError(resp.status, text)
+            raise TranslateError(resp.status, resp.text())
 
-        data = await resp.json()
-        src = data.get('src', 'Unknown')
-        source_language = LANGUAGES.get(src, src)
+        data = resp.json()
         sentences: list[TranslatedSentence] = data.get('sentences', [])
         if len(sentences) == 0:
             raise RuntimeError('Google translate returned no information')
 
-        original = ''.join(sentence.get('orig', '') for sentence in sentences)
         translated = ''.join(sentence.get('trans', '') for sentence in sentences)
+        # Google drops the whitespace at the end, the next chunk needs it
+        trailing = text[len(text.rstrip()):]
+        if trailing and not translated[-1:].isspace():
+            translated += trailing
+        return _Chunk(data.get('src', 'Unknown'), translated)
 
+    async def _translate(self, text: str, src: str, dest: str) -> TranslateResult:
+        chunks = split_text(text)
+        if not chunks:
+            raise RuntimeError('Google translate returned no information')
+
+        results = await asyncio.gather(*(self._translate_chunk(chunk, src, dest) for chunk in chunks))
+        source = results[0].source
         return TranslateResult(
-            original=original,
-            translated=translated,
-            source_language=source_language,
-            target_language=target_language,
+            original=text,
+            translated=''.join(result.translated for result in results).strip(),
+            source_language=LANGUAGES.get(source, source),
+            target_language=LANGUAGES.get(dest, 'Unknown'),
         )
+
+    async def translate(self, text: str, *, src: str = 'auto', dest: str = 'en') -> TranslateResult:
+        key = (hashlib.sha256(text.encode()).digest(), src, dest)
+        return await self.cache.get_or_fetch(key, lambda: self._translate(text, src, dest))
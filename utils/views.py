@@ -88,20 +88,17 @@ class PingRoleSelect(discord.ui.View):
     @discord.ui.select(cls=discord.ui.RoleSelect, placeholder="Select a role", custom_id="role_select")
     async def role_select(self, interaction: discord.Interaction, role: discord.ui.RoleSelect):
         await interaction.response.defer()
-        async with self.bot.db.cursor() as cur: 
-            await cur.execute("SELECT * FROM tickets WHERE ticket_guild_id = ?", (interaction.guild.id,))
-            data = await cur.fetchone()
-            ping_role = interaction.guild.get_role(data[4])
-            if ping_role is None:
-                # await cur.execute("UPDATE tickets SET ticket_ping_role_id = ? WHERE ticket_guild_id = ?", (role.values[0], interaction.guild.id))   
-                # await self.message.edit(embed=discord.Embed(title="Ticket Pingrole Setup", description=f"> Successfully set ping role to {role.values[0]}", color=self.bot.color))
-                await interaction.followup.send(f"Successfully set ping role to {role.values[0]}")
-            else:
-                # await cur.execute("UPDATE tickets SET ticket_ping_role_id = ? WHERE ticket_guild_id = ?", (role.values[0], interaction.guild.id))
-                # await interaction.response.send_message(f"Successfully updated ping role to {role.values[0]}", ephemeral=True)
-                await interaction.followup.send(f"Successfully updated ping role to {role.values[0]}")
-            await self.message.edit(embed=discord.Embed(title="Ticket Pingrole Setup", description=f"> Successfully set ping role to {role.values}", color=self.bot.color))
-        await self.bot.db.commit()
+        data = await self.bot.db.fetchone("SELECT * FROM tickets WHERE ticket_guild_id = ?", interaction.guild.id)
+        ping_role = interaction.guild.get_role(data[4])
+        if ping_role is None:
+            # await self.bot.db.execute("UPDATE tickets SET ticket_ping_role_id = ? WHERE ticket_guild_id = ?", role.values[0].id, interaction.guild.id)
+            # await self.message.edit(embed=discord.Embed(title="Ticket Pingrole Setup", description=f"> Successfully set ping role to {role.values[0]}", color=self.bot.color))
+            await interaction.followup.send(f"Successfully set ping role to {role.values[0]}")
+        else:
+            # await self.bot.db.execute("UPDATE tickets SET ticket_ping_role_id = ? WHERE ticket_guild_id = ?", role.values[0].id, interaction.guild.id)
+            # await interaction.response.send_message(f"Successfully updated ping role to {role.values[0]}", ephemeral=True)
+            await interaction.followup.send(f"Successfully updated ping role to {role.values[0]}")
+        await self.message.edit(embed=discord.Embed(title="Ticket Pingrole Setup", description=f"> Successfully set ping role to {role.values}", color=self.bot.color))
 
     async def on_error(self, interaction: discord.Interaction, error: Exception, item: role_select) -> None:
         return await interaction.channel.send(f"Error: {error}")
\ No newline at end of file
@@ -3,17 +3,17 @@ import aiohttp
 from discord.ext import commands
 import config
 from typing import Optional
-import aiohttp
 
 async def send_webhook2(
         msg: str,
+        *,
+        session: aiohttp.ClientSession,
         ):
-    async with aiohttp.ClientSession() as session:
-        webhook = discord.Webhook.from_url(
-            url=config.webhook1,
-            session=session,
-        )
-        await webhook.send(msg)
+    webhook = discord.Webhook.from_url(
+        url=config.webhook1,
+        session=session,
+    )
+    await webhook.send(msg)
        
 async def send_webhook1(
         bot: commands.Bot,
@@ -34,31 +34,29 @@ async def send_webhook1(
     :param url: The url of the author.
 
     """
-    async with aiohttp.ClientSession() as session:
-        webhook = discord.Webhook.from_url(
-            url=config.webhook2,
-            session=session,
-        )
-        embed=discord.Embed(
-                description=description,
-                color=config.color,
-            )
-        if title:
-            embed.title = title
-        if author and url:
-            embed.set_author(name=author, url=url)
-        embed.set_footer(text=f"Robo 147 logs")
-        embed.timestamp = discord.utils.utcnow()
-        await webhook.send(
-            embed=embed,
-            username=username,
-            avatar_url=bot.user.display_avatar.url
+    webhook = discord.Webhook.from_url(
+        url=config.webhook2,
+        session=bot.session,
+    )
+    embed=discord.Embed(
+            description=description,
+            color=config.color,
         )
+    if title:
+        embed.title = title
+    if author and url:
+        embed.set_author(name=author, url=url)
+    embed.set_footer(text=f"Robo 147 logs")
+    embed.timestamp = discord.utils.utcnow()
+    await webhook.send(
+        embed=embed,
+        username=username,
+        avatar_url=bot.user.display_avatar.url
+    )
 
-async def log(msg: str):
-    async with aiohttp.ClientSession() as session:
-        webhook = discord.Webhook.from_url(
-            url=config.webhook1,
-            session=session,
-        )
-        await webhook.send(msg)
\ No newline at end of file
+async def log(msg: str, *, session: aiohttp.ClientSession):
+    webhook = discord.Webhook.from_url(
+        url=config.webhook1,
+        session=session,
+    )
+    await webhook.send(msg)
\ No newline at end of file